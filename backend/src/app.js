@@ -8,6 +8,11 @@ const app = express();
 // Middleware
 app.use(cors({ origin: FRONTEND_URL, credentials: true }));
 app.use(express.json({ limit: '1mb' }));
+
+// Service-to-service webhooks (cf-service verdicts) are authenticated by a
+// shared secret and must not count against the per-IP limit
+app.use('/api/internal', require('./routes/internal'));
+
 app.use(globalLimiter);
 
 // Health check
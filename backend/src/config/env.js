@@ -6,6 +6,14 @@ module.exports = {
   JWT_SECRET: process.env.JWT_SECRET || 'dev-secret-change-in-production',
   ENCRYPTION_KEY: process.env.ENCRYPTION_KEY || '0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef',
   CF_SERVICE_URL: process.env.CF_SERVICE_URL || 'http://localhost:8000',
+  // Where cf-service can reach this backend's verdict webhook; unset = poll for verdicts
+  CF_CALLBACK_URL: process.env.CF_CALLBACK_URL || '',
+  CF_CALLBACK_SECRET: process.env.CF_CALLBACK_SECRET || '',
+  // Share of submissions traced end to end (backend + cf-service spans as JSON log lines)
+  TRACE_SAMPLE_RATE: Number(process.env.TRACE_SAMPLE_RATE || 0.05),
+  // Check submissions on their samples in cf-service's local judge first:
+  // 'off', 'compile' (reject code that doesn't compile) or 'samples' (reject failed samples too)
+  SAMPLE_PREFLIGHT: process.env.SAMPLE_PREFLIGHT || 'off',
   FRONTEND_URL: process.env.FRONTEND_URL || 'http://localhost:3000',
   NODE_ENV: process.env.NODE_ENV || 'development',
 };
@@ -18,6 +18,15 @@ const submitLimiter = rateLimit({
   message: { error: 'Too many submissions, please wait before submitting again' },
 });
 
+// Local sample runs: 10 per minute per user (they cost CPU, not Codeforces submissions)
+const runSamplesLimiter = rateLimit({
+  windowMs: 60000,
+  max: 10,
+  standardHeaders: true,
+  legacyHeaders: false,
+  message: { error: 'Too many sample runs, please wait a moment' },
+});
+
 // Auth: 10 per minute (login/register)
 const authLimiter = rateLimit({
   windowMs: 60000,
@@ -27,4 +36,4 @@ const authLimiter = rateLimit({
   message: { error: 'Too many auth attempts, please try again later' },
 });
 
-module.exports = { globalLimiter, submitLimiter, authLimiter };
+module.exports = { globalLimiter, submitLimiter, runSamplesLimiter, authLimiter };
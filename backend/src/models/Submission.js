@@ -36,10 +36,18 @@ const submissionSchema = new mongoose.Schema(
       type: Number, // Codeforces submission ID
       default: null,
     },
+    cfHandle: {
+      type: String, // Platform CF account the submission was made from
+      default: null,
+    },
     verdict: {
       type: String,
       default: 'PENDING',
     },
+    submitError: {
+      type: String, // Why it never reached Codeforces (verdict SUBMIT_FAILED)
+      default: null,
+    },
     testsPassed: {
       type: Number,
       default: 0,
@@ -7,7 +7,7 @@ const { auth, adminOnly } = require('../middleware/auth');
 const { pollVerdict } = require('../services/verdictPoller');
 const { encrypt } = require('../utils/encryption');
 const { CF_SERVICE_URL } = require('../config/env');
-const { getAdminCfCredentials } = require('../services/adminCfService');
+const { getAdminCfCredentials, syncCfAccountPool } = require('../services/adminCfService');
 
 const router = express.Router();
 
@@ -74,12 +74,15 @@ router.post('/rejudge/:submissionId', async (req, res) => {
       return res.status(400).json({ error: 'Submission has no Codeforces submission ID' });
     }
 
-    // Get admin's CF credentials for re-polling
-    let adminCf;
-    try {
-      adminCf = await getAdminCfCredentials();
-    } catch (err) {
-      return res.status(503).json({ error: 'Platform Codeforces account not configured' });
+    // Re-poll under the account the submission was made from
+    // (older submissions predate the account pool and used the single admin account)
+    let cfHandle = submission.cfHandle;
+    if (!cfHandle) {
+      try {
+        cfHandle = (await getAdminCfCredentials()).handle;
+      } catch (err) {
+        return res.status(503).json({ error: 'Platform Codeforces account not configured' });
+      }
     }
 
     // Reset verdict to PENDING
@@ -89,8 +92,8 @@ router.post('/rejudge/:submissionId', async (req, res) => {
     submission.memoryUsed = 0;
     await submission.save();
 
-    // Re-poll the verdict from CF using admin's handle
-    pollVerdict(submission._id, adminCf.handle, submission.cfSubmissionId, submission.contestId).catch((err) =>
+    // Re-poll the verdict from CF
+    pollVerdict(submission._id, cfHandle, submission.cfSubmissionId, submission.contestId).catch((err) =>
       console.error('[Admin Rejudge] Poll error:', err.message),
     );
 
@@ -109,28 +112,75 @@ router.post('/rejudge/:submissionId', async (req, res) => {
   }
 });
 
+// ================================================================
+// Problemset Search (for picking contest problems)
+// ================================================================
+
+// GET /api/admin/problems/search?q=&minRating=&maxRating=&tags=dp,greedy&match=all&limit=&offset=
+// Answered by cf-service from its in-memory problemset index
+router.get('/problems/search', async (req, res) => {
+  const { q, minRating, maxRating, tags, match, limit, offset } = req.query;
+  try {
+    const result = await axios.get(`${CF_SERVICE_URL}/cf/problems/search`, {
+      params: {
+        q,
+        min_rating: minRating || undefined,
+        max_rating: maxRating || undefined,
+        tags: tags || undefined,
+        match,
+        limit,
+        offset,
+      },
+    });
+    res.json(result.data);
+  } catch (err) {
+    if (err.response && err.response.status < 500) {
+      return res.status(400).json({ error: 'Invalid search parameters' });
+    }
+    console.error('CF service error:', err.message);
+    res.status(502).json({ error: 'Codeforces service unavailable' });
+  }
+});
+
 // ================================================================
 // CF Cookie Management (admin-only)
 // ================================================================
 
 // GET /api/admin/cf-status — get current platform CF account status
+// Every admin can link one CF account; submissions are sharded across all of them.
 router.get('/cf-status', async (req, res) => {
   try {
-    const admin = await User.findOne({
+    const admins = await User.find({
       role: 'admin',
       codeforcesCookies: { $ne: null },
       codeforcesHandle: { $ne: null },
-    });
+    }).sort({ cookiesValidatedAt: -1 });
+
+    if (admins.length === 0) {
+      return res.json({ linked: false, accounts: [] });
+    }
 
-    if (!admin) {
-      return res.json({ linked: false });
+    // Live health of each account as seen by cf-service (best effort)
+    let health = new Map();
+    try {
+      const pool = await axios.get(`${CF_SERVICE_URL}/cf/accounts`);
+      health = new Map(pool.data.accounts.map((a) => [a.handle, a]));
+    } catch (err) {
+      console.error('CF service error:', err.message);
     }
 
+    const own = admins.find((a) => a._id.equals(req.user._id)) || admins[0];
     res.json({
       linked: true,
-      codeforcesHandle: admin.codeforcesHandle,
-      cookiesValidatedAt: admin.cookiesValidatedAt,
-      linkedBy: admin.username,
+      codeforcesHandle: own.codeforcesHandle,
+      cookiesValidatedAt: own.cookiesValidatedAt,
+      linkedBy: own.username,
+      accounts: admins.map((a) => ({
+        codeforcesHandle: a.codeforcesHandle,
+        cookiesValidatedAt: a.cookiesValidatedAt,
+        linkedBy: a.username,
+        pool: health.get(a.codeforcesHandle) || null,
+      })),
     });
   } catch (err) {
     console.error('CF status error:', err);
@@ -163,9 +213,9 @@ router.post('/cf-cookies', async (req, res) => {
 
     const { handle } = cfResponse.data;
 
-    // Clear any existing admin CF cookies (only one admin account should be linked)
+    // The same CF account linked by another admin is moved to this admin
     await User.updateMany(
-      { role: 'admin', codeforcesCookies: { $ne: null } },
+      { role: 'admin', codeforcesHandle: handle, _id: { $ne: req.user._id } },
       { $set: { codeforcesHandle: null, codeforcesCookies: null, cookiesValidatedAt: null } },
     );
 
@@ -177,6 +227,8 @@ router.post('/cf-cookies', async (req, res) => {
     req.user.cookiesValidatedAt = new Date();
     await req.user.save();
 
+    syncCfAccountPool().catch((err) => console.error('CF account pool sync error:', err.message));
+
     res.json({
       message: 'Platform Codeforces account linked successfully',
       codeforcesHandle: handle,
@@ -188,14 +240,15 @@ router.post('/cf-cookies', async (req, res) => {
   }
 });
 
-// DELETE /api/admin/cf-cookies — unlink platform CF account
+// DELETE /api/admin/cf-cookies — unlink the requesting admin's platform CF account
 router.delete('/cf-cookies', async (req, res) => {
   try {
-    // Clear all admin CF cookies
-    await User.updateMany(
-      { role: 'admin', codeforcesCookies: { $ne: null } },
-      { $set: { codeforcesHandle: null, codeforcesCookies: null, cookiesValidatedAt: null } },
-    );
+    req.user.codeforcesHandle = null;
+    req.user.codeforcesCookies = null;
+    req.user.cookiesValidatedAt = null;
+    await req.user.save();
+
+    syncCfAccountPool().catch((err) => console.error('CF account pool sync error:', err.message));
 
     res.json({ message: 'Platform Codeforces account unlinked' });
   } catch (err) {
@@ -3,6 +3,7 @@ const bcrypt = require('bcryptjs');
 const Contest = require('../models/Contest');
 const { auth, adminOnly } = require('../middleware/auth');
 const { contestValidation, validate } = require('../utils/validators');
+const { prefetchContestProblems } = require('../services/problemCacheService');
 
 const router = express.Router();
 
@@ -93,6 +94,11 @@ router.post('/', auth, adminOnly, contestValidation, validate, async (req, res)
 
     await contest.save();
 
+    // Warm the problem cache so the first participants don't wait on Codeforces
+    prefetchContestProblems(contest.problems).catch((err) =>
+      console.error('Problem prefetch error:', err.message),
+    );
+
     res.status(201).json(contest.toJSON());
   } catch (err) {
     console.error('Create contest error:', err);
@@ -137,6 +143,13 @@ router.put('/:id', auth, adminOnly, async (req, res) => {
     }
 
     await contest.save();
+
+    if (problems && Array.isArray(problems)) {
+      prefetchContestProblems(contest.problems).catch((err) =>
+        console.error('Problem prefetch error:', err.message),
+      );
+    }
+
     res.json(contest.toJSON());
   } catch (err) {
     if (err.name === 'CastError') {
@@ -0,0 +1,42 @@
+const crypto = require('crypto');
+const express = require('express');
+const { CF_CALLBACK_SECRET } = require('../config/env');
+const { receiveVerdict } = require('../services/verdictPoller');
+
+const router = express.Router();
+
+// Only cf-service knows the shared secret; without one configured the webhook is off
+function callbackAuth(req, res, next) {
+  const token = Buffer.from(req.get('X-Callback-Token') || '');
+  const secret = Buffer.from(CF_CALLBACK_SECRET);
+  if (!CF_CALLBACK_SECRET || token.length !== secret.length || !crypto.timingSafeEqual(token, secret)) {
+    return res.status(401).json({ error: 'Invalid callback token' });
+  }
+  next();
+}
+
+// POST /api/internal/cf-verdicts — final verdict pushed by cf-service
+// Idempotent: redelivering a verdict that is already stored is a no-op.
+router.post('/cf-verdicts', callbackAuth, async (req, res) => {
+  const { id, handle, verdict } = req.body;
+  if (!id || !handle || !verdict) {
+    return res.status(400).json({ error: 'id, handle and verdict are required' });
+  }
+
+  try {
+    const outcome = await receiveVerdict(req.body);
+    if (outcome === 'unknown') {
+      // Submission not saved yet — 409 makes cf-service retry shortly
+      return res.status(409).json({ error: 'Unknown submission' });
+    }
+    res.json({ status: outcome });
+  } catch (err) {
+    if (err.name === 'CastError') {
+      return res.status(400).json({ error: 'Invalid submission reference' });
+    }
+    console.error('Verdict callback error:', err);
+    res.status(500).json({ error: 'Internal server error' });
+  }
+});
+
+module.exports = router;
@@ -1,6 +1,7 @@
 const express = require('express');
 const axios = require('axios');
 const CachedProblem = require('../models/CachedProblem');
+const { saveCachedProblem } = require('../services/problemCacheService');
 const { auth } = require('../middleware/auth');
 const { CF_SERVICE_URL } = require('../config/env');
 
@@ -28,6 +29,15 @@ router.get('/:contestId/:problemIndex', auth, async (req, res) => {
       if (err.response && err.response.status === 404) {
         return res.status(404).json({ error: 'Problem not found on Codeforces' });
       }
+      // Codeforces is down — a stale statement beats an error page
+      if (cached) {
+        return res.json(cached);
+      }
+      if (err.response && err.response.status === 503) {
+        const retryAfter = err.response.headers['retry-after'];
+        if (retryAfter) res.set('Retry-After', retryAfter);
+        return res.status(503).json({ error: 'Codeforces is unavailable, try again shortly' });
+      }
       console.error('CF service error:', err.message);
       return res.status(502).json({ error: 'Codeforces service unavailable' });
     }
@@ -35,26 +45,7 @@ router.get('/:contestId/:problemIndex', auth, async (req, res) => {
     const data = cfResponse.data;
 
     // Upsert into cache
-    cached = await CachedProblem.findOneAndUpdate(
-      { problemId },
-      {
-        problemId,
-        contestId: parseInt(contestId),
-        problemIndex: problemIndex.toUpperCase(),
-        name: data.name || '',
-        timeLimit: data.timeLimit || '',
-        memoryLimit: data.memoryLimit || '',
-        htmlContent: data.statementHtml || '',
-        samples: (data.sampleTests || []).map((s) => ({
-          input: s.input,
-          output: s.output,
-        })),
-        rating: data.rating || null,
-        tags: data.tags || [],
-        fetchedAt: new Date(),
-      },
-      { upsert: true, new: true },
-    );
+    cached = await saveCachedProblem(contestId, problemIndex, data);
 
     res.json(cached);
   } catch (err) {
@@ -1,18 +1,19 @@
 const express = require('express');
-const axios = require('axios');
 const Submission = require('../models/Submission');
 const Contest = require('../models/Contest');
 const { auth } = require('../middleware/auth');
-const { CF_SERVICE_URL } = require('../config/env');
-const { pollVerdict } = require('../services/verdictPoller');
-const { submitLimiter } = require('../middleware/rateLimiter');
-const { submitValidation } = require('../utils/validators');
-const { getAdminCfCredentials } = require('../services/adminCfService');
+const { enqueueSubmission, trackSubmitJob } = require('../services/submitJobService');
+const { runSamples, describeFailure } = require('../services/sampleJudgeService');
+const { submitLimiter, runSamplesLimiter } = require('../middleware/rateLimiter');
+const { submitValidation, runSamplesValidation } = require('../utils/validators');
+const { traceRequest, withSpan } = require('../utils/tracing');
+const { SAMPLE_PREFLIGHT } = require('../config/env');
 
 const router = express.Router();
 
 // POST /api/submissions — submit a solution
 router.post('/', auth, submitLimiter, submitValidation, async (req, res) => {
+  const trace = traceRequest(req, res, 'POST /api/submissions');
   try {
     const { contestId, problemId, code, language, languageId } = req.body;
 
@@ -24,7 +25,7 @@ router.post('/', auth, submitLimiter, submitValidation, async (req, res) => {
     }
 
     // Check contest exists and is running
-    const contest = await Contest.findById(contestId);
+    const contest = await withSpan(trace, 'load_contest', () => Contest.findById(contestId));
     if (!contest) {
       return res.status(404).json({ error: 'Contest not found' });
     }
@@ -48,42 +49,22 @@ router.post('/', auth, submitLimiter, submitValidation, async (req, res) => {
       return res.status(400).json({ error: 'Problem not in this contest' });
     }
 
-    // Get admin's CF credentials (all submissions go through admin's account)
-    let adminCf;
-    try {
-      adminCf = await getAdminCfCredentials();
-    } catch (err) {
-      if (err.message === 'NO_ADMIN_CF') {
-        return res.status(503).json({ error: 'Platform Codeforces account not configured. Contact an admin.' });
+    // Don't spend a Codeforces submission on code the local judge already rejects;
+    // `force` submits anyway (the samples may have more than one right answer)
+    if (SAMPLE_PREFLIGHT !== 'off' && !req.body.force) {
+      const preflight = await withSpan(trace, 'sample_preflight', (span) =>
+        runSamples({ contestProblem, code, languageId, compileOnly: SAMPLE_PREFLIGHT === 'compile', trace: span }),
+      );
+      if (preflight && preflight.verdict !== 'OK') {
+        return res.status(422).json({ error: `Not submitted: ${describeFailure(preflight)}`, preflight });
       }
-      return res.status(500).json({ error: 'Failed to load platform credentials. Contact an admin.' });
     }
-    const cookies = adminCf.cookies;
 
     // Build problem_code for CF service (e.g., "4A" → "4/A")
     const problemCode = `${contestProblem.contestId}/${contestProblem.problemIndex}`;
 
-    // Submit to CF via Python service
-    let cfResponse;
-    try {
-      cfResponse = await axios.post(`${CF_SERVICE_URL}/cf/submit`, {
-        cookies,
-        problem_code: problemCode,
-        source_code: code,
-        language_id: languageId,
-      });
-    } catch (err) {
-      if (err.response) {
-        const msg = err.response.data?.detail || 'Submission failed on Codeforces';
-        return res.status(err.response.status === 401 ? 401 : 502).json({ error: msg });
-      }
-      console.error('CF service error:', err.message);
-      return res.status(502).json({ error: 'Codeforces service unavailable' });
-    }
-
-    const cfSubmissionId = cfResponse.data.submission_id;
-
-    // Create submission record
+    // Create submission record before queueing, so the verdict webhook (which
+    // comes back with its _id) always finds it; removed again if queueing fails
     const submission = new Submission({
       contestId,
       userId: req.userId,
@@ -91,16 +72,40 @@ router.post('/', auth, submitLimiter, submitValidation, async (req, res) => {
       code,
       language,
       languageId,
-      cfSubmissionId,
       verdict: 'PENDING',
       submittedAt: new Date(),
     });
+    await withSpan(trace, 'save_submission', () => submission.save());
 
-    await submission.save();
+    // Queue the submission in the Python service; it shards submits across the
+    // platform CF accounts and paces them
+    let jobId;
+    try {
+      jobId = await withSpan(
+        trace,
+        'enqueue_cf_job',
+        (span) => enqueueSubmission({ problemCode, code, languageId, callbackRef: submission._id, trace: span }),
+        { problemCode },
+      );
+    } catch (err) {
+      await Submission.deleteOne({ _id: submission._id });
+      if (err.message === 'NO_ADMIN_CF') {
+        return res.status(503).json({ error: 'Platform Codeforces account not configured. Contact an admin.' });
+      }
+      if (err.response) {
+        if (err.response.status === 401) {
+          return res.status(401).json({ error: 'CF cookies expired' });
+        }
+        const msg = err.response.data?.detail || 'Submission failed on Codeforces';
+        return res.status(502).json({ error: msg });
+      }
+      console.error('CF service error:', err.message);
+      return res.status(502).json({ error: 'Codeforces service unavailable' });
+    }
 
-    // Start verdict polling in background using admin's CF handle
-    pollVerdict(submission._id, adminCf.handle, cfSubmissionId, contestId).catch((err) =>
-      console.error('[VerdictPoller] Unexpected error:', err),
+    // Wait for the CF submission ID in background, then poll its verdict under the account used
+    trackSubmitJob(jobId, submission, trace).catch((err) =>
+      console.error('[SubmitJob] Unexpected error:', err),
     );
 
     res.status(201).json({
@@ -121,6 +126,46 @@ router.post('/', auth, submitLimiter, submitValidation, async (req, res) => {
   }
 });
 
+// POST /api/submissions/run-samples — run a solution on the problem's sample tests
+// in cf-service's local judge; nothing is submitted to Codeforces
+router.post('/run-samples', auth, runSamplesLimiter, runSamplesValidation, async (req, res) => {
+  const trace = traceRequest(req, res, 'POST /api/submissions/run-samples');
+  try {
+    const { contestId, problemId, code, languageId } = req.body;
+    const isAdmin = req.user.role === 'admin';
+
+    const contest = await withSpan(trace, 'load_contest', () => Contest.findById(contestId));
+    if (!contest) {
+      return res.status(404).json({ error: 'Contest not found' });
+    }
+    if (contest.computeStatus() === 'UPCOMING' && !isAdmin) {
+      return res.status(400).json({ error: 'Contest has not started yet' });
+    }
+    const isParticipant = contest.participants.some((p) => p.toString() === req.userId.toString());
+    if (!isParticipant && !isAdmin) {
+      return res.status(403).json({ error: 'You must join the contest first' });
+    }
+    const contestProblem = contest.problems.find((p) => p.problemId === problemId);
+    if (!contestProblem) {
+      return res.status(400).json({ error: 'Problem not in this contest' });
+    }
+
+    const result = await withSpan(trace, 'run_samples', (span) =>
+      runSamples({ contestProblem, code, languageId, trace: span }),
+    );
+    if (!result) {
+      return res.status(503).json({ error: 'Sample runs are not available for this language right now' });
+    }
+    res.json(result);
+  } catch (err) {
+    if (err.name === 'CastError') {
+      return res.status(400).json({ error: 'Invalid contest or problem ID' });
+    }
+    console.error('Run samples error:', err);
+    res.status(500).json({ error: 'Internal server error' });
+  }
+});
+
 // GET /api/submissions?contestId=...&userId=...&problemId=...
 router.get('/', auth, async (req, res) => {
   try {
@@ -3,6 +3,7 @@ const app = require('./app');
 const connectDB = require('./config/db');
 const { PORT } = require('./config/env');
 const socketService = require('./services/socketService');
+const { syncCfAccountPool } = require('./services/adminCfService');
 
 async function start() {
   // Connect to MongoDB
@@ -17,6 +18,9 @@ async function start() {
   server.listen(PORT, () => {
     console.log(`✓ Backend server running on http://localhost:${PORT}`);
   });
+
+  // Hand the linked platform CF accounts to cf-service (retried lazily on submit)
+  syncCfAccountPool().catch((err) => console.error('CF account pool sync failed:', err.message));
 }
 
 start().catch((err) => {
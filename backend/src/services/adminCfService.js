@@ -1,17 +1,21 @@
+const axios = require('axios');
 const User = require('../models/User');
+const { CF_SERVICE_URL } = require('../config/env');
 const { decrypt } = require('../utils/encryption');
 
+const LINKED_ADMIN = {
+  role: 'admin',
+  codeforcesCookies: { $ne: null },
+  codeforcesHandle: { $ne: null },
+};
+
 /**
  * Get the admin's decrypted Codeforces cookies and handle.
  * Finds any admin user who has linked CF cookies.
  * Returns { handle, cookies } or throws an error.
  */
 async function getAdminCfCredentials() {
-  const admin = await User.findOne({
-    role: 'admin',
-    codeforcesCookies: { $ne: null },
-    codeforcesHandle: { $ne: null },
-  });
+  const admin = await User.findOne(LINKED_ADMIN);
 
   if (!admin) {
     throw new Error('NO_ADMIN_CF');
@@ -30,4 +34,37 @@ async function getAdminCfCredentials() {
   };
 }
 
-module.exports = { getAdminCfCredentials };
+/**
+ * Get every linked platform CF account (one per admin, deduplicated by handle).
+ * Accounts whose cookies fail to decrypt are skipped.
+ */
+async function getAdminCfAccounts() {
+  const admins = await User.find(LINKED_ADMIN).sort({ cookiesValidatedAt: -1 });
+  const accounts = new Map();
+
+  for (const admin of admins) {
+    if (accounts.has(admin.codeforcesHandle)) continue;
+    try {
+      accounts.set(admin.codeforcesHandle, {
+        handle: admin.codeforcesHandle,
+        cookies: decrypt(admin.codeforcesCookies),
+      });
+    } catch {
+      console.error(`[AdminCf] Could not decrypt cookies for ${admin.codeforcesHandle}`);
+    }
+  }
+  return [...accounts.values()];
+}
+
+/**
+ * Push the linked accounts to cf-service, which shards submissions across them.
+ * Returns the number of accounts in the pool.
+ */
+async function syncCfAccountPool() {
+  const accounts = await getAdminCfAccounts();
+  await axios.put(`${CF_SERVICE_URL}/cf/accounts`, { accounts });
+  console.log(`[AdminCf] Synced ${accounts.length} Codeforces accounts to cf-service`);
+  return accounts.length;
+}
+
+module.exports = { getAdminCfCredentials, getAdminCfAccounts, syncCfAccountPool };
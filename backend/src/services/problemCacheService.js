@@ -0,0 +1,111 @@
+const axios = require('axios');
+const CachedProblem = require('../models/CachedProblem');
+const { CF_SERVICE_URL } = require('../config/env');
+
+/**
+ * Upsert a problem returned by cf-service into the CachedProblem collection.
+ */
+async function saveCachedProblem(contestId, problemIndex, data) {
+  const index = problemIndex.toUpperCase();
+  const problemId = `${contestId}${index}`;
+
+  return CachedProblem.findOneAndUpdate(
+    { problemId },
+    {
+      problemId,
+      contestId: parseInt(contestId),
+      problemIndex: index,
+      name: data.name || '',
+      timeLimit: data.timeLimit || '',
+      memoryLimit: data.memoryLimit || '',
+      htmlContent: data.statementHtml || '',
+      samples: (data.sampleTests || []).map((s) => ({
+        input: s.input,
+        output: s.output,
+      })),
+      rating: data.rating || null,
+      tags: data.tags || [],
+      fetchedAt: new Date(),
+    },
+    { upsert: true, new: true },
+  );
+}
+
+/**
+ * Warm the problem cache for a contest's problem set.
+ * Problems already cached and fresh are skipped; the rest are fetched through
+ * cf-service's bulk endpoint, which streams one NDJSON line per problem.
+ * Runs in background after contest create/update — do NOT await this.
+ */
+async function prefetchContestProblems(problems) {
+  const wanted = new Map();
+  for (const p of problems || []) {
+    const index = String(p.problemIndex).toUpperCase();
+    wanted.set(`${p.contestId}${index}`, { contest_id: Number(p.contestId), index });
+  }
+
+  const cached = await CachedProblem.find({ problemId: { $in: [...wanted.keys()] } });
+  for (const doc of cached) {
+    if (!doc.isStale()) wanted.delete(doc.problemId);
+  }
+  if (wanted.size === 0) return { fetched: 0, failed: 0 };
+
+  const res = await axios.post(
+    `${CF_SERVICE_URL}/cf/problems/bulk`,
+    { problems: [...wanted.values()] },
+    { responseType: 'stream' },
+  );
+
+  let fetched = 0;
+  let failed = 0;
+  const saves = [];
+
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    let result;
+    try {
+      result = JSON.parse(line);
+    } catch {
+      return;
+    }
+    if (result.done) return;
+    if (!result.ok) {
+      failed += 1;
+      console.warn(`[Prefetch] ${result.contestId}${result.problemIndex} failed: ${result.error}`);
+      return;
+    }
+    saves.push(
+      saveCachedProblem(result.contestId, result.problemIndex, result.problem)
+        .then(() => {
+          fetched += 1;
+        })
+        .catch((err) => {
+          failed += 1;
+          console.error(`[Prefetch] Saving ${result.contestId}${result.problemIndex} failed:`, err.message);
+        }),
+    );
+  };
+
+  await new Promise((resolve, reject) => {
+    let buffer = '';
+    res.data.on('data', (chunk) => {
+      buffer += chunk.toString();
+      let end;
+      while ((end = buffer.indexOf('\n')) !== -1) {
+        handleLine(buffer.slice(0, end));
+        buffer = buffer.slice(end + 1);
+      }
+    });
+    res.data.on('end', () => {
+      handleLine(buffer);
+      resolve();
+    });
+    res.data.on('error', reject);
+  });
+  await Promise.all(saves);
+
+  console.log(`[Prefetch] Cached ${fetched} problems (${failed} failed)`);
+  return { fetched, failed };
+}
+
+module.exports = { saveCachedProblem, prefetchContestProblems };
@@ -0,0 +1,44 @@
+const axios = require('axios');
+const { CF_SERVICE_URL } = require('../config/env');
+const { traceHeaders } = require('../utils/tracing');
+
+const JUDGE_TIMEOUT = 60 * 1000; // compile + every sample, including time queued in cf-service
+
+/**
+ * Compile and run a solution on its problem's sample tests in cf-service's
+ * local judge, without spending a Codeforces submission. `compileOnly` stops
+ * after compiling. Resolves with the judge result ({ verdict, compile, tests,
+ * passed, total }), or null when the judge can't tell (no local compiler for
+ * the language, code over the judge's size limits, judge off or busy,
+ * cf-service unreachable): callers then carry on as if the samples had
+ * passed.
+ */
+async function runSamples({ contestProblem, code, languageId, compileOnly = false, trace = null }) {
+  const body = {
+    source_code: code,
+    language_id: languageId,
+    contest_id: contestProblem.contestId,
+    problem_index: contestProblem.problemIndex,
+    compile_only: compileOnly,
+  };
+  try {
+    const res = await axios.post(`${CF_SERVICE_URL}/cf/judge/samples`, body, {
+      headers: traceHeaders(trace),
+      timeout: JUDGE_TIMEOUT,
+    });
+    return res.data;
+  } catch (err) {
+    if (!err.response || ![413, 422, 503].includes(err.response.status)) {
+      console.error('[SampleJudge] cf-service error:', err.message);
+    }
+    return null;
+  }
+}
+
+/** "WRONG_ANSWER on sample 2" style summary of a failed judge result. */
+function describeFailure(result) {
+  const failed = result.tests.find((t) => t.verdict !== 'OK');
+  return failed ? `${result.verdict} on sample ${failed.index}` : result.verdict;
+}
+
+module.exports = { runSamples, describeFailure };
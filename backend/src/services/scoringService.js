@@ -7,12 +7,13 @@ const Standing = require('../models/Standing');
  * - 1 point per solved problem
  * - Penalty = solveTime + (failedAttempts * penaltyTime)
  * - Only first AC counts, subsequent submissions ignored
+ * - Submissions that never reached Codeforces (SUBMIT_FAILED) don't count
  */
 async function calculateICPCScore(contestId, userId) {
   const submissions = await Submission.find({
     contestId,
     userId,
-    verdict: { $nin: ['PENDING', 'TESTING'] },
+    verdict: { $nin: ['PENDING', 'TESTING', 'SUBMIT_FAILED'] },
   }).sort({ submittedAt: 1 });
 
   const contest = await Contest.findById(contestId);
@@ -0,0 +1,105 @@
+const axios = require('axios');
+const Submission = require('../models/Submission');
+const { CF_SERVICE_URL, CF_CALLBACK_URL, CF_CALLBACK_SECRET } = require('../config/env');
+const { pollVerdict, PENDING_VERDICTS } = require('./verdictPoller');
+const { syncCfAccountPool } = require('./adminCfService');
+const { emitSubmissionUpdate } = require('./socketService');
+const { withSpan, traceHeaders } = require('../utils/tracing');
+
+const JOB_WAIT = 25; // seconds per long-poll of the job status
+const JOB_TIMEOUT = 30 * 60 * 1000; // give up on a job that never leaves the queue
+// cf-service pushes final verdicts to routes/internal.js instead of being polled for them
+const CALLBACKS_ENABLED = Boolean(CF_CALLBACK_URL && CF_CALLBACK_SECRET);
+
+/**
+ * Queue a submission in cf-service. Resolves with the job ID as soon as
+ * it is queued; cf-service picks one of the platform CF accounts and paces
+ * the actual Codeforces submits. `callbackRef` (the Submission _id) comes
+ * back with the verdict webhook when callbacks are configured. `trace` (a
+ * span, optional) is propagated to cf-service.
+ * Throws NO_ADMIN_CF if no platform account is linked.
+ */
+async function enqueueSubmission({ problemCode, code, languageId, callbackRef, trace = null }) {
+  const body = { problem_code: problemCode, source_code: code, language_id: languageId };
+  if (CALLBACKS_ENABLED) {
+    body.callback_url = CF_CALLBACK_URL;
+    body.callback_ref = String(callbackRef);
+  }
+
+  const headers = traceHeaders(trace);
+  try {
+    const res = await axios.post(`${CF_SERVICE_URL}/cf/submit/jobs`, body, { headers });
+    return res.data.jobId;
+  } catch (err) {
+    if (!err.response || err.response.status !== 503) throw err;
+  }
+
+  // cf-service has no accounts (e.g. it restarted) — resync the pool and retry once
+  const count = await withSpan(trace, 'sync_cf_accounts', () => syncCfAccountPool());
+  if (count === 0) throw new Error('NO_ADMIN_CF');
+  const res = await axios.post(`${CF_SERVICE_URL}/cf/submit/jobs`, body, { headers });
+  return res.data.jobId;
+}
+
+/**
+ * Wait for a queued submission to reach Codeforces, store its CF ID and the
+ * account it went through, and hand it to the verdict poller. Marks the
+ * submission SUBMIT_FAILED, with the reason in submitError, if cf-service
+ * gives up on it (expired account cookies report 401). The wait is
+ * recorded as an "await_cf_job" span of the request's `trace`, if sampled.
+ * Runs in background after submission — do NOT await this.
+ */
+async function trackSubmitJob(jobId, submission, trace = null) {
+  const job = await withSpan(trace, 'await_cf_job', (span) => waitForJob(jobId, span), { jobId });
+
+  if (job && job.status === 'done') {
+    const { submission_id: cfSubmissionId, handle: cfHandle } = job.result;
+    const stored = await Submission.findByIdAndUpdate(
+      submission._id,
+      { cfSubmissionId, cfHandle },
+      { new: true },
+    );
+    console.log(`[SubmitJob] Job ${jobId} submitted as ${cfSubmissionId} by ${cfHandle} (attempts: ${job.attempts})`);
+    // The verdict webhook can arrive before the job's long-poll returns
+    if (stored && !PENDING_VERDICTS.includes(stored.verdict)) return;
+    return pollVerdict(submission._id, cfHandle, cfSubmissionId, submission.contestId, {
+      viaCallback: CALLBACKS_ENABLED,
+    });
+  }
+
+  const detail = job && job.error ? job.error.detail : 'job did not complete';
+  const submitError = job && job.error && job.error.status === 401 ? 'CF cookies expired' : detail;
+  console.warn(`[SubmitJob] Job ${jobId} failed: ${detail}`);
+  const updatedSub = await Submission.findByIdAndUpdate(
+    submission._id,
+    { verdict: 'SUBMIT_FAILED', submitError },
+    { new: true },
+  );
+  if (updatedSub) emitSubmissionUpdate(submission.contestId, updatedSub);
+}
+
+/** Long-poll cf-service until the job is done or failed; null if it expired or timed out. */
+async function waitForJob(jobId, span) {
+  const startedAt = Date.now();
+  let job = null;
+
+  while (Date.now() - startedAt < JOB_TIMEOUT) {
+    try {
+      const res = await axios.get(`${CF_SERVICE_URL}/cf/submit/jobs/${jobId}`, {
+        params: { wait: JOB_WAIT },
+        headers: traceHeaders(span),
+      });
+      job = res.data;
+    } catch (error) {
+      if (error.response && error.response.status === 404) break; // expired or service restarted
+      console.error(`[SubmitJob] Error checking job ${jobId}:`, error.message);
+      await new Promise((resolve) => setTimeout(resolve, 5000));
+      continue;
+    }
+    if (job.status === 'done' || job.status === 'failed') break;
+  }
+  if (span && job) Object.assign(span.attrs, { status: job.status, attempts: job.attempts });
+  return job;
+}
+
+module.exports = { enqueueSubmission, trackSubmitJob };
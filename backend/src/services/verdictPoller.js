@@ -6,70 +6,308 @@ const { emitSubmissionUpdate, emitStandingsUpdate } = require('./socketService')
 
 const MAX_ATTEMPTS = 60; // 60 x 5s = 5 minutes max
 const POLL_INTERVAL = 5000; // 5 seconds
+const STANDINGS_DEBOUNCE = 500; // batch standings recomputes for bursts of verdicts
+// Submissions whose verdict cf-service pushes by webhook are only polled every
+// 12th tick (once a minute) as a safety net; 60 is a multiple, so the timeout still fires
+const CALLBACK_POLL_EVERY = 12;
+const PENDING_VERDICTS = ['PENDING', 'TESTING'];
 
-// Track active polls for debugging/testing
+// Pending submissions keyed by `${cfHandle}:${cfSubmissionId}`.
+// One shared tick resolves all of them with a single batched call per handle;
+// a verdict stream per handle delivers final verdicts as soon as cf-service sees them.
+// Submissions registered with a verdict callback skip the stream and most ticks.
 const activePolls = new Map();
+const verdictStreams = new Map(); // handle -> axios response stream
+const pendingStandings = new Set();
+let pollTimer = null;
+let standingsTimer = null;
+// cf-service answers 503 + Retry-After while Codeforces is down; ticks pause until then
+let pausedUntil = 0;
 
 /**
- * Poll CF API for verdict updates.
+ * Register a submission for verdict polling.
  * Runs in background after submission — do NOT await this.
+ * The returned promise settles once a final verdict or VERDICT_TIMEOUT is stored.
+ * With `viaCallback`, cf-service pushes the verdict (receiveVerdict) and polling is only a fallback.
  */
-async function pollVerdict(submissionDbId, cfHandle, cfSubmissionId, contestId) {
+function pollVerdict(submissionDbId, cfHandle, cfSubmissionId, contestId, { viaCallback = false } = {}) {
   const key = `${cfHandle}:${cfSubmissionId}`;
-  activePolls.set(key, { submissionDbId, startedAt: new Date(), attempts: 0 });
 
-  for (let i = 0; i < MAX_ATTEMPTS; i++) {
-    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL));
+  // A rejudge of a submission that is still pending replaces the old entry
+  const previous = activePolls.get(key);
+  if (previous) previous.resolve();
 
-    activePolls.get(key).attempts = i + 1;
+  return new Promise((resolve) => {
+    activePolls.set(key, {
+      submissionDbId,
+      cfHandle,
+      cfSubmissionId,
+      contestId,
+      startedAt: new Date(),
+      attempts: 0,
+      viaCallback,
+      resolve,
+    });
+    if (!viaCallback) openStream(cfHandle);
+    scheduleTick();
+  });
+}
+
+/**
+ * Subscribe to cf-service's Server-Sent Events verdict stream for a handle.
+ * The batched tick keeps running as a fallback if the stream drops.
+ */
+function openStream(handle) {
+  if (verdictStreams.has(handle)) return;
+  verdictStreams.set(handle, null);
+
+  axios
+    .get(`${CF_SERVICE_URL}/cf/verdicts/stream`, { params: { handle }, responseType: 'stream' })
+    .then((res) => {
+      verdictStreams.set(handle, res.data);
+      let buffer = '';
+
+      res.data.on('data', (chunk) => {
+        buffer += chunk.toString();
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+          const raw = buffer.slice(0, end);
+          buffer = buffer.slice(end + 2);
+          handleStreamEvent(handle, raw);
+        }
+      });
+
+      const closed = () => {
+        if (verdictStreams.get(handle) === res.data) verdictStreams.delete(handle);
+      };
+      res.data.on('end', closed);
+      res.data.on('error', closed);
+    })
+    .catch((error) => {
+      console.error(`[VerdictPoller] Verdict stream for ${handle} unavailable:`, error.message);
+      verdictStreams.delete(handle);
+    });
+}
+
+function closeIdleStreams() {
+  const handles = new Set([...activePolls.values()].filter((e) => !e.viaCallback).map((e) => e.cfHandle));
+  for (const [handle, stream] of verdictStreams) {
+    if (!handles.has(handle) && stream) {
+      verdictStreams.delete(handle);
+      stream.destroy();
+    }
+  }
+}
+
+function handleStreamEvent(handle, raw) {
+  let event = 'message';
+  let data = '';
+  for (const line of raw.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) data += line.slice(5).trim();
+  }
+  if (event !== 'verdict' || !data) return;
+
+  let result;
+  try {
+    result = JSON.parse(data);
+  } catch {
+    return;
+  }
 
+  const key = `${handle}:${result.id}`;
+  const entry = activePolls.get(key);
+  if (entry && result.verdict && result.verdict !== 'TESTING') {
+    finalize(key, entry, result).catch((error) =>
+      console.error(`[VerdictPoller] Error updating ${result.id}:`, error.message),
+    );
+  }
+}
+
+function scheduleTick() {
+  if (pollTimer) return;
+  if (activePolls.size === 0) {
+    closeIdleStreams();
+    return;
+  }
+  pollTimer = setTimeout(async () => {
     try {
-      const res = await axios.get(`${CF_SERVICE_URL}/cf/verdict/${cfHandle}/${cfSubmissionId}`);
+      await pollTick();
+    } catch (error) {
+      console.error('[VerdictPoller] Tick failed:', error.message);
+    }
+    pollTimer = null;
+    scheduleTick();
+  }, POLL_INTERVAL);
+}
 
-      const { verdict, testsPassed, timeMs, memoryBytes } = res.data;
+/**
+ * One polling round: batch every pending submission by handle.
+ */
+async function pollTick() {
+  // An outage doesn't count against MAX_ATTEMPTS
+  if (Date.now() < pausedUntil) return;
 
-      console.log(`[VerdictPoller] ${cfSubmissionId} attempt ${i + 1}: ${verdict}`);
+  const byHandle = new Map();
+  for (const [key, entry] of activePolls) {
+    entry.attempts += 1;
+    if (entry.viaCallback && entry.attempts % CALLBACK_POLL_EVERY !== 0) continue;
+    if (!byHandle.has(entry.cfHandle)) byHandle.set(entry.cfHandle, []);
+    byHandle.get(entry.cfHandle).push([key, entry]);
+  }
 
-      if (verdict && verdict !== 'TESTING') {
-        // Final verdict received — update the submission
-        await Submission.findByIdAndUpdate(submissionDbId, {
-          verdict,
-          testsPassed: testsPassed || 0,
-          timeTaken: timeMs || 0,
-          memoryUsed: memoryBytes || 0,
-        });
+  await Promise.all([...byHandle].map(([handle, entries]) => pollHandle(handle, entries)));
+  closeIdleStreams();
+}
 
-        console.log(`[VerdictPoller] ${cfSubmissionId} final verdict: ${verdict}`);
+async function pollHandle(handle, entries) {
+  if (entries.some(([, e]) => !e.viaCallback)) openStream(handle);
 
-        // Update standings
-        try {
-          const standings = await updateStandings(contestId);
-          console.log(`[VerdictPoller] Standings updated for contest ${contestId}`);
+  const submissionIds = entries.map(([, e]) => e.cfSubmissionId).filter((id) => id != null);
+  const verdicts = new Map();
 
-          // Emit real-time events
-          const updatedSub = await Submission.findById(submissionDbId);
-          emitSubmissionUpdate(contestId, updatedSub);
-          emitStandingsUpdate(contestId, standings);
-        } catch (standingsErr) {
-          console.error(`[VerdictPoller] Standings update failed:`, standingsErr.message);
-        }
+  if (submissionIds.length > 0) {
+    try {
+      const res = await axios.post(`${CF_SERVICE_URL}/cf/verdicts`, {
+        handle,
+        submission_ids: submissionIds,
+      });
+      for (const v of res.data.verdicts) verdicts.set(v.id, v);
+      console.log(`[VerdictPoller] ${handle}: polled ${submissionIds.length} pending submissions`);
+    } catch (error) {
+      if (error.response && error.response.status === 503) {
+        const retryAfter = Number(error.response.headers['retry-after']) || POLL_INTERVAL / 1000;
+        pausedUntil = Math.max(pausedUntil, Date.now() + retryAfter * 1000);
+      }
+      console.error(`[VerdictPoller] Error polling ${handle}:`, error.message);
+    }
+  }
 
-        activePolls.delete(key);
-        return;
+  for (const [key, entry] of entries) {
+    const { submissionDbId, cfSubmissionId, attempts } = entry;
+    const result = verdicts.get(cfSubmissionId);
+
+    try {
+      if (entry.finalizing) continue;
+      if (result && result.verdict && result.verdict !== 'TESTING') {
+        await finalize(key, entry, result);
+      } else if (attempts >= MAX_ATTEMPTS) {
+        // Timed out — mark as VERDICT_TIMEOUT
+        await Submission.findByIdAndUpdate(submissionDbId, {
+          verdict: 'VERDICT_TIMEOUT',
+        });
+
+        console.warn(`[VerdictPoller] ${cfSubmissionId} timed out after ${MAX_ATTEMPTS} attempts`);
+        finish(key, entry);
       }
     } catch (error) {
-      console.error(`[VerdictPoller] Error polling ${cfSubmissionId} (attempt ${i + 1}):`, error.message);
+      console.error(`[VerdictPoller] Error updating ${cfSubmissionId}:`, error.message);
     }
   }
+}
 
-  // Timed out — mark as VERDICT_TIMEOUT
-  await Submission.findByIdAndUpdate(submissionDbId, {
-    verdict: 'VERDICT_TIMEOUT',
-  });
+/**
+ * Store a final verdict, notify the contest room and queue a standings refresh.
+ */
+async function finalize(key, entry, result) {
+  if (entry.finalizing) return;
+  entry.finalizing = true;
+
+  const { submissionDbId, cfSubmissionId, contestId, attempts } = entry;
+  const { verdict, testsPassed, timeMs, memoryBytes } = result;
 
-  console.warn(`[VerdictPoller] ${cfSubmissionId} timed out after ${MAX_ATTEMPTS} attempts`);
+  try {
+    const updatedSub = await Submission.findByIdAndUpdate(
+      submissionDbId,
+      {
+        verdict,
+        testsPassed: testsPassed || 0,
+        timeTaken: timeMs || 0,
+        memoryUsed: memoryBytes || 0,
+      },
+      { new: true },
+    );
+
+    console.log(`[VerdictPoller] ${cfSubmissionId} final verdict: ${verdict} (attempt ${attempts})`);
+
+    if (updatedSub) emitSubmissionUpdate(contestId, updatedSub);
+    queueStandingsUpdate(contestId);
+    finish(key, entry);
+  } catch (error) {
+    entry.finalizing = false;
+    throw error;
+  }
+}
+
+/**
+ * Apply a final verdict pushed by cf-service (see routes/internal.js).
+ * Returns 'applied', 'duplicate' (already stored — webhooks may be redelivered)
+ * or 'unknown' (no such submission yet).
+ */
+async function receiveVerdict(result) {
+  const key = `${result.handle}:${result.id}`;
+  const entry = activePolls.get(key);
+  if (entry) {
+    if (entry.finalizing) return 'duplicate';
+    await finalize(key, entry, result);
+    return 'applied';
+  }
+
+  // Not being polled (the backend restarted, or the callback beat trackSubmitJob):
+  // store it only while the submission is still pending
+  const filter = result.ref
+    ? { _id: result.ref }
+    : { cfSubmissionId: result.id, cfHandle: result.handle };
+  const updatedSub = await Submission.findOneAndUpdate(
+    { ...filter, verdict: { $in: PENDING_VERDICTS } },
+    {
+      cfSubmissionId: result.id,
+      cfHandle: result.handle,
+      verdict: result.verdict,
+      testsPassed: result.testsPassed || 0,
+      timeTaken: result.timeMs || 0,
+      memoryUsed: result.memoryBytes || 0,
+    },
+    { new: true },
+  );
+  if (!updatedSub) {
+    return (await Submission.exists(filter)) ? 'duplicate' : 'unknown';
+  }
+
+  console.log(`[VerdictPoller] ${result.id} final verdict: ${result.verdict} (callback)`);
+  emitSubmissionUpdate(updatedSub.contestId, updatedSub);
+  queueStandingsUpdate(updatedSub.contestId);
+  return 'applied';
+}
+
+/**
+ * Recompute standings once per contest for a burst of verdicts, not once per verdict.
+ */
+function queueStandingsUpdate(contestId) {
+  pendingStandings.add(String(contestId));
+  if (standingsTimer) return;
+
+  standingsTimer = setTimeout(async () => {
+    const contestIds = [...pendingStandings];
+    pendingStandings.clear();
+    standingsTimer = null;
+
+    for (const id of contestIds) {
+      try {
+        const standings = await updateStandings(id);
+        console.log(`[VerdictPoller] Standings updated for contest ${id}`);
+        emitStandingsUpdate(id, standings);
+      } catch (standingsErr) {
+        console.error(`[VerdictPoller] Standings update failed:`, standingsErr.message);
+      }
+    }
+  }, STANDINGS_DEBOUNCE);
+}
 
-  activePolls.delete(key);
+function finish(key, entry) {
+  // Only drop the entry if it hasn't been replaced by a rejudge meanwhile
+  if (activePolls.get(key) === entry) activePolls.delete(key);
+  entry.resolve();
 }
 
 /**
@@ -79,4 +317,4 @@ function getActivePollCount() {
   return activePolls.size;
 }
 
-module.exports = { pollVerdict, getActivePollCount };
+module.exports = { pollVerdict, receiveVerdict, getActivePollCount, PENDING_VERDICTS };
@@ -0,0 +1,95 @@
+const crypto = require('crypto');
+const { TRACE_SAMPLE_RATE } = require('../config/env');
+
+const TRACEPARENT_RE = /^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$/;
+
+/**
+ * One timed step of a sampled trace. Written to stdout as a JSON line when
+ * it ends, in the same shape cf-service uses, so cf-service/bench/waterfall.py
+ * can merge both services' logs into one waterfall per trace.
+ */
+class Span {
+  constructor(traceId, parentId, name, attrs = {}) {
+    this.traceId = traceId;
+    this.spanId = crypto.randomBytes(8).toString('hex');
+    this.parentId = parentId;
+    this.name = name;
+    this.attrs = attrs;
+    this.status = 'ok';
+    this.startMs = Date.now();
+    this.started = process.hrtime.bigint();
+  }
+
+  child(name, attrs = {}) {
+    return new Span(this.traceId, this.spanId, name, attrs);
+  }
+
+  /** W3C traceparent for calls made under this span (cf-service joins the trace). */
+  traceparent() {
+    return `00-${this.traceId}-${this.spanId}-01`;
+  }
+
+  end(attrs = {}) {
+    Object.assign(this.attrs, attrs);
+    const durationMs = Number(process.hrtime.bigint() - this.started) / 1e6;
+    console.log(
+      JSON.stringify({
+        type: 'span',
+        service: 'backend',
+        traceId: this.traceId,
+        spanId: this.spanId,
+        parentId: this.parentId,
+        name: this.name,
+        startMs: this.startMs,
+        durationMs: Math.round(durationMs * 1000) / 1000,
+        status: this.status,
+        attrs: this.attrs,
+      }),
+    );
+  }
+}
+
+/**
+ * Root span for an incoming request, ended (with the status code) when the
+ * response is sent. Joins the caller's trace if the request carries a
+ * traceparent header, otherwise samples TRACE_SAMPLE_RATE of requests.
+ * Returns null for unsampled requests; every helper below accepts null.
+ */
+function traceRequest(req, res, name) {
+  const match = TRACEPARENT_RE.exec(req.get('traceparent') || '');
+  let span;
+  if (match) {
+    if (!(parseInt(match[3], 16) & 1)) return null;
+    span = new Span(match[1], match[2], name);
+  } else {
+    if (Math.random() >= TRACE_SAMPLE_RATE) return null;
+    span = new Span(crypto.randomBytes(16).toString('hex'), null, name);
+  }
+  res.on('finish', () => {
+    if (res.statusCode >= 500) span.status = 'error';
+    span.end({ status: res.statusCode });
+  });
+  return span;
+}
+
+/** Run `fn(span)` as a child span of `parent`; just `fn(null)` when not sampled. */
+async function withSpan(parent, name, fn, attrs = {}) {
+  if (!parent) return fn(null);
+  const span = parent.child(name, attrs);
+  try {
+    return await fn(span);
+  } catch (err) {
+    span.status = 'error';
+    span.attrs.error = err.message;
+    throw err;
+  } finally {
+    span.end();
+  }
+}
+
+/** Headers that carry the trace to cf-service ({} when not sampled). */
+function traceHeaders(span) {
+  return span ? { traceparent: span.traceparent() } : {};
+}
+
+module.exports = { traceRequest, withSpan, traceHeaders };
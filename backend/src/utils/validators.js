@@ -49,6 +49,16 @@ const submitValidation = [
   validate,
 ];
 
+const runSamplesValidation = [
+  body('contestId').isMongoId().withMessage('Valid contestId is required'),
+  body('problemId')
+    .matches(/^\d+[A-Z]\d?$/)
+    .withMessage('problemId must match format like "4A" or "1234B1"'),
+  body('code').isLength({ min: 1, max: 100000 }).withMessage('Code must be 1-100000 characters'),
+  body('languageId').matches(/^\d+$/).withMessage('languageId must be a numeric string'),
+  validate,
+];
+
 // Contest validators
 const contestValidation = [
   body('title').trim().isLength({ min: 3, max: 200 }).withMessage('Title must be 3-200 characters'),
@@ -76,6 +86,7 @@ module.exports = {
   registerValidation,
   loginValidation,
   submitValidation,
+  runSamplesValidation,
   contestValidation,
   linkCookiesValidation,
 };
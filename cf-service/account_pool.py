@@ -0,0 +1,128 @@
+"""
+account_pool.py — Pool of Codeforces accounts that submissions are sharded across.
+
+One account is capped at Codeforces' per-account submit rate, so the
+platform's throughput grows with the number of linked accounts. Each
+submission is routed to the least-loaded healthy account: logged in (no
+401 since its cookies were registered) and not cooling down after a
+"You have submitted too often" 429. The handle of the account used is
+returned with the submission so verdicts are looked up under it.
+"""
+
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from session_pool import cookie_key
+
+
+class Account:
+    def __init__(self, handle: str, cookies: str):
+        self.handle = handle
+        self.cookies = cookies
+        self.key = cookie_key(cookies)
+        self.valid = True  # False after CF says the cookies are logged out
+        self.rate_limited_at = deque()  # monotonic times of recent 429s
+        self.submitted = 0
+        self.last_used = 0.0
+        self.last_error: Optional[str] = None
+
+
+class AccountPool:
+    def __init__(self, cooldown: float = 60.0, window: float = 600.0):
+        self.cooldown = cooldown  # skip an account this long after a 429
+        self.window = window  # 429s older than this are forgotten
+        self.accounts = {}  # handle -> Account
+
+    # --- Registration ---
+
+    def register(self, handle: str, cookies: str) -> Account:
+        """Add an account, or replace its cookies (which also clears a 401)."""
+        current = self.accounts.get(handle)
+        if current is not None and current.cookies == cookies:
+            return current
+        account = self.accounts[handle] = Account(handle, cookies)
+        return account
+
+    def remove(self, handle: str) -> Optional[Account]:
+        return self.accounts.pop(handle, None)
+
+    def replace(self, entries: list) -> None:
+        """Make the pool exactly these (handle, cookies) pairs, keeping health of unchanged ones."""
+        wanted = dict(entries)
+        for handle in list(self.accounts):
+            if handle not in wanted:
+                del self.accounts[handle]
+        for handle, cookies in wanted.items():
+            self.register(handle, cookies)
+
+    def by_key(self, key: str) -> Optional[Account]:
+        for account in self.accounts.values():
+            if account.key == key:
+                return account
+        return None
+
+    # --- Routing ---
+
+    def pick(self, load: Callable[[str], int]) -> Optional[Account]:
+        """
+        Least-loaded healthy account, where `load(key)` is the number of
+        submissions queued or in flight for it. Falls back to accounts that
+        are cooling down when none is healthy; never picks a logged-out one.
+        """
+        now = time.monotonic()
+        candidates = [a for a in self.accounts.values() if a.valid]
+        if not candidates:
+            return None
+        healthy = [a for a in candidates if not self._cooling(a, now)] or candidates
+        account = min(
+            healthy,
+            key=lambda a: (load(a.key), self._recent_429s(a, now), a.last_used),
+        )
+        account.last_used = now
+        return account
+
+    def record_success(self, account: Account) -> None:
+        account.submitted += 1
+        account.last_error = None
+
+    def record_failure(self, account: Account, status: int, detail: str) -> None:
+        account.last_error = detail
+        if status == 429:
+            account.rate_limited_at.append(time.monotonic())
+        elif status == 401:
+            account.valid = False
+
+    # --- Health ---
+
+    def _recent_429s(self, account: Account, now: float) -> int:
+        while account.rate_limited_at and now - account.rate_limited_at[0] > self.window:
+            account.rate_limited_at.popleft()
+        return len(account.rate_limited_at)
+
+    def _cooling(self, account: Account, now: float) -> bool:
+        return bool(account.rate_limited_at) and now - account.rate_limited_at[-1] < self.cooldown
+
+    def describe(self, load: Callable[[str], int]) -> list:
+        """Per-account health for /cf/accounts (never includes cookies)."""
+        now = time.monotonic()
+        return [
+            {
+                "handle": a.handle,
+                "valid": a.valid,
+                "coolingDown": self._cooling(a, now),
+                "inFlight": load(a.key),
+                "recent429s": self._recent_429s(a, now),
+                "submitted": a.submitted,
+                "lastError": a.last_error,
+            }
+            for a in self.accounts.values()
+        ]
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "accounts": len(self.accounts),
+            "valid": sum(1 for a in self.accounts.values() if a.valid),
+            "coolingDown": sum(1 for a in self.accounts.values() if self._cooling(a, now)),
+        }
@@ -0,0 +1,148 @@
+"""
+api_client.py — One paced client for the Codeforces public API.
+
+CF allows about one API call every two seconds per client and answers
+bursts with "Call limit exceeded". Every /api call in cf-service goes
+through ApiGovernor: a token bucket paces dispatch, waiting calls are
+served by priority lane (submission-ID resolution, then verdict refresh,
+then metadata), and identical calls that are still queued or in flight
+share one upstream request. With several worker processes the bucket is a
+SharedTokenBucket, so the workers together stay under CF's limit.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from rate_limit import TokenBucket
+
+log = logging.getLogger("cf_service.api")
+
+PRIORITY_SUBMISSION = 0  # resolving the ID of a submission we just made
+PRIORITY_VERDICT = 1  # refreshing verdicts of pending submissions
+PRIORITY_METADATA = 2  # everything else (health probes, problem lists)
+LANE_NAMES = ("submission", "verdict", "metadata")
+
+
+class ApiCall:
+    def __init__(self, key: tuple, method: str, params: dict, priority: int):
+        self.key = key
+        self.method = method
+        self.params = params
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        # Runs in the context of the caller that queued it (its trace, when sampled)
+        self.context = contextvars.copy_context()
+        self.future = asyncio.get_running_loop().create_future()
+        # Every waiter may have given up; don't log an exception nobody reads
+        self.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+
+class ApiGovernor:
+    """
+    `send(method, params)` performs one upstream call and returns its result
+    (or raises). `on_dispatch(lane, waited_seconds)` is called as each call
+    leaves the queue. `bucket` replaces the process-local token bucket.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, dict], Awaitable[Any]],
+        rate_per_minute: float = 30.0,
+        burst: int = 1,
+        on_dispatch: Optional[Callable[[str, float], None]] = None,
+        bucket=None,
+    ):
+        self.send = send
+        self.bucket = bucket or TokenBucket(rate_per_minute / 60, burst)
+        self.on_dispatch = on_dispatch
+        self.lanes = tuple(deque() for _ in LANE_NAMES)
+        self.pending = {}  # (method, params) -> ApiCall, queued or in flight
+        self.in_flight = set()  # asyncio.Task per dispatched call
+        self.last_success = 0.0  # monotonic time of the last call that returned
+        self.calls = 0
+        self.coalesced = 0
+        self.backoffs = 0
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    # --- Public API ---
+
+    async def call(self, method: str, params: dict, priority: int = PRIORITY_METADATA) -> Any:
+        key = (method, tuple(sorted((k, str(v)) for k, v in params.items())))
+        call = self.pending.get(key)
+        if call is None:
+            call = self.pending[key] = ApiCall(key, method, params, priority)
+            self.lanes[priority].append(call)
+            if self._dispatcher is None or self._dispatcher.done():
+                self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        else:
+            self.coalesced += 1
+            if priority < call.priority and call in self.lanes[call.priority]:
+                # A more urgent caller joined: move the shared call up
+                self.lanes[call.priority].remove(call)
+                call.priority = priority
+                self.lanes[priority].append(call)
+        # One caller giving up must not cancel the request for the others
+        return await asyncio.shield(call.future)
+
+    def backoff(self) -> None:
+        """CF said "Call limit exceeded": the next call waits a full interval."""
+        self.backoffs += 1
+        self.bucket.drain()
+
+    def recently_succeeded(self, within: float) -> bool:
+        return time.monotonic() - self.last_success < within
+
+    def stats(self) -> dict:
+        return {
+            "queued": {name: len(lane) for name, lane in zip(LANE_NAMES, self.lanes)},
+            "inFlight": len(self.in_flight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "backoffs": self.backoffs,
+            "ratePerMinute": round(self.bucket.rate * 60, 2),
+        }
+
+    async def shutdown(self) -> None:
+        tasks = list(self.in_flight)
+        if self._dispatcher:
+            tasks.append(self._dispatcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- Internals ---
+
+    async def _dispatch(self) -> None:
+        while any(self.lanes):
+            delay = self.bucket.try_take()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            lane = next(lane for lane in self.lanes if lane)
+            call = lane.popleft()
+            if self.on_dispatch:
+                self.on_dispatch(LANE_NAMES[call.priority], time.monotonic() - call.enqueued_at)
+            # Pacing governs starts; a slow response doesn't hold up the next call
+            task = asyncio.get_running_loop().create_task(self._run(call), context=call.context)
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    async def _run(self, call: ApiCall) -> None:
+        self.calls += 1
+        try:
+            result = await self.send(call.method, call.params)
+        except asyncio.CancelledError:
+            call.future.cancel()
+            raise
+        except Exception as e:
+            call.future.set_exception(e)
+        else:
+            self.last_success = time.monotonic()
+            call.future.set_result(result)
+        finally:
+            self.pending.pop(call.key, None)
@@ -0,0 +1,197 @@
+"""
+asset_mirror.py — Local copies of statement images and attachments.
+
+Statement HTML links images (and the odd PDF/ZIP attachment) on Codeforces'
+CDN, which is slow or blocked for some participants. AssetMirror rewrites
+those links to a path served by cf-service, then downloads each asset once
+in the background (bounded concurrency) into a content-addressed store:
+
+    <root>/objects/ab/abcdef...   file contents, named by SHA-256
+    <root>/urls/<key>.json        {"url", "digest", "contentType"} per source URL
+
+The link key is a hash of the source URL, so statements can be rewritten
+before the download finishes; until it has, the asset route redirects to
+the original URL.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urljoin, urlparse
+
+log = logging.getLogger("cf_service.assets")
+
+ASSET_LINK_RE = re.compile(
+    r"""(<img\b[^>]*?\bsrc\s*=\s*|<a\b[^>]*?\bhref\s*=\s*)(["'])([^"']+)\2""",
+    re.IGNORECASE,
+)
+KEY_RE = re.compile(r"[0-9a-f]{32}")
+# Links (<a href>) are only mirrored when they look like a downloadable file
+ATTACHMENT_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".bmp", ".pdf", ".zip", ".txt",
+}
+RETRY_FAILED_AFTER = 300.0  # seconds before a failed download is attempted again
+
+
+def asset_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+def _extension(url: str) -> str:
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    return ext if ext in ATTACHMENT_EXTENSIONS else ""
+
+
+class AssetMirror:
+    """
+    `fetch(url)` downloads one asset and returns (bytes, content type),
+    raising on failure. Links are rewritten to `{public_path}/{key}{ext}`.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        fetch: Callable[[str], Awaitable[tuple]],
+        public_path: str,
+        base_url: str,
+        concurrency: int = 4,
+        max_bytes: int = 10 * 1024 * 1024,
+    ):
+        self.root = root
+        self.fetch = fetch
+        self.public_path = public_path.rstrip("/")
+        self.base_url = base_url
+        self.max_bytes = max_bytes
+        self.meta = {}  # key -> metadata dict, filled lazily from disk
+        self.failed_at = {}  # key -> monotonic time of the last failed download
+        self.tasks = {}  # key -> download task
+        self.downloaded = 0
+        self.failures = 0
+        self.bytes = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "urls"), exist_ok=True)
+
+    # --- Public API ---
+
+    def rewrite(self, html: str) -> str:
+        """Point every mirrorable link at the local route and queue what isn't stored yet."""
+
+        def replace(match: re.Match) -> str:
+            prefix, quote, link = match.groups()
+            url = self._absolute(link)
+            if url is None or (prefix.lower().startswith("<a") and not _extension(url)):
+                return match.group(0)
+            key = asset_key(url)
+            meta = self.meta.get(key)
+            if meta is None:
+                meta = self.meta[key] = self._read_meta(key) or self._write_meta(key, {"url": url})
+            if not meta.get("digest"):
+                self.schedule(key, url)
+            return f"{prefix}{quote}{self.public_path}/{key}{_extension(url)}{quote}"
+
+        return ASSET_LINK_RE.sub(replace, html)
+
+    def lookup(self, name: str) -> Optional[dict]:
+        """Metadata for a route name (key plus optional extension), or None if unknown."""
+        key = name.split(".", 1)[0]
+        if not KEY_RE.fullmatch(key):
+            return None
+        meta = self.meta.get(key)
+        if meta is None:
+            meta = self._read_meta(key)
+            if meta is not None:
+                self.meta[key] = meta
+        return meta
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def schedule(self, key: str, url: str) -> None:
+        """Download in the background unless it is already running or recently failed."""
+        if key in self.tasks:
+            return
+        failed = self.failed_at.get(key)
+        if failed is not None and time.monotonic() - failed < RETRY_FAILED_AFTER:
+            return
+        task = asyncio.get_running_loop().create_task(self._download(key, url))
+        self.tasks[key] = task
+        task.add_done_callback(lambda _: self.tasks.pop(key, None))
+
+    def stats(self) -> dict:
+        return {
+            "known": len(self.meta),
+            "downloading": len(self.tasks),
+            "downloaded": self.downloaded,
+            "failed": self.failures,
+            "bytes": self.bytes,
+        }
+
+    async def shutdown(self) -> None:
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- Internals ---
+
+    def _absolute(self, link: str) -> Optional[str]:
+        url = urljoin(self.base_url + "/", link.strip())
+        if urlparse(url).scheme not in ("http", "https"):
+            return None  # data:, javascript:, mailto: ...
+        if url.startswith(self.public_path + "/") or link.startswith(self.public_path + "/"):
+            return None  # already rewritten
+        return url
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, "urls", f"{key}.json")
+
+    def _read_meta(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key: str, meta: dict) -> dict:
+        path = self._meta_path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+        return meta
+
+    def _store(self, key: str, url: str, body: bytes, content_type: str) -> dict:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):  # same bytes under another URL are stored once
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        return self._write_meta(key, {"url": url, "digest": digest, "contentType": content_type})
+
+    async def _download(self, key: str, url: str) -> None:
+        async with self._semaphore:
+            try:
+                body, content_type = await self.fetch(url)
+                if len(body) > self.max_bytes:
+                    raise ValueError(f"{len(body)} bytes exceeds the {self.max_bytes} byte limit")
+                meta = await asyncio.to_thread(self._store, key, url, body, content_type)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                self.failed_at[key] = time.monotonic()
+                log.warning("Mirroring %s failed: %s", url, e)
+                return
+        self.meta[key] = meta
+        self.failed_at.pop(key, None)
+        self.downloaded += 1
+        self.bytes += len(body)
@@ -0,0 +1,57 @@
+"""
+bench_async.py — Sync vs async cf_service against a local fake Codeforces.
+
+Starts bench.fake_cf with artificial upstream latency, then runs the same
+closed-loop load against the sync baseline (bench.sync_reference) and the
+async service (cf_service), reporting requests/sec and p50/p95/p99.
+
+Run from cf-service/:
+    python -m bench.bench_async --concurrency 200 --requests 2000 --latency-ms 200
+"""
+
+import argparse
+import asyncio
+
+from bench.common import closed_loop, print_table, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=int, default=200)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9101)
+    args = parser.parse_args()
+
+    fake_env = {"FAKE_CF_LATENCY_MS": str(args.latency_ms)}
+    rows = []
+    with serve("bench.fake_cf:app", args.fake_port, fake_env) as fake_url:
+        # Problem cache off: measure the upstream path, not cache hits. The API
+        # governor's 30/min default would pace the verdict run, not the service
+        service_env = {
+            "CF_BASE_URL": fake_url,
+            "CF_PROBLEM_CACHE_SIZE": "0",
+            "CF_API_RATE_PER_MIN": "1000000",
+        }
+        for label, app in [("sync", "bench.sync_reference:app"), ("async", "cf_service:app")]:
+            with serve(app, args.port, service_env) as base:
+                for endpoint, urls in [
+                    ("problem", [f"{base}/cf/problem/{1000 + i}/A" for i in range(50)]),
+                    ("verdict", [f"{base}/cf/verdict/fake_admin/{i}" for i in range(50)]),
+                ]:
+                    rows.append(
+                        asyncio.run(
+                            closed_loop(f"{label} {endpoint}", urls, args.concurrency, args.requests)
+                        )
+                    )
+
+    print(
+        f"\nupstream latency {args.latency_ms} ms, concurrency {args.concurrency}, "
+        f"{args.requests} requests per row\n"
+    )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+bench_attribution.py — Are concurrent submits on one account given the right IDs?
+
+Starts bench.fake_cf, then cf_service in a few setups, and fires --jobs
+submissions at once through one account (JSESSIONID=bench) over a handful
+of problems, so many are for the same problem within seconds of each other.
+Every source is unique; the fake's /_fake/submissions maps each source to
+the ID Codeforces really gave it, and each job's reported ID is checked
+against that:
+
+    status page    1 worker, status page rows carry IDs (the usual path)
+    api match      1 worker, status page without IDs: every ID comes from
+                   SubmissionMatcher
+    api match xN   N workers sharing the account (shared store), status page
+                   without IDs: submits interleave across processes
+
+Reported: jobs, correct / wrong / missing IDs, wall time until every job
+settled, and the user.status calls and source-page loads it took.
+
+Run from cf-service/:
+    python -m bench.bench_attribution --jobs 30 --problems 3 --workers 3
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from curl_cffi import requests as cf_requests
+
+from bench.common import print_table, serve
+
+COLUMNS = ["name", "jobs", "correct", "wrong", "missing", "seconds", "api_calls", "source_views"]
+
+
+async def run_jobs(base: str, jobs: int, problems: int, tag: str) -> dict:
+    """Queue every job at once, wait for all; source -> reported submission ID."""
+    async with cf_requests.AsyncSession(max_clients=jobs) as client:
+
+        async def one(i: int):
+            source = f"// {tag} job {i}\nint main() {{ return {i}; }}\n"
+            r = await client.post(
+                f"{base}/cf/submit/jobs",
+                json={
+                    "cookies": "JSESSIONID=bench",
+                    "problem_code": f"{2000 + i % problems}/A",
+                    "source_code": source,
+                    "language_id": "54",
+                },
+                timeout=60,
+            )
+            job_id = r.json()["jobId"]
+            while True:
+                job = (await client.get(f"{base}/cf/submit/jobs/{job_id}", params={"wait": 30}, timeout=60)).json()
+                if job["status"] in ("done", "failed"):
+                    return source, (job["result"] or {}).get("submission_id")
+
+        return dict(await asyncio.gather(*(one(i) for i in range(jobs))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=30)
+    parser.add_argument("--problems", type=int, default=3, help="distinct problems the jobs are spread over")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9101)
+    args = parser.parse_args()
+
+    setups = [
+        ("status page", 1, 1),
+        ("api match", 1, 0),
+        (f"api match x{args.workers}", args.workers, 0),
+    ]
+    rows = []
+    fake_env = {"FAKE_CF_LATENCY_MS": str(args.latency_ms)}
+    with serve("bench.fake_cf:app", args.fake_port, fake_env) as fake_url, \
+            tempfile.TemporaryDirectory() as state_dir:
+        for name, workers, status_ids in setups:
+            cf_requests.post(f"{fake_url}/_fake/config", json={"status_ids": status_ids})
+            service_env = {
+                "CF_BASE_URL": fake_url,
+                "CF_ASSET_DIR": "",
+                "CF_COOKIE_JAR_KEY": "",
+                "CF_TRACE_SAMPLE_RATE": "0",
+                "CF_SUBMIT_RATE_PER_MIN": "600",  # one submit every 100 ms per account
+                "CF_SUBMIT_BURST": "1",
+                "CF_API_RATE_PER_MIN": "600",
+            }
+            if workers > 1:
+                service_env["CF_SHARED_STATE"] = os.path.join(state_dir, f"{workers}.db")
+            with serve("cf_service:app", args.port, service_env, workers=workers) as base:
+                before = cf_requests.get(f"{fake_url}/_fake/stats").json()
+                started = time.perf_counter()
+                reported = asyncio.run(run_jobs(base, args.jobs, args.problems, name))
+                elapsed = time.perf_counter() - started
+                after = cf_requests.get(f"{fake_url}/_fake/stats").json()
+            truth = {s["source"]: s["id"] for s in cf_requests.get(f"{fake_url}/_fake/submissions").json()}
+            rows.append({
+                "name": name,
+                "jobs": args.jobs,
+                "correct": sum(1 for src, sid in reported.items() if sid is not None and truth.get(src) == sid),
+                "wrong": sum(1 for src, sid in reported.items() if sid is not None and truth.get(src) != sid),
+                "missing": sum(1 for sid in reported.values() if sid is None),
+                "seconds": round(elapsed, 2),
+                "api_calls": after["apiCalls"] - before["apiCalls"],
+                "source_views": after["sourceViews"] - before["sourceViews"],
+            })
+
+    print(f"\n{args.jobs} jobs over {args.problems} problems, upstream latency {args.latency_ms} ms\n")
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
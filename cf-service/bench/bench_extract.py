@@ -0,0 +1,133 @@
+"""
+bench_extract.py — Micro-benchmarks for every HTML extractor in cf-service.
+
+Times each extractor on the saved pages in bench/fixtures (problem pages,
+logged-in / logged-out homepages, submit and status pages) and reports the
+per-call time and the peak memory allocated during one call. Results are
+compared with bench/extract_baseline.json; the run exits non-zero if any
+case got slower or allocates more than the threshold allows.
+
+Run from cf-service/:
+    python -m bench.bench_extract                   # compare with the baseline
+    python -m bench.bench_extract --update-baseline # after an intended change
+    python -m bench.bench_extract --threshold 0.25  # stricter gate
+
+Timings are machine-dependent: regenerate the baseline on the machine that
+runs the comparison.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+from page_extract import (
+    extract_csrf_token,
+    extract_handle,
+    extract_logged_in_handle,
+    extract_submission_id,
+)
+from problem_parser import parse_problem_page
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(BENCH_DIR, "fixtures")
+BASELINE = os.path.join(BENCH_DIR, "extract_baseline.json")
+ALLOC_SLACK = 1024  # bytes; tiny pages shouldn't fail on allocator noise
+
+# (extractor name, function, fixture globs relative to bench/fixtures)
+CASES = [
+    ("problem_page", parse_problem_page, ["problems/*.html"]),
+    ("logged_in_handle", extract_logged_in_handle, ["pages/homepage_*.html"]),
+    ("csrf_token", extract_csrf_token, ["pages/submit_page.html", "pages/status_page.html",
+                                        "pages/homepage_logged_out.html"]),
+    ("submission_id", extract_submission_id, ["pages/status_page.html"]),
+    ("status_handle", extract_handle, ["pages/status_page.html"]),
+]
+
+
+def fixtures(patterns: list) -> list:
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(os.path.join(FIXTURES, pattern))))
+    return paths
+
+
+def measure(fn, html: str) -> tuple:
+    """(best per-call seconds over 5 timed batches, peak bytes allocated by one call)."""
+    timer = timeit.Timer(lambda: fn(html))
+    number, _ = timer.autorange()
+    per_call = min(timer.repeat(repeat=5, number=number)) / number
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak
+
+
+def run() -> dict:
+    results = {}
+    for name, fn, patterns in CASES:
+        for path in fixtures(patterns):
+            with open(path, encoding="utf-8") as f:
+                html = f.read()
+            per_call, peak = measure(fn, html)
+            key = f"{name}:{os.path.relpath(path, FIXTURES)}"
+            results[key] = {"us": round(per_call * 1e6, 2), "peakBytes": peak, "sizeBytes": len(html)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="allowed slowdown / allocation growth vs baseline (0.5 = +50%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE)
+    args = parser.parse_args()
+
+    results = run()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    print(f"{'case':58} {'KB':>6} {'us/call':>10} {'base us':>10} {'peak KB':>8} {'base KB':>8}")
+    for key, r in results.items():
+        base = baseline.get(key)
+        flag = ""
+        if base:
+            slower = r["us"] > base["us"] * (1 + args.threshold)
+            heavier = r["peakBytes"] > base["peakBytes"] * (1 + args.threshold) + ALLOC_SLACK
+            if slower or heavier:
+                flag = "  REGRESSED" + (" (time)" if slower else "") + (" (alloc)" if heavier else "")
+                regressions.append(key)
+        print(
+            f"{key[:58]:58} {r['sizeBytes'] / 1024:6.1f} {r['us']:10.2f} "
+            f"{(base['us'] if base else float('nan')):10.2f} "
+            f"{r['peakBytes'] / 1024:8.1f} "
+            f"{(base['peakBytes'] / 1024 if base else float('nan')):8.1f}{flag}"
+        )
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {os.path.relpath(args.baseline)}")
+        return
+
+    if not baseline:
+        print("\nNo baseline yet — run with --update-baseline to record one.")
+        return
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed beyond +{args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond +{args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
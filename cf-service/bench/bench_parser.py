@@ -0,0 +1,61 @@
+"""
+bench_parser.py — Problem-page parse time and peak memory: regex pile vs structured parser.
+
+Runs bench.regex_reference.parse_problem_html (the original regexes) and
+problem_parser.parse_problem_page over every page in bench/fixtures/problems
+(drop real saved Codeforces pages in there to extend the corpus) and reports
+median time per parse and tracemalloc peak per parse.
+
+Run from cf-service/:
+    python -m bench.bench_parser --repeat 50
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import time
+import tracemalloc
+
+from bench.regex_reference import parse_problem_html
+from problem_parser import parse_problem_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "problems")
+
+
+def measure(fn, html: str, repeat: int) -> tuple:
+    fn(html)  # warm up (regex compile cache etc.)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--fixtures", default=FIXTURES)
+    args = parser.parse_args()
+
+    print(f"{'page':32} {'size KB':>8} {'regex ms':>9} {'parser ms':>9} {'regex KB':>9} {'parser KB':>9}")
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        old_t, old_mem = measure(parse_problem_html, html, args.repeat)
+        new_t, new_mem = measure(parse_problem_page, html, args.repeat)
+        print(
+            f"{os.path.basename(path)[:32]:32} {len(html) / 1024:8.1f} "
+            f"{old_t * 1000:9.3f} {new_t * 1000:9.3f} "
+            f"{old_mem / 1024:9.1f} {new_mem / 1024:9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+bench_problem_index.py — Problemset search: ProblemIndex vs scanning the problem list.
+
+Builds problem_index.ProblemIndex from a synthetic problemset.problems
+result (bench.fake_cf.fake_problemset, --size problems) and reports the
+build time, the time of a refresh that changes nothing, and the memory the
+index holds. Then runs a set of queries (rating range, tags, name
+substring, combinations, deep pages) against the index and against a plain
+scan over the list of problem dicts, checks that both return the same
+total and page, and reports the median time of each.
+
+Name queries are timed twice: "cold" clears the index's name cache before
+every run, "warm" is a repeated query (search-as-you-type).
+
+Run from cf-service/:
+    python -m bench.bench_problem_index --size 10000 --repeat 200
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from bench.common import print_table
+from bench.fake_cf import fake_problemset
+from problem_index import ProblemIndex
+
+QUERIES = [
+    ("everything", {}),
+    ("rating 1500-1800", {"min_rating": 1500, "max_rating": 1800}),
+    ("tags dp+greedy", {"tags": ["dp", "greedy"]}),
+    ("tags dp|graphs", {"tags": ["dp", "graphs"], "match_all": False}),
+    ("rating + tag", {"min_rating": 1500, "max_rating": 1800, "tags": ["dp"]}),
+    ("name 'lucky'", {"q": "lucky"}),
+    ("name 'a'", {"q": "a"}),
+    ("code '1234'", {"q": "1234"}),
+    ("name + tag", {"q": "lucky", "tags": ["dp"]}),
+    ("page at 5000", {"offset": 5000}),
+]
+
+
+def scan(problems: list, q="", min_rating=None, max_rating=None, tags=(), match_all=True, limit=50, offset=0):
+    """The same query answered by looking at every problem."""
+    found = []
+    for p in problems:
+        rating = p.get("rating")
+        if min_rating is not None or max_rating is not None:
+            if not rating or (min_rating is not None and rating < min_rating):
+                continue
+            if max_rating is not None and rating > max_rating:
+                continue
+        if tags:
+            have = [t in p.get("tags", ()) for t in tags]
+            if not (all(have) if match_all else any(have)):
+                continue
+        if q and q not in f"{p['contestId']}{p['index']} {p['name']}".lower():
+            continue
+        found.append(p)
+    return len(found), found[offset:offset + limit]
+
+
+def median_us(fn, repeat: int, before=None) -> float:
+    times = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    result = fake_problemset(args.size)
+    problems = result["problems"]
+
+    index = ProblemIndex()
+    start = time.perf_counter()
+    index.load(result)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    index.load(result)
+    refresh_ms = (time.perf_counter() - start) * 1000
+
+    tracemalloc.start()
+    measured = ProblemIndex()
+    measured.load(result)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{len(problems)} problems, {len(index.tags)} tags: build {build_ms:.1f} ms, "
+        f"unchanged refresh {refresh_ms:.1f} ms, index holds {held / 1024:.0f} KB"
+    )
+    print()
+
+    rows = []
+    for name, query in QUERIES:
+        total, page = index.search(**query)
+        expected_total, expected = scan(problems, **query)
+        same = total == expected_total and [(p["contestId"], p["index"]) for p in page] == [
+            (p["contestId"], p["index"]) for p in expected
+        ]
+        row = {
+            "query": name,
+            "matches": total,
+            "same": "yes" if same else "NO",
+            "index_us": median_us(lambda: index.search(**query), args.repeat),
+            "cold_us": "",
+            "scan_us": median_us(lambda: scan(problems, **query), max(1, args.repeat // 10)),
+        }
+        if query.get("q"):
+            row["cold_us"] = median_us(lambda: index.search(**query), args.repeat, index._name_cache.clear)
+        rows.append(row)
+    print_table(rows, ["query", "matches", "same", "index_us", "cold_us", "scan_us"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+bench_warmup.py — Startup to first fast submission, with and without a saved cookie jar.
+
+Starts bench.fake_cf with a Cloudflare-style challenge: a site page
+requested without a cf_clearance cookie is delayed by --challenge-ms and
+then sets one. cf_service is then started twice on the same encrypted
+cookie jar file:
+
+    cold   empty jar, as on every restart before jars were saved: ready as
+           soon as it boots, the account pool is pushed afterwards (as the
+           backend does), and the first submit pays for the challenge
+    warm   restarted on the jar the cold run saved at shutdown: warm-up
+           restores cookies and the pool and primes CSRF tokens before
+           /health/ready turns 200
+
+Reported per run: spawn to ready, the first submit's latency, spawn to first
+submit done, a later submit's latency, and challenges served by the fake.
+
+Run from cf-service/:
+    python -m bench.bench_warmup --challenge-ms 1500 --latency-ms 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from curl_cffi import requests as cf_requests
+
+from bench.common import print_table, serve
+from bench.fake_cf import HANDLE
+
+COLUMNS = ["name", "ready_ms", "first_submit_ms", "start_to_submit_ms", "steady_submit_ms", "challenges"]
+
+
+def submit(base: str, seq: int) -> float:
+    started = time.perf_counter()
+    r = cf_requests.post(
+        f"{base}/cf/submit",
+        json={"problem_code": "1000A", "source_code": f"// warmup {seq}", "language_id": "54"},
+        timeout=60,
+    )
+    r.raise_for_status()
+    return time.perf_counter() - started
+
+
+def challenges(fake_url: str) -> int:
+    return cf_requests.get(f"{fake_url}/_fake/stats", timeout=5).json()["challenges"]
+
+
+def run(name: str, fake_url: str, args, env: dict, push_accounts: bool) -> dict:
+    before = challenges(fake_url)
+    spawned = time.perf_counter()
+    with serve("cf_service:app", args.port, env, ready_path="/health/ready") as base:
+        ready = time.perf_counter()
+        if push_accounts:
+            accounts = [{"handle": HANDLE, "cookies": "JSESSIONID=bench-warmup"}]
+            cf_requests.put(f"{base}/cf/accounts", json={"accounts": accounts}, timeout=10)
+        first = submit(base, 1)
+        done = time.perf_counter()
+        steady = submit(base, 2)
+    return {
+        "name": name,
+        "ready_ms": round((ready - spawned) * 1000),
+        "first_submit_ms": round(first * 1000),
+        "start_to_submit_ms": round((done - spawned) * 1000),
+        "steady_submit_ms": round(steady * 1000),
+        "challenges": challenges(fake_url) - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--challenge-ms", type=int, default=1500)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9101)
+    args = parser.parse_args()
+
+    fake_env = {"FAKE_CF_LATENCY_MS": str(args.latency_ms), "FAKE_CF_CHALLENGE_MS": str(args.challenge_ms)}
+    with serve("bench.fake_cf:app", args.fake_port, fake_env) as fake_url, \
+            tempfile.TemporaryDirectory() as data_dir:
+        env = {
+            "CF_BASE_URL": fake_url,
+            "CF_COOKIE_JAR": os.path.join(data_dir, "cookies.jar"),
+            "CF_COOKIE_JAR_KEY": os.urandom(32).hex(),
+            "CF_SUBMIT_RATE_PER_MIN": "6000",  # time the submits, not the queue's pacing
+            "CF_HEALTH_INTERVAL": "3600",  # keep probes from warming sessions behind our back
+            "CF_ASSET_DIR": "",
+        }
+        rows = [
+            run("cold", fake_url, args, env, push_accounts=True),
+            run("warm", fake_url, args, env, push_accounts=False),
+        ]
+
+    print(f"\nchallenge {args.challenge_ms} ms, upstream latency {args.latency_ms} ms\n")
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
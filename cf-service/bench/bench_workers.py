@@ -0,0 +1,103 @@
+"""
+bench_workers.py — cf_service throughput with 1..N worker processes.
+
+Starts bench.fake_cf once, then cf_service with 1, 2, ... N uvicorn workers
+sharing one SharedStore (a fresh SQLite file per run), and runs the same
+closed-loop load against each:
+
+    problem miss   every request a problem nobody fetched yet: upstream
+                   fetch + parse + shared-store write (the CPU-bound path)
+    problem hit    a few hot problems, served from the local/shared cache
+    verdict        verdicts of one handle's submissions (made up front):
+                   one worker polls user.status, the others follow the store
+
+Speedup is relative to the 1-worker row of the same kind. Parsing is
+GIL-bound, so the miss row can only scale up to the number of CPU cores
+(minus what bench.fake_cf and the load generator use).
+
+Run from cf-service/:
+    python -m bench.bench_workers --max-workers 4 --concurrency 64 --requests 1000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+
+from curl_cffi import requests as cf_requests
+
+from bench.common import closed_loop, print_table, serve
+from bench.fake_cf import HANDLE
+
+COLUMNS = ["name", "workers", "requests", "errors", "rps", "speedup", "p50_ms", "p95_ms", "p99_ms"]
+
+
+def submit(base: str, count: int) -> list:
+    """Make `count` submissions on the fake so the verdict row has real IDs to look up."""
+    ids = []
+    for i in range(count):
+        r = cf_requests.post(
+            f"{base}/cf/submit",
+            json={
+                "cookies": "JSESSIONID=bench",
+                "problem_code": f"{1000 + i}A",
+                "source_code": f"// bench {i}",
+                "language_id": "54",
+            },
+            timeout=60,
+        )
+        ids.append(r.json()["submission_id"])
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=int, default=20)
+    parser.add_argument("--submissions", type=int, default=20, help="submissions made for the verdict row")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9101)
+    args = parser.parse_args()
+
+    fake_env = {"FAKE_CF_LATENCY_MS": str(args.latency_ms)}
+    rows = []
+    baseline = {}
+    submission_ids = []
+    with serve("bench.fake_cf:app", args.fake_port, fake_env) as fake_url, \
+            tempfile.TemporaryDirectory() as state_dir:
+        for workers in range(1, args.max_workers + 1):
+            service_env = {
+                "CF_BASE_URL": fake_url,
+                "CF_SHARED_STATE": os.path.join(state_dir, f"workers-{workers}.db"),
+                "CF_ASSET_DIR": "",
+                "CF_SUBMIT_RATE_PER_MIN": "6000",  # the fake doesn't pace submissions
+            }
+            with serve("cf_service:app", args.port, service_env, workers=workers) as base:
+                if not submission_ids:
+                    submission_ids = submit(base, args.submissions)
+                # Distinct contest IDs per run, so no run is served from an earlier one's cache
+                first = 100000 * workers
+                loads = [
+                    ("problem miss", [f"{base}/cf/problem/{first + i}/A" for i in range(args.requests)]),
+                    ("problem hit", [f"{base}/cf/problem/{1000 + i}/A" for i in range(10)]),
+                    ("verdict", [f"{base}/cf/verdict/{HANDLE}/{sid}" for sid in submission_ids]),
+                ]
+                for name, urls in loads:
+                    row = asyncio.run(closed_loop(name, urls, args.concurrency, args.requests))
+                    baseline.setdefault(name, row["rps"])
+                    row["workers"] = workers
+                    row["speedup"] = round(row["rps"] / baseline[name], 2) if baseline[name] else 0.0
+                    rows.append(row)
+
+    rows.sort(key=lambda r: (r["name"], r["workers"]))
+    print(
+        f"\n{os.cpu_count()} CPU(s), upstream latency {args.latency_ms} ms, "
+        f"concurrency {args.concurrency}, {args.requests} requests per row\n"
+    )
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
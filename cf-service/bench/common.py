@@ -0,0 +1,106 @@
+"""
+common.py — Shared helpers for the cf-service benchmarks.
+
+Starts uvicorn apps as subprocesses and drives them with a closed-loop
+async load generator, reporting throughput and latency percentiles.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from curl_cffi import requests as cf_requests
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def serve(app: str, port: int, env: dict = None, workers: int = 1, ready_path: str = "/openapi.json"):
+    """Run `uvicorn <app>` from the cf-service directory for the duration of the block,
+    entering it once `ready_path` answers 200."""
+    cmd = [
+        sys.executable, "-m", "uvicorn", app,
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=SERVICE_DIR, env={**os.environ, **(env or {})})
+    try:
+        wait_ready(f"http://127.0.0.1:{port}{ready_path}")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def wait_ready(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if cf_requests.get(url, timeout=5).status_code == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def summarize(name: str, latencies: list, errors: int, elapsed: float) -> dict:
+    return {
+        "name": name,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": round((len(latencies) + errors) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+async def closed_loop(name: str, urls: list, concurrency: int, total: int) -> dict:
+    """Issue `total` GETs cycling through `urls`, `concurrency` at a time."""
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async with cf_requests.AsyncSession(max_clients=concurrency) as client:
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    r = await client.get(urls[i % len(urls)], timeout=120)
+                    ok = r.status_code < 500
+                except Exception:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(name, latencies, errors, elapsed)
+
+
+def print_table(rows: list, cols: list = None) -> None:
+    cols = cols or ["name", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in cols))
@@ -0,0 +1,342 @@
+"""
+fake_cf.py — Local stand-in for codeforces.com used by the benchmarks.
+
+Serves just enough of the site for cf_service to run end to end: homepage,
+submit page + submit POST, status page, submission pages (source), problem
+pages (with a statement image), api/user.status and api/problemset.problems.
+
+Run:  uvicorn bench.fake_cf:app --port 9000
+Then: CF_BASE_URL=http://127.0.0.1:9000 uvicorn cf_service:app
+
+Knobs (env, or at runtime via POST /_fake/config with a JSON object of the
+lower-case names below, e.g. {"cloudflare_rate": 0.1}):
+    FAKE_CF_LATENCY_MS       latency_ms       added to every response (default 100)
+    FAKE_CF_JITTER_MS        jitter_ms        plus uniform random 0..jitter (default 0)
+    FAKE_CF_CLOUDFLARE_RATE  cloudflare_rate  fraction of site pages answered with a
+                                              Cloudflare "Attention Required" 403 (default 0)
+    FAKE_CF_CHALLENGE_MS     challenge_ms     extra delay for a site page requested without a
+                                              cf_clearance cookie, which it then sets, like
+                                              solving a Cloudflare challenge (default 0)
+    FAKE_CF_SUBMIT_INTERVAL  submit_interval  seconds an account must wait between submits;
+                                              faster ones get "You have submitted too often"
+                                              (default 0 = never)
+    FAKE_CF_QUEUE_SECONDS    queue_seconds    time a submission sits "In queue" (default 0)
+    FAKE_CF_JUDGE_SECONDS    judge_seconds    time spent TESTING after that (default 0)
+    FAKE_CF_VERDICTS         verdicts         comma-separated final verdicts, assigned
+                                              round-robin (default "OK")
+    FAKE_CF_PROBLEMSET_SIZE  problemset_size  problems listed by api/problemset.problems
+                                              (default 10000)
+    FAKE_CF_STATUS_IDS       status_ids       1 = status page rows carry data-submission-id,
+                                              0 = they don't, forcing attribution via the API
+                                              (default 1)
+
+GET /_fake/stats reports how many pages, blocks and rate-limited submits were served;
+GET /_fake/submissions lists every submission's ID and source, newest first.
+"""
+
+import asyncio
+import html
+import itertools
+import os
+import random
+import time
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+
+HANDLE = "fake_admin"
+CSRF_TOKEN = "0123456789abcdef0123456789abcdef"
+TESTS_PER_PROBLEM = 20
+
+CONFIG = {
+    "latency_ms": float(os.environ.get("FAKE_CF_LATENCY_MS", "100")),
+    "jitter_ms": float(os.environ.get("FAKE_CF_JITTER_MS", "0")),
+    "cloudflare_rate": float(os.environ.get("FAKE_CF_CLOUDFLARE_RATE", "0")),
+    "challenge_ms": float(os.environ.get("FAKE_CF_CHALLENGE_MS", "0")),
+    "submit_interval": float(os.environ.get("FAKE_CF_SUBMIT_INTERVAL", "0")),
+    "queue_seconds": float(os.environ.get("FAKE_CF_QUEUE_SECONDS", "0")),
+    "judge_seconds": float(os.environ.get("FAKE_CF_JUDGE_SECONDS", "0")),
+    "verdicts": os.environ.get("FAKE_CF_VERDICTS", "OK"),
+    "status_ids": int(os.environ.get("FAKE_CF_STATUS_IDS", "1")),
+    "problemset_size": int(os.environ.get("FAKE_CF_PROBLEMSET_SIZE", "10000")),
+}
+PROBLEM_TAGS = [
+    "implementation", "math", "greedy", "dp", "data structures", "brute force",
+    "constructive algorithms", "graphs", "sortings", "binary search", "dfs and similar",
+    "trees", "strings", "number theory", "combinatorics", "*special", "two pointers",
+    "bitmasks", "geometry", "dsu", "shortest paths", "probabilities", "divide and conquer",
+    "hashing", "games", "interactive", "flows", "matrices", "fft", "graph matchings",
+    "string suffix structures", "ternary search", "expression parsing", "meet-in-the-middle",
+    "2-sat", "chinese remainder theorem", "schedules",
+]
+
+app = FastAPI(title="Fake Codeforces")
+
+_submission_ids = itertools.count(300000000)
+_submissions = []  # newest first: (record, submitted_at, final verdict)
+_last_submit = {}  # JSESSIONID -> time of last accepted submit
+_sources = {}  # submission ID -> source code
+_final_verdicts = itertools.count()
+STATS = {
+    "requests": 0, "cloudflareBlocks": 0, "challenges": 0, "rateLimited": 0, "submissions": 0,
+    "sourceViews": 0, "apiCalls": 0,
+}
+
+CLOUDFLARE_PAGE = (
+    "<!DOCTYPE html><html><head><title>Attention Required! | Cloudflare</title></head>"
+    "<body><h1>Sorry, you have been blocked</h1>"
+    "<p>This website is using a security service to protect itself from online attacks.</p>"
+    "</body></html>"
+)
+
+
+@app.middleware("http")
+async def add_latency(request: Request, call_next):
+    delay = CONFIG["latency_ms"] + random.uniform(0, CONFIG["jitter_ms"])
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    path = request.url.path
+    if path.startswith("/_fake"):
+        return await call_next(request)
+
+    STATS["requests"] += 1
+    # The API is not behind the challenge page; site pages are
+    if not path.startswith("/api/") and random.random() < CONFIG["cloudflare_rate"]:
+        STATS["cloudflareBlocks"] += 1
+        return HTMLResponse(CLOUDFLARE_PAGE, status_code=403)
+    challenged = (
+        not path.startswith("/api/")
+        and CONFIG["challenge_ms"] > 0
+        and "cf_clearance" not in request.cookies
+    )
+    if challenged:
+        STATS["challenges"] += 1
+        await asyncio.sleep(CONFIG["challenge_ms"] / 1000)
+    response = await call_next(request)
+    if challenged:
+        response.set_cookie("cf_clearance", f"fake-{random.getrandbits(64):x}", max_age=86400)
+    return response
+
+
+# --- Page templates ---
+
+
+def page(body: str, logged_in: bool) -> str:
+    header = (
+        f'<a href="/profile/{HANDLE}">{HANDLE}</a> | <a href="/logout">Logout</a>'
+        if logged_in
+        else '<a href="/enter">Enter</a> | <a href="/register">Register</a>'
+    )
+    script = f'<script>var handle = "{HANDLE}";</script>' if logged_in else ""
+    return (
+        "<!DOCTYPE html><html><head><title>Codeforces</title>"
+        f'<meta name="X-Csrf-Token" content="{CSRF_TOKEN}"/>{script}</head>'
+        f'<body><div id="header">{header}</div>{body}</body></html>'
+    )
+
+
+def problem_page(contest_id: int, index: str, samples: int = 2) -> str:
+    sample_html = "".join(
+        '<div class="input"><div class="title">Input</div>'
+        f"<pre>{i + 1}<br />{contest_id} {index}<br /></pre></div>"
+        '<div class="output"><div class="title">Output</div>'
+        f"<pre>{(i + 1) * contest_id}<br /></pre></div>"
+        for i in range(samples)
+    )
+    statement = (
+        '<div class="problem-statement">'
+        '<div class="header">'
+        f'<div class="title">{index}. Fake Problem {contest_id}{index}</div>'
+        '<div class="time-limit"><div class="property-title">time limit per test</div>2 seconds</div>'
+        '<div class="memory-limit"><div class="property-title">memory limit per test</div>256 megabytes</div>'
+        "</div>"
+        "<div><p>" + "Lorem ipsum dolor sit amet. " * 80 + "</p>"
+        f'<center><img class="tex-graphics" src="/espresso/{contest_id}{index}.png" /></center></div>'
+        '<div class="input-specification"><div class="section-title">Input</div><p>Two integers.</p></div>'
+        '<div class="output-specification"><div class="section-title">Output</div><p>One integer.</p></div>'
+        '<div class="sample-tests"><div class="section-title">Examples</div>'
+        f'<div class="sample-test">{sample_html}</div>'
+        "</div></div></div>"
+    )
+    sidebar = (
+        '<div class="roundbox sidebox">'
+        '<span class="tag-box" title="Difficulty">*1400</span>'
+        '<span class="tag-box" title="Tags">math</span>'
+        '<span class="tag-box" title="Tags">greedy</span>'
+        "</div>"
+    )
+    filler = "<div class='menu'>" + "<a href='/x'>nav</a>" * 400 + "</div>"
+    return page(filler + statement + sidebar, logged_in=False)
+
+
+def is_logged_in(request: Request) -> bool:
+    return "JSESSIONID" in request.cookies
+
+
+# --- Site pages ---
+
+
+@app.get("/", response_class=HTMLResponse)
+async def homepage(request: Request):
+    return page("<div>Welcome</div>", is_logged_in(request))
+
+
+@app.get("/contest/{contest_id}/problem/{index}", response_class=HTMLResponse)
+async def problem(contest_id: int, index: str):
+    return problem_page(contest_id, index)
+
+
+@app.get("/problemset/submit", response_class=HTMLResponse)
+async def submit_page(request: Request):
+    form = (
+        '<form class="submit-form" method="post">'
+        f'<input type="hidden" name="csrf_token" value="{CSRF_TOKEN}"/>'
+        '<textarea name="source"></textarea></form>'
+    )
+    return page(form, is_logged_in(request))
+
+
+@app.post("/problemset/submit")
+async def submit(request: Request):
+    # Parsed by hand so the fake doesn't need python-multipart
+    form = {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+    if form.get("csrf_token") != CSRF_TOKEN:
+        return HTMLResponse(page('<span class="error">Invalid CSRF token</span>', True), status_code=403)
+    account = request.cookies.get("JSESSIONID", "")
+    now = time.monotonic()
+    if now - _last_submit.get(account, float("-inf")) < CONFIG["submit_interval"]:
+        # CF re-renders the submit form with an error instead of redirecting
+        STATS["rateLimited"] += 1
+        return HTMLResponse(
+            page('<span class="error">You have submitted too often</span>', True)
+        )
+    _last_submit[account] = now
+
+    problem_code = str(form.get("submittedProblemCode", "4A"))
+    contest_id = int("".join(ch for ch in problem_code if ch.isdigit()) or 4)
+    index = problem_code.lstrip("0123456789/") or "A"
+    record = {
+        "id": next(_submission_ids),
+        "contestId": contest_id,
+        "creationTimeSeconds": int(time.time()),
+        "problem": {"contestId": contest_id, "index": index},
+        "programmingLanguage": str(form.get("programTypeId", "54")),
+    }
+    verdicts = [v.strip() for v in CONFIG["verdicts"].split(",") if v.strip()] or ["OK"]
+    final = verdicts[next(_final_verdicts) % len(verdicts)]
+    _submissions.insert(0, (record, now, final))
+    _sources[record["id"]] = str(form.get("source", ""))
+    STATS["submissions"] += 1
+    return RedirectResponse("/problemset/status?my=on", status_code=302)
+
+
+@app.get("/problemset/status", response_class=HTMLResponse)
+async def status_page(request: Request):
+    marker = 'data-submission-id="{}"' if CONFIG["status_ids"] else 'data-id="{}"'
+    rows = "".join(
+        f'<tr {marker.format(record["id"])}><td>{record["id"]}</td>'
+        f'<td><a href="/contest/{record["contestId"]}/problem/{record["problem"]["index"]}">'
+        f'{record["problem"]["index"]}</a></td></tr>'
+        for record, _, _ in _submissions[:50]
+    )
+    return page(f'<table class="status-frame-datatable">{rows}</table>', True)
+
+
+@app.get("/contest/{contest_id}/submission/{submission_id}", response_class=HTMLResponse)
+async def submission_page(request: Request, contest_id: int, submission_id: int):
+    if submission_id not in _sources:
+        return HTMLResponse(page("<div>No such submission</div>", True), status_code=404)
+    STATS["sourceViews"] += 1
+    source = html.escape(_sources[submission_id])
+    return page(f'<pre id="program-source-text" class="prettyprint">{source}</pre>', is_logged_in(request))
+
+
+def judged(record: dict, submitted_at: float, final: str) -> dict:
+    """The record as user.status shows it now: in queue, testing, then final."""
+    elapsed = time.monotonic() - submitted_at - CONFIG["queue_seconds"]
+    if elapsed < 0:
+        return {**record, "passedTestCount": 0, "timeConsumedMillis": 0, "memoryConsumedBytes": 0}
+    judge = CONFIG["judge_seconds"]
+    if elapsed < judge:
+        passed = int(TESTS_PER_PROBLEM * elapsed / judge)
+        return {**record, "verdict": "TESTING", "passedTestCount": passed,
+                "timeConsumedMillis": 0, "memoryConsumedBytes": 0}
+    passed = TESTS_PER_PROBLEM if final == "OK" else TESTS_PER_PROBLEM // 2
+    return {**record, "verdict": final, "passedTestCount": passed,
+            "timeConsumedMillis": 15, "memoryConsumedBytes": 1024 * 1024}
+
+
+@app.get("/espresso/{name}")
+async def statement_image(name: str):
+    # A few KB of bytes that differ per image, served like a PNG
+    body = (name.encode() * 512)[:4096]
+    return Response(body, media_type="image/png")
+
+
+# --- API ---
+
+
+def fake_problemset(size: int) -> dict:
+    """A problemset.problems result: `size` problems, newest contest first, about 6 per contest."""
+    rng = random.Random(size)
+    problems, statistics = [], []
+    contest_id = 1
+    while len(problems) < size:
+        for letter in "ABCDEF"[: rng.randint(3, 6)]:
+            problem = {
+                "contestId": contest_id,
+                "index": letter,
+                "name": f"{rng.choice(['Fake', 'Tricky', 'Easy', 'Hard', 'Lucky'])} Problem {contest_id}{letter}",
+                "type": "PROGRAMMING",
+                "tags": rng.sample(PROBLEM_TAGS, rng.randint(0, 4)),
+            }
+            if rng.random() < 0.9:
+                problem["rating"] = min(3500, 800 + 100 * ("ABCDEF".index(letter) * 4 + rng.randint(0, 8)))
+            problems.append(problem)
+            statistics.append({"contestId": contest_id, "index": letter, "solvedCount": rng.randint(0, 50000)})
+        contest_id += 1
+    return {"problems": problems[:size][::-1], "problemStatistics": statistics[:size][::-1]}
+
+
+@app.get("/api/problemset.problems")
+async def problemset_problems():
+    STATS["apiCalls"] += 1
+    return JSONResponse({"status": "OK", "result": fake_problemset(CONFIG["problemset_size"])})
+
+
+@app.get("/api/user.status")
+async def user_status(
+    handle: str, count: int = 10, from_: int = Query(1, alias="from")
+):
+    STATS["apiCalls"] += 1
+    start = max(from_, 1) - 1
+    result = [judged(*entry) for entry in _submissions[start : start + count]]
+    return JSONResponse({"status": "OK", "result": result})
+
+
+# --- Control ---
+
+
+@app.get("/_fake/config")
+async def get_config():
+    return CONFIG
+
+
+@app.post("/_fake/config")
+async def set_config(request: Request):
+    updates = await request.json()
+    for key, value in updates.items():
+        if key in CONFIG:
+            CONFIG[key] = type(CONFIG[key])(value)
+    return CONFIG
+
+
+@app.get("/_fake/stats")
+async def get_stats():
+    return STATS
+
+
+@app.get("/_fake/submissions")
+async def list_submissions():
+    return [{"id": record["id"], "source": _sources[record["id"]]} for record, _, _ in _submissions]
@@ -0,0 +1,174 @@
+"""
+load.py — Open-loop load generator for cf_service.
+
+Drives /cf/submit, /cf/verdict and /cf/problem at fixed target rates
+(requests start on schedule whether or not earlier ones finished, like real
+contest traffic) and reports per-endpoint throughput, status codes and
+p50/p95/p99 latency.
+
+By default it starts bench.fake_cf and cf_service itself, passing the fake's
+knobs through; use --target to point it at a service that is already running.
+
+Run from cf-service/:
+    python -m bench.load --duration 30 --problem-rate 50 --verdict-rate 50 --submit-rate 2
+    python -m bench.load --cloudflare-rate 0.05 --submit-interval 10 --accounts 3
+    python -m bench.load --target http://127.0.0.1:8000 --submit-rate 0
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from curl_cffi import requests as cf_requests
+
+from bench.common import print_table, serve, summarize
+from bench.fake_cf import HANDLE
+
+COLUMNS = ["name", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "statuses"]
+
+
+class Endpoint:
+    def __init__(self, name: str, rate: float):
+        self.name = name
+        self.rate = rate
+        self.latencies = []
+        self.errors = 0
+        self.statuses = Counter()
+        self.tasks = []
+
+    def record(self, status, started: float) -> None:
+        self.statuses[status] += 1
+        if isinstance(status, int) and status < 500:
+            self.latencies.append(time.perf_counter() - started)
+        else:
+            self.errors += 1
+
+    def row(self, elapsed: float) -> dict:
+        row = summarize(self.name, self.latencies, self.errors, elapsed)
+        row["statuses"] = " ".join(f"{k}:{v}" for k, v in sorted(self.statuses.items(), key=str))
+        return row
+
+
+async def run_load(base: str, args) -> list:
+    submitted_ids = []  # CF IDs returned by /cf/submit, for realistic verdict lookups
+    endpoints = [
+        Endpoint("problem", args.problem_rate),
+        Endpoint("verdict", args.verdict_rate),
+        Endpoint("submit", args.submit_rate),
+    ]
+
+    async with cf_requests.AsyncSession(max_clients=args.max_clients) as client:
+        if args.accounts:
+            accounts = [
+                {"handle": f"{HANDLE}{i}", "cookies": f"JSESSIONID=load-{i}"}
+                for i in range(args.accounts)
+            ]
+            await client.put(f"{base}/cf/accounts", json={"accounts": accounts}, timeout=10)
+
+        async def call(endpoint: Endpoint, seq: int) -> None:
+            started = time.perf_counter()
+            try:
+                if endpoint.name == "problem":
+                    r = await client.get(
+                        f"{base}/cf/problem/{1000 + seq % args.problems}/A", timeout=args.timeout
+                    )
+                elif endpoint.name == "verdict":
+                    sid = submitted_ids[seq % len(submitted_ids)] if submitted_ids else 300000000
+                    r = await client.get(f"{base}/cf/verdict/{HANDLE}/{sid}", timeout=args.timeout)
+                else:
+                    body = {
+                        "problem_code": f"{1000 + seq % args.problems}/A",
+                        "source_code": f"// load {seq}\nint main() {{ return 0; }}",
+                        "language_id": "54",
+                    }
+                    if not args.accounts:
+                        body["cookies"] = "JSESSIONID=load"
+                    r = await client.post(f"{base}/cf/submit", json=body, timeout=args.timeout)
+                    if r.status_code == 200 and r.json().get("submission_id"):
+                        submitted_ids.append(r.json()["submission_id"])
+                endpoint.record(r.status_code, started)
+            except Exception as e:
+                endpoint.record(type(e).__name__, started)
+
+        async def drive(endpoint: Endpoint) -> None:
+            if endpoint.rate <= 0:
+                return
+            interval = 1 / endpoint.rate
+            start = time.perf_counter()
+            seq = 0
+            while True:
+                due = start + seq * interval
+                if due - start >= args.duration:
+                    break
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                endpoint.tasks.append(asyncio.create_task(call(endpoint, seq)))
+                seq += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(drive(e) for e in endpoints))
+        pending = [t for e in endpoints for t in e.tasks]
+        if pending:
+            _, unfinished = await asyncio.wait(pending, timeout=args.drain_timeout)
+            for task in unfinished:
+                task.cancel()
+        elapsed = time.perf_counter() - started
+
+    return [e.row(elapsed) for e in endpoints if e.rate > 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", help="cf_service base URL (default: start fake + service)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--problem-rate", type=float, default=20, help="requests/s")
+    parser.add_argument("--verdict-rate", type=float, default=20, help="requests/s")
+    parser.add_argument("--submit-rate", type=float, default=1, help="requests/s")
+    parser.add_argument("--problems", type=int, default=50, help="distinct problems requested")
+    parser.add_argument("--accounts", type=int, default=0, help="pooled CF accounts (0 = cookies per request)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--max-clients", type=int, default=1000)
+    # Fake Codeforces knobs (ignored with --target)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--cloudflare-rate", type=float, default=0)
+    parser.add_argument("--submit-interval", type=float, default=0)
+    parser.add_argument("--judge-seconds", type=float, default=0)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument(
+        "--service-env", action="append", default=[], metavar="KEY=VALUE",
+        help="extra env for the started cf_service (repeatable)",
+    )
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        base = args.target
+        if not base:
+            fake_env = {
+                "FAKE_CF_LATENCY_MS": str(args.latency_ms),
+                "FAKE_CF_JITTER_MS": str(args.jitter_ms),
+                "FAKE_CF_CLOUDFLARE_RATE": str(args.cloudflare_rate),
+                "FAKE_CF_SUBMIT_INTERVAL": str(args.submit_interval),
+                "FAKE_CF_JUDGE_SECONDS": str(args.judge_seconds),
+            }
+            fake_url = stack.enter_context(serve("bench.fake_cf:app", args.fake_port, fake_env))
+            service_env = {"CF_BASE_URL": fake_url}
+            service_env.update(kv.split("=", 1) for kv in args.service_env)
+            base = stack.enter_context(serve("cf_service:app", args.port, service_env))
+
+        rows = asyncio.run(run_load(base.rstrip("/"), args))
+
+    print(
+        f"\n{args.duration:g}s open-loop: problem {args.problem_rate:g}/s, "
+        f"verdict {args.verdict_rate:g}/s, submit {args.submit_rate:g}/s\n"
+    )
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+regex_reference.py — The original regex-based problem page parser.
+
+Kept only so bench_parser can compare against it; cf_service uses
+problem_parser.parse_problem_page.
+"""
+
+import re
+
+
+def parse_problem_html(html: str) -> dict:
+    """Extract name, limits, statement, samples, rating and tags from a problem page."""
+    # Extract the full problem-statement div
+    statement_match = re.search(
+        r'<div class="problem-statement">(.*?)</div>\s*</div>\s*</div>',
+        html,
+        re.DOTALL,
+    )
+
+    # Extract title (e.g., "A. Watermelon")
+    title_match = re.search(r'<div class="title">(.+?)</div>', html)
+
+    # Extract time limit
+    time_match = re.search(
+        r'<div class="time-limit">.*?(\d+\s*second)', html, re.DOTALL
+    )
+
+    # Extract memory limit
+    memory_match = re.search(
+        r'<div class="memory-limit">.*?(\d+\s*megabyte)', html, re.DOTALL
+    )
+
+    # Extract sample tests
+    samples = []
+    input_blocks = re.findall(
+        r'<div class="input">.*?<pre[^>]*>(.*?)</pre>', html, re.DOTALL
+    )
+    output_blocks = re.findall(
+        r'<div class="output">.*?<pre[^>]*>(.*?)</pre>', html, re.DOTALL
+    )
+    for inp, out in zip(input_blocks, output_blocks):
+        # Clean HTML tags from samples (e.g., <br> → newline)
+        inp_clean = re.sub(r"<br\s*/?>", "\n", inp)
+        inp_clean = re.sub(r"<[^>]+>", "", inp_clean).strip()
+        out_clean = re.sub(r"<br\s*/?>", "\n", out)
+        out_clean = re.sub(r"<[^>]+>", "", out_clean).strip()
+        samples.append({"input": inp_clean, "output": out_clean})
+
+    # Extract rating if available
+    rating = None
+    rating_match = re.search(r'title="Difficulty"[^>]*>\s*\*(\d+)', html)
+    if rating_match:
+        rating = int(rating_match.group(1))
+
+    # Extract tags
+    tags = re.findall(r'<span class="tag-box"[^>]*>([^<]+)</span>', html)
+    tags = [t.strip() for t in tags]
+
+    return {
+        "name": title_match.group(1).strip() if title_match else "Unknown",
+        "timeLimit": time_match.group(1) if time_match else "Unknown",
+        "memoryLimit": memory_match.group(1) if memory_match else "Unknown",
+        "statementHtml": statement_match.group(0) if statement_match else "",
+        "sampleTests": samples,
+        "rating": rating,
+        "tags": tags,
+    }
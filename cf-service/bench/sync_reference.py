@@ -0,0 +1,41 @@
+"""
+sync_reference.py — The pre-async request path, kept only as a benchmark baseline.
+
+Plain `def` handlers (run in uvicorn's thread pool) doing blocking curl_cffi
+and urllib calls, exactly as cf_service did before it moved to AsyncSession.
+"""
+
+import json
+import os
+import urllib.request
+
+from curl_cffi import requests as cf_requests
+from fastapi import FastAPI, HTTPException
+
+from problem_parser import parse_problem_page
+
+# Read directly: importing cf_service would run its whole setup in this process
+CF_BASE = os.environ.get("CF_BASE_URL", "https://codeforces.com").rstrip("/")
+
+app = FastAPI(title="CF Integration Service (sync baseline)")
+_session = cf_requests.Session(impersonate="chrome")
+
+
+@app.get("/cf/problem/{contest_id}/{problem_index}")
+def fetch_problem(contest_id: int, problem_index: str):
+    r = _session.get(f"{CF_BASE}/contest/{contest_id}/problem/{problem_index}", timeout=15)
+    if r.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"CF returned HTTP {r.status_code}")
+    return {"contestId": contest_id, "problemIndex": problem_index, **parse_problem_page(r.text)}
+
+
+@app.get("/cf/verdict/{handle}/{submission_id}")
+def get_verdict(handle: str, submission_id: int):
+    req = urllib.request.Request(f"{CF_BASE}/api/user.status?handle={handle}&from=1&count=10")
+    req.add_header("User-Agent", "Mozilla/5.0")
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        data = json.loads(resp.read())
+    for sub in data.get("result", []):
+        if sub["id"] == submission_id:
+            return {"id": sub["id"], "verdict": sub.get("verdict", "TESTING")}
+    return {"id": submission_id, "verdict": "TESTING"}
@@ -0,0 +1,108 @@
+"""
+waterfall.py — Assemble span logs from the backend and cf-service into per-trace waterfalls.
+
+Both services write each finished span of a sampled trace as one JSON line
+({"type": "span", "traceId", "spanId", "parentId", "name", "startMs",
+"durationMs", ...}). This reads such lines from files or stdin — other log
+lines and prefixes such as `docker compose logs` adds are skipped — and
+prints every trace as a tree of spans with a bar on a shared time axis:
+
+    trace 4bf92f3577b34da6a3ce929d0e0e4736  1843.2 ms  backend, cf-service
+      backend     POST /api/submissions          1843.2  |##############################|
+      backend       enqueue_cf_job                 21.4  |#                             |
+      cf-service      POST /cf/submit/jobs          9.8  |#                             |
+      ...
+
+Run from cf-service/:
+    docker compose logs --no-log-prefix backend cf-service | python -m bench.waterfall
+    python -m bench.waterfall spans.log --trace 4bf92f35 --width 60
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+
+def read_spans(lines) -> dict:
+    """traceId -> [span], from any lines that carry a JSON span record."""
+    traces = defaultdict(list)
+    for line in lines:
+        start = line.find("{")
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(record, dict) and record.get("type") == "span" and record.get("traceId"):
+            traces[record["traceId"]].append(record)
+    return traces
+
+
+def ordered(spans: list) -> list:
+    """(depth, span) depth-first, children by start time; orphans become roots."""
+    ids = {span["spanId"] for span in spans}
+    children = defaultdict(list)
+    for span in spans:
+        parent = span.get("parentId")
+        children[parent if parent in ids else None].append(span)
+    rows = []
+
+    def walk(parent, depth):
+        for span in sorted(children.get(parent, ()), key=lambda s: s["startMs"]):
+            rows.append((depth, span))
+            walk(span["spanId"], depth + 1)
+
+    walk(None, 0)
+    return rows
+
+
+def render(trace_id: str, spans: list, width: int) -> str:
+    begin = min(span["startMs"] for span in spans)
+    end = max(span["startMs"] + span["durationMs"] for span in spans)
+    total = max(end - begin, 1e-3)
+    services = sorted({span.get("service", "?") for span in spans})
+    out = [f"trace {trace_id}  {end - begin:.1f} ms  {', '.join(services)}"]
+    rows = ordered(spans)
+    label_width = max(2 * depth + len(span["name"]) for depth, span in rows)
+    for depth, span in rows:
+        left = int((span["startMs"] - begin) / total * width)
+        length = max(1, round(span["durationMs"] / total * width))
+        bar = (" " * left + "#" * length)[:width].ljust(width)
+        label = ("  " * depth + span["name"]).ljust(label_width)
+        flag = "  ERROR" if span.get("status") == "error" else ""
+        out.append(
+            f"  {span.get('service', '?'):<11} {label}  {span['durationMs']:>9.1f}  |{bar}|{flag}"
+        )
+    return "\n".join(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("files", nargs="*", help="log files (default: stdin)")
+    parser.add_argument("--trace", help="only traces whose ID starts with this")
+    parser.add_argument("--last", type=int, default=0, help="only the N most recent traces")
+    parser.add_argument("--width", type=int, default=40, help="bar width in characters")
+    args = parser.parse_args()
+
+    traces = defaultdict(list)
+    sources = [open(path) for path in args.files] or [sys.stdin]
+    for source in sources:
+        with source:
+            for trace_id, spans in read_spans(source).items():
+                traces[trace_id].extend(spans)
+
+    selected = [
+        (trace_id, spans)
+        for trace_id, spans in traces.items()
+        if not args.trace or trace_id.startswith(args.trace)
+    ]
+    selected.sort(key=lambda item: min(span["startMs"] for span in item[1]))
+    if args.last:
+        selected = selected[-args.last:]
+    print("\n\n".join(render(trace_id, spans, args.width) for trace_id, spans in selected))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,207 @@ Uses curl_cffi to bypass Cloudflare TLS fingerprinting.
 PROVEN WORKING: Submission #363219620, Verdict: OK
 """
 
-import re
-from fastapi import FastAPI, HTTPException
+import asyncio
+import inspect
+import json
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+from urllib.parse import urlparse
+import anyio
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from pydantic import BaseModel
 from curl_cffi import requests as cf_requests
 
+from account_pool import AccountPool
+from asset_mirror import AssetMirror
+from api_client import ApiGovernor, PRIORITY_METADATA, PRIORITY_SUBMISSION, PRIORITY_VERDICT
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from cookie_jar import CookieJarStore, jar_key
+from csrf_cache import CsrfCache
+from health_probe import HealthProber, LoopMonitor
+from metrics import REGISTRY
+from problem_cache import AsyncTTLCache
+from problem_index import ProblemIndex
+from page_extract import (
+    csrf_rejected,
+    extract_csrf_token,
+    extract_handle,
+    extract_logged_in_handle,
+    extract_status_rows,
+    extract_submission_source,
+)
+from problem_parser import parse_problem_page
+from rate_limit import HostPacer, SharedTokenBucket
+from sample_judge import (
+    JudgeUnavailable,
+    RemoteJudge,
+    SampleJudge,
+    TooLarge,
+    UnsupportedLanguage,
+    load_languages,
+    parse_limits,
+)
+from session_pool import SessionPool, cookie_key
+from shared_state import SharedStore
+from submission_matcher import SubmissionMatcher, parse_problem_code
+from submit_queue import SubmitQueue
+from tracing import Tracer, current_span, json_line_logger
+from verdict_tracker import TooManyHandles, VerdictTracker, is_final
+from webhooks import WebhookSender
+
+log = logging.getLogger("cf_service")
+
+# --- Config ---
+
+# Overridable so the service can be pointed at a local fake Codeforces (bench/)
+CF_BASE = os.environ.get("CF_BASE_URL", "https://codeforces.com").rstrip("/")
+_cf_host = urlparse(CF_BASE).hostname or "codeforces.com"
+CF_COOKIE_DOMAIN = ".codeforces.com" if _cf_host.endswith("codeforces.com") else _cf_host
+
+SESSION_POOL_SIZE = int(os.environ.get("CF_SESSION_POOL_SIZE", "32"))
+SESSION_IDLE_TTL = float(os.environ.get("CF_SESSION_IDLE_TTL", "1800"))
+# Concurrent transfers per pooled session (curl handles)
+SESSION_MAX_CLIENTS = int(os.environ.get("CF_SESSION_MAX_CLIENTS", "100"))
+# CF CSRF tokens live as long as the login session; refresh at least this often
+CSRF_TTL = float(os.environ.get("CF_CSRF_TTL", "1800"))
+
+# Per-handle verdict index: largest user.status page, pages per poll, and how
+# far back it may page for old submission IDs
+VERDICT_PAGE_SIZE = int(os.environ.get("CF_VERDICT_PAGE_SIZE", "100"))
+VERDICT_MAX_PAGES = int(os.environ.get("CF_VERDICT_MAX_PAGES", "5"))
+VERDICT_MAX_DEPTH = int(os.environ.get("CF_VERDICT_MAX_DEPTH", "5000"))
+# Background per-handle tracker: shortest time between user.status polls of a
+# handle, the share of the API rate all pollers may use together (each handle's
+# interval stretches to fit; the rest is left for attribution and metadata),
+# and how many handles may be tracked at once (0 = no limit)
+VERDICT_TRACK_INTERVAL = float(os.environ.get("CF_VERDICT_TRACK_INTERVAL", "2"))
+VERDICT_TRACK_SHARE = float(os.environ.get("CF_VERDICT_TRACK_SHARE", "0.5"))
+VERDICT_MAX_HANDLES = int(os.environ.get("CF_VERDICT_MAX_HANDLES", "50"))
+STREAM_HEARTBEAT = 15.0
+# Final verdicts are POSTed to the submission's callback_url, or to this URL
+# when it names none; the secret is sent as X-Callback-Token
+VERDICT_CALLBACK_URL = os.environ.get("CF_VERDICT_CALLBACK_URL") or None
+CALLBACK_SECRET = os.environ.get("CF_CALLBACK_SECRET", "")
+CALLBACK_MAX_ATTEMPTS = int(os.environ.get("CF_CALLBACK_MAX_ATTEMPTS", "8"))
+
+# Parsed problem statements: fresh for TTL, then served stale while refreshing
+PROBLEM_CACHE_SIZE = int(os.environ.get("CF_PROBLEM_CACHE_SIZE", "512"))
+PROBLEM_CACHE_TTL = float(os.environ.get("CF_PROBLEM_CACHE_TTL", "3600"))
+PROBLEM_CACHE_STALE_TTL = float(os.environ.get("CF_PROBLEM_CACHE_STALE_TTL", "86400"))
+
+# Problemset index (search, ratings, tags): rebuilt from problemset.problems every
+# CF_PROBLEMSET_REFRESH seconds (0 = never fetch) and snapshotted to
+# CF_PROBLEMSET_SNAPSHOT (empty = no snapshot), which workers share and load at startup
+PROBLEMSET_REFRESH = float(os.environ.get("CF_PROBLEMSET_REFRESH", "3600"))
+PROBLEMSET_SNAPSHOT = os.environ.get("CF_PROBLEMSET_SNAPSHOT", "data/problemset.json")
+PROBLEM_SEARCH_MAX_LIMIT = 200
+
+# Submission queue: per-account token bucket tuned to CF's ~1 submission / 10s,
+# with automatic retries when CF still answers "You have submitted too often"
+SUBMIT_RATE_PER_MIN = float(os.environ.get("CF_SUBMIT_RATE_PER_MIN", "6"))
+SUBMIT_BURST = int(os.environ.get("CF_SUBMIT_BURST", "1"))
+SUBMIT_MAX_RETRIES = int(os.environ.get("CF_SUBMIT_MAX_RETRIES", "5"))
+SUBMIT_RETRY_DELAY = float(os.environ.get("CF_SUBMIT_RETRY_DELAY", "10"))
+SUBMIT_JOB_TTL = float(os.environ.get("CF_SUBMIT_JOB_TTL", "3600"))
+SUBMIT_JOB_MAX_WAIT = 30.0
+# Submits the status page can't identify are matched against user.status:
+# seconds between matching rounds, and how long to keep trying
+ATTRIBUTION_INTERVAL = float(os.environ.get("CF_ATTRIBUTION_INTERVAL", "1"))
+ATTRIBUTION_TIMEOUT = float(os.environ.get("CF_ATTRIBUTION_TIMEOUT", "60"))
+# Pooled accounts are skipped for this long after CF rate-limits them
+ACCOUNT_COOLDOWN = float(os.environ.get("CF_ACCOUNT_COOLDOWN", "60"))
+
+# Background health probes: how often each target is checked and its timeout
+HEALTH_INTERVAL = float(os.environ.get("CF_HEALTH_INTERVAL", "30"))
+HEALTH_TIMEOUT = float(os.environ.get("CF_HEALTH_TIMEOUT", "10"))
+HEALTH_API_HANDLE = os.environ.get("CF_HEALTH_API_HANDLE", "tourist")
+# Liveness reports "saturated" when the event loop wakes up this late
+LOOP_LAG_LIMIT = float(os.environ.get("CF_LOOP_LAG_LIMIT", "1.0"))
+
+# Statement images/attachments are mirrored under this directory (empty
+# disables it) and linked as {CF_ASSET_PUBLIC_PATH}/<key>, a path the frontend
+# proxies to /cf/assets
+ASSET_DIR = os.environ.get("CF_ASSET_DIR", "assets")
+ASSET_PUBLIC_PATH = os.environ.get("CF_ASSET_PUBLIC_PATH", "/cf-assets")
+ASSET_CONCURRENCY = int(os.environ.get("CF_ASSET_CONCURRENCY", "4"))
+ASSET_MAX_BYTES = int(os.environ.get("CF_ASSET_MAX_BYTES", str(10 * 1024 * 1024)))
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Public API governor: CF allows about one call per 2 seconds per client
+API_RATE_PER_MIN = float(os.environ.get("CF_API_RATE_PER_MIN", "30"))
+API_BURST = int(os.environ.get("CF_API_BURST", "1"))
+
+# Circuit breakers (site pages and /api tracked separately): consecutive
+# failures that open the circuit, and seconds before a half-open probe
+CIRCUIT_FAILURES = int(os.environ.get("CF_CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET = float(os.environ.get("CF_CIRCUIT_RESET", "30"))
+
+# Session cookie jars (Cloudflare clearance, refreshed logins) and the account
+# pool survive restarts in this AES-256-GCM encrypted file. Needs
+# CF_COOKIE_JAR_KEY (64 hex chars: openssl rand -hex 32); without it nothing is
+# written. Saved every CF_COOKIE_JAR_SAVE_INTERVAL seconds when it changed.
+COOKIE_JAR_PATH = os.environ.get("CF_COOKIE_JAR", "data/cookies.jar")
+COOKIE_JAR_KEY = jar_key(os.environ.get("CF_COOKIE_JAR_KEY", ""))
+COOKIE_JAR_SAVE_INTERVAL = float(os.environ.get("CF_COOKIE_JAR_SAVE_INTERVAL", "60"))
+# Startup warm-up (restore jars, open connections, prime pooled accounts' CSRF
+# tokens): /health/ready answers 503 until it is done or this many seconds pass
+WARMUP_TIMEOUT = float(os.environ.get("CF_WARMUP_TIMEOUT", "30"))
+WARMUP_CONCURRENCY = 4
+
+# Multi-worker mode (uvicorn --workers / WEB_CONCURRENCY > 1): the workers
+# share caches, CSRF tokens, rate-limit buckets, submit jobs and verdict
+# records through this SQLite file. Empty keeps all state in process memory,
+# which is only correct with a single worker.
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+SHARED_STATE_PATH = os.environ.get("CF_SHARED_STATE") or ("state/cf-shared.db" if WORKERS > 1 else "")
+SHARED_POLL_INTERVAL = 0.25  # seconds between store reads while long-polling another worker's job
+
+# Tracing: spans of sampled requests are written as JSON lines to CF_TRACE_LOG
+# ("-" = stdout). A request with a traceparent header (the backend sends one)
+# follows the caller's sampling decision; CF_TRACE_SAMPLE_RATE only applies to
+# requests without one.
+TRACE_SAMPLE_RATE = float(os.environ.get("CF_TRACE_SAMPLE_RATE", "0.05"))
+TRACE_LOG = os.environ.get("CF_TRACE_LOG", "-")
+
+# Local sample judging (POST /cf/judge/samples): compile and run a solution on the
+# problem's samples in a sandbox before it costs a Codeforces submission.
+# CF_JUDGE_LANGUAGES names a JSON file adding to / replacing the built-in
+# programTypeId -> compiler table (see sample_judge.py). Solutions run in a bubblewrap
+# sandbox as nobody; where that isn't possible (no bwrap, not root, Docker's default
+# seccomp/AppArmor profiles) the judge is off. Off by default: CF_JUDGE_URL points at
+# a judge_service.py in a container of its own (docker-compose's `judge` profile), and
+# CF_JUDGE_LOCAL=1 runs the judge in this process instead, next to the cookies and
+# accounts (only outside Docker, after sandbox_check.py has passed on the host).
+JUDGE_URL = os.environ.get("CF_JUDGE_URL", "").rstrip("/")
+JUDGE_LOCAL = os.environ.get("CF_JUDGE_LOCAL", "0") == "1"
+JUDGE_TIMEOUT = float(os.environ.get("CF_JUDGE_TIMEOUT", "60"))  # one remote judging, seconds
+JUDGE_WORKERS = int(os.environ.get("CF_JUDGE_WORKERS", "2"))  # per worker process
+JUDGE_MAX_QUEUE = int(os.environ.get("CF_JUDGE_MAX_QUEUE", "64"))
+# Longest a judging waits for a slot before 503; well under the backend's 60 s
+# JUDGE_TIMEOUT so nothing is compiled for a caller that has already given up
+JUDGE_QUEUE_TIMEOUT = float(os.environ.get("CF_JUDGE_QUEUE_TIMEOUT", "15"))
+JUDGE_CACHE_SIZE = int(os.environ.get("CF_JUDGE_CACHE_SIZE", "256"))  # compiled builds kept
+JUDGE_LANGUAGES = os.environ.get("CF_JUDGE_LANGUAGES", "")
+JUDGE_DIR = os.environ.get("CF_JUDGE_DIR", "")  # scratch space; empty = system temp
+
+# Bulk prefetch: parallel fetches per request, and minimum gap between upstream page loads
+BULK_CONCURRENCY = int(os.environ.get("CF_BULK_CONCURRENCY", "4"))
+BULK_MAX_CONCURRENCY = 16
+BULK_PACING_MS = float(os.environ.get("CF_BULK_PACING_MS", "250"))
+
 
 # --- Request Models ---
 
@@ -20,13 +215,86 @@ class CookieValidation(BaseModel):
 
 
 class SubmissionRequest(BaseModel):
-    cookies: str  # Full cookie string
+    cookies: Optional[str] = None  # Full cookie string; omit to use the account pool
     problem_code: str  # e.g., "4A" or "1234B"
     source_code: str
     language_id: str  # CF programTypeId (e.g., "54" for G++17)
+    callback_url: Optional[str] = None  # POST the final verdict here
+    callback_ref: Optional[str] = None  # opaque caller ID, echoed back as "ref"
+
+
+class CfAccount(BaseModel):
+    handle: str
+    cookies: str
+
+
+class AccountPoolRequest(BaseModel):
+    accounts: list[CfAccount]
+
+
+class ProblemRef(BaseModel):
+    contest_id: int
+    index: str  # e.g., "A", "B1"
 
 
-app = FastAPI(title="CF Integration Service", version="1.0.0")
+class BulkProblemRequest(BaseModel):
+    problems: list[ProblemRef]
+    concurrency: Optional[int] = None  # defaults to CF_BULK_CONCURRENCY
+
+
+class SampleTest(BaseModel):
+    input: str
+    output: str
+
+
+class JudgeRequest(BaseModel):
+    source_code: str
+    language_id: str  # CF programTypeId
+    contest_id: Optional[int] = None  # the problem whose samples and limits are used...
+    problem_index: Optional[str] = None
+    samples: Optional[list[SampleTest]] = None  # ...unless given here
+    time_limit: Optional[float] = None  # seconds; default: the problem's, else 2
+    memory_limit: Optional[int] = None  # MB; default: the problem's, else 256
+    compile_only: bool = False
+
+
+class VerdictBatchRequest(BaseModel):
+    handle: str
+    submission_ids: list[int]  # CF submission IDs, any order
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Before anything opens a session, so the restored ones are used
+    restore_saved_state()
+    health_prober.start()
+    loop_monitor.start()
+    problemset_index.start()
+    if JUDGE_URL or JUDGE_LOCAL:
+        sample_judge.start()
+    else:
+        log.info("Local judge off (set CF_JUDGE_URL or CF_JUDGE_LOCAL)")
+    warmup_task = asyncio.get_running_loop().create_task(warm_up())
+    if cookie_jar:
+        cookie_jar.start()
+    yield
+    warmup_task.cancel()
+    if cookie_jar:
+        await cookie_jar.shutdown()
+    await health_prober.shutdown()
+    await api_governor.shutdown()
+    await loop_monitor.shutdown()
+    await submit_queue.shutdown()
+    await submission_matcher.shutdown()
+    await problemset_index.shutdown()
+    await sample_judge.shutdown()
+    await verdict_tracker.shutdown()
+    await webhook_sender.shutdown()
+    if asset_mirror:
+        await asset_mirror.shutdown()
+
+
+app = FastAPI(title="CF Integration Service", version="1.0.0", lifespan=lifespan)
 
 # CORS — allow backend to call this service
 app.add_middleware(
@@ -37,45 +305,359 @@ app.add_middleware(
 )
 
 
+# --- Metrics ---
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "cf_http_requests_total", "Requests handled, by route and status", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "cf_http_request_duration_seconds", "Request latency until response headers", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("cf_http_requests_in_flight", "Requests currently being handled")
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "cf_upstream_duration_seconds", "Time per upstream step (Codeforces calls and page parsing)", ("step",)
+)
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge("cf_upstream_in_flight", "Upstream steps in progress", ("step",))
+THREADPOOL_WAIT = REGISTRY.histogram(
+    "cf_threadpool_wait_seconds", "Time parse jobs waited for a worker thread"
+)
+CLOUDFLARE_BLOCKS = REGISTRY.counter(
+    "cf_cloudflare_blocks_total", "Cloudflare 'Attention Required' pages received", ("step",)
+)
+RATE_LIMITED = REGISTRY.counter(
+    "cf_rate_limited_total", "Codeforces rate-limit responses (429s returned upstream)", ("step",)
+)
+UNAUTHORIZED = REGISTRY.counter(
+    "cf_unauthorized_total", "Requests rejected because the cookies were logged out", ("step",)
+)
+CSRF_FAILURES = REGISTRY.counter(
+    "cf_csrf_extraction_failures_total", "Submit pages with no extractable CSRF token"
+)
+API_QUEUE_WAIT = REGISTRY.histogram(
+    "cf_api_queue_wait_seconds", "Time API calls waited for the rate governor, by lane", ("lane",)
+)
+UPSTREAM_UP = REGISTRY.gauge(
+    "cf_upstream_up", "Last background probe result per target (1 = reachable)", ("target",)
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "cf_circuit_state", "Circuit breaker state per target (0 closed, 1 half-open, 2 open)", ("target",)
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    "cf_circuit_rejected_total", "Requests failed fast because the circuit was open", ("target",)
+)
+
+
+# --- Tracing ---
+
+tracer = Tracer("cf-service", TRACE_SAMPLE_RATE, json_line_logger("cf_service.trace", TRACE_LOG))
+
+
+# --- Circuit Breakers ---
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+site_circuit = CircuitBreaker(
+    "site",
+    failure_threshold=CIRCUIT_FAILURES,
+    reset_timeout=CIRCUIT_RESET,
+    on_change=lambda name, state: CIRCUIT_STATE.set(CIRCUIT_STATES[state], target=name),
+)
+api_circuit = CircuitBreaker(
+    "api",
+    failure_threshold=CIRCUIT_FAILURES,
+    reset_timeout=CIRCUIT_RESET,
+    on_change=lambda name, state: CIRCUIT_STATE.set(CIRCUIT_STATES[state], target=name),
+)
+for _circuit in (site_circuit, api_circuit):
+    CIRCUIT_STATE.set(0, target=_circuit.name)
+
+# Upstream steps that are network calls; parse steps never trip a breaker
+CIRCUIT_STEPS = {
+    "homepage": site_circuit,
+    "problem_page": site_circuit,
+    "csrf_page": site_circuit,
+    "submit_post": site_circuit,
+    "submission_page": site_circuit,
+    "user_status": api_circuit,
+    "problemset_problems": api_circuit,
+}
+
+
+def circuit_check(step: str) -> None:
+    """Fail fast with 503 + Retry-After instead of calling a target whose circuit is open."""
+    circuit = CIRCUIT_STEPS[step]
+    try:
+        circuit.before()
+    except CircuitOpenError as e:
+        CIRCUIT_REJECTED.inc(target=e.name)
+        raise HTTPException(
+            status_code=503,
+            detail=f"Codeforces {e.name} unavailable (circuit open), retry later",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+
+
+@contextmanager
+def upstream(step: str):
+    """
+    Time one upstream step (metrics, and a span in a sampled trace) and count
+    it as in flight while it runs. A network error counts as a failure on the
+    step's circuit.
+    """
+    with UPSTREAM_IN_FLIGHT.track(step=step), UPSTREAM_LATENCY.time(step=step), tracer.span(step):
+        try:
+            yield
+        except Exception:
+            if step in CIRCUIT_STEPS:
+                CIRCUIT_STEPS[step].failure()
+            raise
+
+
+def cloudflare_blocked(r, step: str) -> bool:
+    """
+    Whether CF answered with a Cloudflare block page. Also settles the call
+    on its circuit: blocks and 5xx count as failures, anything else (including
+    the API's "Call limit exceeded" 503, which is our fault) as a success.
+    """
+    blocked = "Attention Required" in r.text
+    if blocked:
+        CLOUDFLARE_BLOCKS.inc(step=step)
+    circuit = CIRCUIT_STEPS.get(step)
+    if circuit is not None:
+        if blocked or (r.status_code >= 500 and "limit exceeded" not in r.text):
+            circuit.failure()
+        else:
+            circuit.success()
+    return blocked
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    span = tracer.start_request(request.headers.get("traceparent"), request.method)
+    token = current_span.set(span)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        current_span.reset(token)
+        HTTP_IN_FLIGHT.dec()
+        # Route template, not the raw path, so IDs don't explode the label set
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=path, status=status)
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, route=path)
+        if span is not None:
+            span.name = f"{request.method} {path}"
+            span.attrs.update(path=request.url.path, status=status)
+            span.status = "error" if status >= 500 else "ok"
+            tracer.finish(span)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, upstream and queue metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+# --- Shared State ---
+
+shared_store = SharedStore(SHARED_STATE_PATH) if SHARED_STATE_PATH else None
+
+
+def shared_bucket(name: str, rate: float, burst: int) -> Optional[SharedTokenBucket]:
+    """A token bucket all workers draw from, or None (use a local one) with a single worker."""
+    if shared_store is None:
+        return None
+    return SharedTokenBucket(shared_store, name, rate, burst)
+
+
 # --- Utility Functions ---
 
+# Sessions are reused across requests so keep-alive connections and
+# Cloudflare clearance cookies survive between calls.
+account_sessions = SessionPool(
+    max_size=SESSION_POOL_SIZE,
+    idle_ttl=SESSION_IDLE_TTL,
+    cookie_domain=CF_COOKIE_DOMAIN,
+    max_clients=SESSION_MAX_CLIENTS,
+)
+anonymous_sessions = SessionPool(
+    max_size=1,
+    idle_ttl=SESSION_IDLE_TTL,
+    cookie_domain=CF_COOKIE_DOMAIN,
+    max_clients=SESSION_MAX_CLIENTS,
+)
+
+
+csrf_cache = CsrfCache(ttl=CSRF_TTL, shared=shared_store)
+bulk_pacer = HostPacer(BULK_PACING_MS / 1000)
+problem_cache = AsyncTTLCache(
+    max_size=PROBLEM_CACHE_SIZE,
+    ttl=PROBLEM_CACHE_TTL,
+    stale_ttl=PROBLEM_CACHE_STALE_TTL,
+    shared=shared_store,
+)
+
+
+def account_session(cookie_str: str):
+    """
+    `with account_session(cookies) as sess:` — the pooled curl_cffi session
+    (Chrome impersonation) for these cookies, kept open until the block ends.
+    """
+    return account_sessions.checkout(cookie_str)
+
+
+def public_session() -> cf_requests.AsyncSession:
+    """Get the shared cookie-less session used for public pages."""
+    return anonymous_sessions.get()
+
 
-def parse_cookies(cookie_str: str) -> dict:
-    """Parse 'key=value; key2=value2' into dict."""
-    cookies = {}
-    for part in cookie_str.split(";"):
-        part = part.strip()
-        if "=" in part:
-            k, v = part.split("=", 1)
-            cookies[k.strip()] = v.strip()
-    return cookies
+# --- Codeforces API ---
 
+# API calls are paced to one at a time anyway: one keep-alive connection is plenty
+api_sessions = SessionPool(
+    max_size=1,
+    idle_ttl=SESSION_IDLE_TTL,
+    cookie_domain=CF_COOKIE_DOMAIN,
+    max_clients=1,
+)
 
-def make_session(cookie_str: str) -> cf_requests.Session:
-    """Create a curl_cffi session impersonating Chrome with the given cookies."""
-    sess = cf_requests.Session(impersonate="chrome")
-    cookies = parse_cookies(cookie_str)
-    for k, v in cookies.items():
-        sess.cookies.set(k, v, domain=".codeforces.com")
-    return sess
+
+async def send_api_call(method: str, params: dict):
+    """
+    One /api/{method} request, made when the governor dispatches it.
+    Returns the "result" field; raises 502 on any API failure.
+    """
+    step = method.replace(".", "_")
+    circuit_check(step)
+    try:
+        with upstream(step):
+            resp = await api_sessions.get().get(f"{CF_BASE}/api/{method}", params=params, timeout=10)
+        cloudflare_blocked(resp, step)
+        data = resp.json()
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"CF API error: {str(e)}")
+
+    if data.get("status") != "OK":
+        # The API answers "Call limit exceeded" (HTTP 503) when called too often
+        if resp.status_code in (429, 503) or "limit exceeded" in str(data.get("comment", "")):
+            RATE_LIMITED.inc(step=step)
+            api_governor.backoff()
+        raise HTTPException(
+            status_code=502,
+            detail=f"CF API returned: {data.get('comment', 'Unknown error')}",
+        )
+
+    return data.get("result")
+
+
+# Every API call in the service goes through here: paced, prioritised, coalesced
+api_governor = ApiGovernor(
+    send=send_api_call,
+    rate_per_minute=API_RATE_PER_MIN,
+    burst=API_BURST,
+    on_dispatch=lambda lane, waited: API_QUEUE_WAIT.observe(waited, lane=lane),
+    bucket=shared_bucket("api", API_RATE_PER_MIN / 60, API_BURST),
+)
 
 
 # --- Health Check ---
 
 
-@app.get("/health")
-def health():
-    """Check that curl_cffi can reach Codeforces."""
+async def probe_homepage() -> tuple:
+    r = await public_session().get(f"{CF_BASE}/", timeout=HEALTH_TIMEOUT)
+    if cloudflare_blocked(r, "homepage"):
+        return False, "Cloudflare blocked request"
+    return r.status_code == 200, f"HTTP {r.status_code}"
+
+
+async def probe_api() -> tuple:
+    # Real traffic already proves the API works; don't spend rate budget on it
+    if api_governor.recently_succeeded(HEALTH_INTERVAL):
+        return True, "OK (recent API calls)"
     try:
-        sess = cf_requests.Session(impersonate="chrome")
-        r = sess.get("https://codeforces.com/", timeout=10)
-        cf_ok = r.status_code == 200 and "Attention Required" not in r.text
-    except Exception:
-        cf_ok = False
+        await fetch_user_status(HEALTH_API_HANDLE, 1, 1, priority=PRIORITY_METADATA)
+    except HTTPException as e:
+        return False, e.detail
+    return True, "OK"
+
+
+async def probe_submit_page() -> tuple:
+    r = await public_session().get(f"{CF_BASE}/problemset/submit", timeout=HEALTH_TIMEOUT)
+    if cloudflare_blocked(r, "csrf_page"):
+        return False, "Cloudflare blocked submit page"
+    return r.status_code == 200, f"HTTP {r.status_code}"
+
+
+health_prober = HealthProber(
+    probes={"homepage": probe_homepage, "api": probe_api, "submitPage": probe_submit_page},
+    interval=HEALTH_INTERVAL,
+    timeout=HEALTH_TIMEOUT,
+    on_result=lambda target, ok: UPSTREAM_UP.set(1 if ok else 0, target=target),
+)
+loop_monitor = LoopMonitor()
+
+
+@app.get("/health")
+async def health():
+    """
+    Codeforces reachability from the background prober (never calls upstream).
+    Each target reports its last result and how old it is.
+    """
+    probes = health_prober.snapshot()
+    return {
+        "status": probes["status"],
+        "codeforces_reachable": bool(probes["targets"]["homepage"].get("ok")),
+        "probes": probes,
+        "sessions": {
+            "accounts": account_sessions.stats(),
+            "anonymous": anonymous_sessions.stats(),
+        },
+        "verdictTracker": verdict_tracker.stats(),
+        "csrf": csrf_cache.stats(),
+        "problemCache": problem_cache.stats(),
+        "problemIndex": problemset_index.stats(),
+        "sampleJudge": sample_judge.stats(),
+        "assets": asset_mirror.stats() if asset_mirror else None,
+        "submitQueue": submit_queue.stats(),
+        "attribution": submission_matcher.stats(),
+        "accountPool": account_pool.stats(),
+        "apiGovernor": api_governor.stats(),
+        "callbacks": {**webhook_sender.stats(), "registered": len(verdict_callbacks)},
+        "circuits": {"site": site_circuit.stats(), "api": api_circuit.stats()},
+        "sharedState": shared_store.stats() if shared_store else None,
+        "cookieJar": cookie_jar.stats() if cookie_jar else None,
+        "tracing": tracer.stats(),
+        "warmup": warmup,
+    }
+
 
+@app.get("/health/live")
+async def liveness():
+    """
+    The process's own saturation: worker-thread pool usage, event-loop lag,
+    in-flight requests and queued submissions. "saturated" means work is
+    waiting on us, not on Codeforces.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    pool = limiter.statistics()
+    loop = loop_monitor.stats()
+    queue = submit_queue.stats()
+    saturated = pool.tasks_waiting > 0 or loop["lagMs"] > LOOP_LAG_LIMIT * 1000
     return {
-        "status": "ok" if cf_ok else "degraded",
-        "codeforces_reachable": cf_ok,
+        "status": "saturated" if saturated else "ok",
+        "threadPool": {
+            "busy": pool.borrowed_tokens,
+            "size": int(limiter.total_tokens),
+            "waiting": pool.tasks_waiting,
+        },
+        "eventLoop": loop,
+        "inFlightRequests": int(HTTP_IN_FLIGHT.value()),
+        "submitQueue": {"queued": queue["queued"], "submitting": queue["submitting"]},
     }
 
 
@@ -83,41 +665,36 @@ def health():
 
 
 @app.post("/cf/validate-cookies")
-def validate_cookies(req: CookieValidation):
+async def validate_cookies(req: CookieValidation):
     """
     Validate cookies by loading CF homepage and extracting handle.
     Returns: { "valid": true, "handle": "username" }
     """
-    sess = make_session(req.cookies)
+    circuit_check("homepage")
     try:
-        r = sess.get("https://codeforces.com/", timeout=15)
+        with account_session(req.cookies) as sess, upstream("homepage"):
+            r = await sess.get(f"{CF_BASE}/", timeout=15)
     except Exception as e:
         raise HTTPException(
             status_code=502, detail=f"Failed to reach Codeforces: {str(e)}"
         )
 
+    if cloudflare_blocked(r, "homepage"):
+        raise HTTPException(status_code=502, detail="Cloudflare blocked request")
+
     if r.status_code != 200:
         raise HTTPException(status_code=502, detail=f"CF returned HTTP {r.status_code}")
 
-    if "Attention Required" in r.text:
-        raise HTTPException(status_code=502, detail="Cloudflare blocked request")
-
-    # Extract handle from page JavaScript: handle = "username"
-    # This variable only exists when the user is logged in
-    handle_match = re.search(r'handle\s*=\s*"([^"]+)"', r.text)
-    if handle_match:
-        return {"valid": True, "handle": handle_match.group(1)}
-
-    # Fallback: look for the header logout link (only present when logged in)
-    # Pattern: <a href="/profile/handle">handle</a> near "logout" in the header
-    logout_match = re.search(r"logout", r.text, re.IGNORECASE)
-    if logout_match:
-        # Find profile link near the header area (logged-in user's profile)
-        header_match = re.search(r'<a[^>]+href="/profile/([^"]+)"[^>]*>\1</a>', r.text)
-        if header_match:
-            return {"valid": True, "handle": header_match.group(1)}
+    # Handle from page JavaScript (handle = "username"), or the header's
+    # profile link next to "logout" — both only exist when logged in
+    handle = extract_logged_in_handle(r.text)
+    if handle:
+        return {"valid": True, "handle": handle}
 
     # No logged-in indicators found
+    UNAUTHORIZED.inc(step="homepage")
+    account_sessions.discard(req.cookies)
+    csrf_cache.invalidate(cookie_key(req.cookies))
     raise HTTPException(
         status_code=401, detail="Cookies invalid or expired — no logged-in handle found"
     )
@@ -127,152 +704,325 @@ def validate_cookies(req: CookieValidation):
 
 
 @app.get("/cf/problem/{contest_id}/{problem_index}")
-def fetch_problem(contest_id: int, problem_index: str):
+async def fetch_problem(contest_id: int, problem_index: str):
     """
     Fetch a problem statement from Codeforces.
     Uses curl_cffi to bypass Cloudflare (no cookies needed for public problems).
     Returns parsed problem data including HTML statement and sample tests.
+
+    Served from an in-process cache; concurrent misses for the same problem
+    share one upstream fetch. Rating and tags come from the problemset index
+    when it knows the problem (the page's are used otherwise).
     """
-    sess = cf_requests.Session(impersonate="chrome")
-    url = f"https://codeforces.com/contest/{contest_id}/problem/{problem_index}"
+    problem = await problem_cache.get(
+        (contest_id, problem_index),
+        lambda: load_problem(contest_id, problem_index),
+    )
+    return problemset_index.annotate(problem)
+
 
+async def load_problem(contest_id: int, problem_index: str) -> dict:
+    """Download and parse one problem page (no caching)."""
+    sess = public_session()
+    url = f"{CF_BASE}/contest/{contest_id}/problem/{problem_index}"
+
+    circuit_check("problem_page")
     try:
-        r = sess.get(url, timeout=15)
+        with upstream("problem_page"):
+            r = await sess.get(url, timeout=15)
     except Exception as e:
         raise HTTPException(
             status_code=502, detail=f"Failed to reach Codeforces: {str(e)}"
         )
 
+    if cloudflare_blocked(r, "problem_page"):
+        raise HTTPException(status_code=502, detail="Cloudflare blocked request")
+
     if r.status_code != 200:
         raise HTTPException(
             status_code=502, detail=f"CF returned HTTP {r.status_code} for {url}"
         )
 
-    if "Attention Required" in r.text:
-        raise HTTPException(status_code=502, detail="Cloudflare blocked request")
+    # Parsing is CPU-bound — keep it off the event loop
+    parsed = await run_in_threadpool(timed_parse, time.perf_counter(), r.text)
+    if asset_mirror:
+        parsed["statementHtml"] = asset_mirror.rewrite(parsed["statementHtml"])
+    return {"contestId": contest_id, "problemIndex": problem_index, **parsed}
 
-    html = r.text
 
-    # Extract the full problem-statement div
-    statement_match = re.search(
-        r'<div class="problem-statement">(.*?)</div>\s*</div>\s*</div>',
-        html,
-        re.DOTALL,
-    )
+def timed_parse(queued_at: float, html: str) -> dict:
+    """parse_problem_page on a worker thread, recording how long it waited for one."""
+    THREADPOOL_WAIT.observe(time.perf_counter() - queued_at)
+    with upstream("problem_parse"):
+        return parse_problem_page(html)
 
-    # Extract title (e.g., "A. Watermelon")
-    title_match = re.search(r'<div class="title">(.+?)</div>', html)
 
-    # Extract time limit
-    time_match = re.search(
-        r'<div class="time-limit">.*?(\d+\s*second)', html, re.DOTALL
-    )
+# --- Statement Assets ---
 
-    # Extract memory limit
-    memory_match = re.search(
-        r'<div class="memory-limit">.*?(\d+\s*megabyte)', html, re.DOTALL
-    )
 
-    # Extract sample tests
-    samples = []
-    input_blocks = re.findall(
-        r'<div class="input">.*?<pre[^>]*>(.*?)</pre>', html, re.DOTALL
-    )
-    output_blocks = re.findall(
-        r'<div class="output">.*?<pre[^>]*>(.*?)</pre>', html, re.DOTALL
+async def fetch_asset(url: str) -> tuple:
+    """Download one statement image/attachment: (bytes, content type)."""
+    with upstream("asset"):
+        r = await public_session().get(url, timeout=30)
+    if r.status_code != 200 or b"Attention Required" in r.content[:4000]:
+        raise RuntimeError(f"HTTP {r.status_code}")
+    return r.content, r.headers.get("content-type", "application/octet-stream")
+
+
+asset_mirror = (
+    AssetMirror(
+        root=ASSET_DIR,
+        fetch=fetch_asset,
+        public_path=ASSET_PUBLIC_PATH,
+        base_url=CF_BASE,
+        concurrency=ASSET_CONCURRENCY,
+        max_bytes=ASSET_MAX_BYTES,
     )
-    for inp, out in zip(input_blocks, output_blocks):
-        # Clean HTML tags from samples (e.g., <br> → newline)
-        inp_clean = re.sub(r"<br\s*/?>", "\n", inp)
-        inp_clean = re.sub(r"<[^>]+>", "", inp_clean).strip()
-        out_clean = re.sub(r"<br\s*/?>", "\n", out)
-        out_clean = re.sub(r"<[^>]+>", "", out_clean).strip()
-        samples.append({"input": inp_clean, "output": out_clean})
-
-    # Extract rating if available
-    rating = None
-    rating_match = re.search(r'title="Difficulty"[^>]*>\s*\*(\d+)', html)
-    if rating_match:
-        rating = int(rating_match.group(1))
-
-    # Extract tags
-    tags = re.findall(r'<span class="tag-box"[^>]*>([^<]+)</span>', html)
-    tags = [t.strip() for t in tags]
+    if ASSET_DIR
+    else None
+)
 
-    return {
-        "contestId": contest_id,
-        "problemIndex": problem_index,
-        "name": title_match.group(1).strip() if title_match else "Unknown",
-        "timeLimit": time_match.group(1) if time_match else "Unknown",
-        "memoryLimit": memory_match.group(1) if memory_match else "Unknown",
-        "statementHtml": statement_match.group(0) if statement_match else "",
-        "sampleTests": samples,
-        "rating": rating,
-        "tags": tags,
-    }
+
+@app.get("/cf/assets/{name}")
+async def get_asset(name: str):
+    """
+    A mirrored statement asset, cacheable for a year (the content behind a
+    key never changes). Until the download has finished, redirects to the
+    Codeforces original.
+    """
+    meta = asset_mirror.lookup(name) if asset_mirror else None
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Unknown asset")
+    if meta.get("digest"):
+        return FileResponse(
+            asset_mirror.object_path(meta["digest"]),
+            media_type=meta.get("contentType"),
+            headers={"Cache-Control": ASSET_CACHE_CONTROL},
+        )
+    asset_mirror.schedule(name.split(".", 1)[0], meta["url"])
+    return RedirectResponse(meta["url"], status_code=302, headers={"Cache-Control": "no-store"})
 
 
-# --- Submit Solution ---
+@app.post("/cf/problems/bulk")
+async def fetch_problems_bulk(req: BulkProblemRequest):
+    """
+    Fetch many problems concurrently (e.g. to warm a whole contest before it starts).
+
+    At most `concurrency` fetches run at once, and upstream page loads are
+    paced per host (CF_BULK_PACING_MS apart). Cached problems skip both.
+    Streams NDJSON, one line per problem as soon as it completes:
+      {"contestId": 4, "problemIndex": "A", "ok": true, "problem": {...}}
+      {"contestId": 4, "problemIndex": "Z", "ok": false, "status": 502, "error": "..."}
+    followed by a final {"done": true, "ok": N, "failed": M}.
+    """
+    concurrency = max(1, min(req.concurrency or BULK_CONCURRENCY, BULK_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
 
+    async def paced_load(contest_id: int, index: str) -> dict:
+        await bulk_pacer.wait(_cf_host)
+        return await load_problem(contest_id, index)
 
-@app.post("/cf/submit")
-def submit_solution(req: SubmissionRequest):
+    async def fetch_one(ref: ProblemRef) -> dict:
+        line = {"contestId": ref.contest_id, "problemIndex": ref.index}
+        async with semaphore:
+            try:
+                problem = await problem_cache.get(
+                    (ref.contest_id, ref.index),
+                    lambda: paced_load(ref.contest_id, ref.index),
+                )
+                return {**line, "ok": True, "problem": problemset_index.annotate(problem)}
+            except HTTPException as e:
+                return {**line, "ok": False, "status": e.status_code, "error": e.detail}
+            except Exception as e:
+                return {**line, "ok": False, "status": 502, "error": str(e)}
+
+    # Same problem listed twice is fetched once
+    refs = list({(r.contest_id, r.index): r for r in req.problems}.values())
+
+    async def lines():
+        tasks = [asyncio.create_task(fetch_one(ref)) for ref in refs]
+        ok = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                ok += result["ok"]
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, "ok": ok, "failed": len(tasks) - ok}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# --- Problemset Search ---
+
+problemset_index = ProblemIndex(
+    fetch=lambda: api_governor.call("problemset.problems", {}, PRIORITY_METADATA),
+    snapshot_path=PROBLEMSET_SNAPSHOT,
+    interval=PROBLEMSET_REFRESH,
+)
+
+
+@app.get("/cf/problems/search")
+async def search_problems(
+    q: str = "",
+    min_rating: Optional[int] = None,
+    max_rating: Optional[int] = None,
+    tags: Optional[str] = None,
+    match: str = "all",
+    limit: int = 50,
+    offset: int = 0,
+):
     """
-    Submit a solution to Codeforces.
+    Search the problemset index, newest problems first.
+    `q` matches a substring of the name or code ("1234b"), `tags=dp,greedy`
+    requires all of them (`match=any`: one is enough); a rating bound leaves
+    out unrated problems. Returns {"total", "problems", "tags"} where "tags"
+    lists every known tag. Answered from memory, never calls Codeforces.
+    """
+    if match not in ("all", "any"):
+        raise HTTPException(status_code=400, detail="match must be 'all' or 'any'")
+    total, problems = problemset_index.search(
+        q=q,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        tags=tags.split(",") if tags else (),
+        match_all=match == "all",
+        limit=max(0, min(limit, PROBLEM_SEARCH_MAX_LIMIT)),
+        offset=max(0, offset),
+    )
+    return {"total": total, "problems": problems, "tags": problemset_index.tag_names()}
+
+
+# --- Local Sample Judging ---
+
+judge_sessions = SessionPool(
+    max_size=1,
+    idle_ttl=SESSION_IDLE_TTL,
+    cookie_domain=CF_COOKIE_DOMAIN,
+    max_clients=SESSION_MAX_CLIENTS,
+)
 
-    Flow (PROVEN WORKING — Submission #363219620, Verdict: OK):
-    1. GET /problemset/submit → extract csrf_token
-    2. POST /problemset/submit?csrf_token=XXX with form data
-    3. On success, CF redirects to /problemset/status?my=on
-    4. Extract submission ID from page or via API
 
-    Returns: { "success": true, "submission_id": 363219620 }
+async def post_judge(url: str, payload: dict) -> tuple:
+    r = await judge_sessions.get().post(url, json=payload, timeout=JUDGE_TIMEOUT)
+    return r.status_code, r.json()
+
+
+async def get_judge(url: str) -> tuple:
+    r = await judge_sessions.get().get(url, timeout=10)
+    return r.status_code, r.json()
+
+
+# Never started (so off) unless CF_JUDGE_URL or CF_JUDGE_LOCAL is set
+sample_judge = (
+    RemoteJudge(JUDGE_URL, post=post_judge, get=get_judge)
+    if JUDGE_URL
+    else SampleJudge(
+        root=JUDGE_DIR,
+        languages=load_languages(JUDGE_LANGUAGES),
+        workers=JUDGE_WORKERS,
+        max_queue=JUDGE_MAX_QUEUE,
+        queue_timeout=JUDGE_QUEUE_TIMEOUT,
+        cache_size=JUDGE_CACHE_SIZE,
+    )
+)
+
+
+@app.post("/cf/judge/samples")
+async def judge_samples(req: JudgeRequest):
+    """
+    Compile the source and run it on the problem's sample tests locally, so
+    code that doesn't compile or fails a sample needn't be submitted.
+    Samples and limits come from the (cached) problem statement unless the
+    request carries them. Returns {"verdict", "language", "compile",
+    "tests", "passed", "total"}; 413 if the source or a sample is too
+    large, 422 if the language has no local judge, 503 if the judge is off
+    or busy (callers should then just submit). Limits are capped (see
+    sample_judge.MAX_TIME_LIMIT and friends) whatever the request says.
     """
-    sess = make_session(req.cookies)
+    if req.samples is None and (req.contest_id is None or not req.problem_index):
+        raise HTTPException(status_code=400, detail="Give contest_id and problem_index, or samples")
+    time_limit, memory_limit = 2.0, 256
+    samples = [s.model_dump() for s in req.samples] if req.samples is not None else None
+    if req.contest_id is not None and req.problem_index:
+        problem = await fetch_problem(req.contest_id, req.problem_index)
+        time_limit, memory_limit = parse_limits(problem)
+        if samples is None:
+            samples = problem.get("sampleTests", [])
+    try:
+        with tracer.span("sample_judge", language=req.language_id, samples=len(samples)):
+            return await sample_judge.judge(
+                req.language_id,
+                req.source_code,
+                samples,
+                time_limit=req.time_limit or time_limit,
+                memory_mb=req.memory_limit or memory_limit,
+                compile_only=req.compile_only,
+            )
+    except TooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedLanguage as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except JudgeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/cf/judge/languages")
+async def judge_languages():
+    """Languages the local judge knows, by CF programTypeId, and whether their tools are installed."""
+    return {"enabled": sample_judge.enabled, "languages": sample_judge.describe_languages()}
+
+
+# --- Submit Solution ---
+
 
-    # Step 1: Get CSRF token from submit page
+async def load_csrf_token(sess: cf_requests.AsyncSession, cookies: str) -> str:
+    """GET /problemset/submit, check the session is logged in and return its CSRF token."""
+    circuit_check("csrf_page")
     try:
-        r = sess.get("https://codeforces.com/problemset/submit", timeout=15)
+        with upstream("csrf_page"):
+            r = await sess.get(f"{CF_BASE}/problemset/submit", timeout=15)
     except Exception as e:
         raise HTTPException(
             status_code=502, detail=f"Failed to load submit page: {str(e)}"
         )
 
+    if cloudflare_blocked(r, "csrf_page"):
+        raise HTTPException(status_code=502, detail="Cloudflare blocked submit page")
+
     if r.status_code != 200:
         raise HTTPException(
             status_code=502,
             detail=f"Failed to load submit page: HTTP {r.status_code}",
         )
 
-    if "Attention Required" in r.text:
-        raise HTTPException(status_code=502, detail="Cloudflare blocked submit page")
-
     # Check if user is logged in (submit page requires auth)
     if "Enter" in r.text and "Register" in r.text and "submit" not in r.url.lower():
+        UNAUTHORIZED.inc(step="csrf_page")
+        account_sessions.discard(cookies)
+        csrf_cache.invalidate(cookie_key(cookies))
         raise HTTPException(
             status_code=401,
             detail="Not logged in — cookies may be expired",
         )
 
-    # Extract CSRF token (try multiple patterns)
-    csrf_token = None
-    for pattern in [
-        r'name=["\']csrf_token["\']\s+value=["\']([^"\']+)["\']',
-        r"csrf_token\s*[\"']?\s*[:=]\s*[\"']?([a-f0-9]{32})",
-        r"csrf_token\s*=\s*'([^']+)'",
-    ]:
-        match = re.search(pattern, r.text)
-        if match:
-            csrf_token = match.group(1)
-            break
-
+    csrf_token = extract_csrf_token(r.text)
     if not csrf_token:
+        CSRF_FAILURES.inc()
         raise HTTPException(
             status_code=502,
             detail="Could not extract CSRF token — user may not be logged in",
         )
 
-    # Step 2: POST submission
+    csrf_cache.put(cookie_key(cookies), csrf_token)
+    return csrf_token
+
+
+async def post_submission(
+    sess: cf_requests.AsyncSession, csrf_token: str, req: SubmissionRequest
+):
     data = {
         "csrf_token": csrf_token,
         "action": "submitSolutionFormSubmitted",
@@ -284,53 +1034,156 @@ def submit_solution(req: SubmissionRequest):
     }
 
     headers = {
-        "Referer": "https://codeforces.com/problemset/submit",
-        "Origin": "https://codeforces.com",
+        "Referer": f"{CF_BASE}/problemset/submit",
+        "Origin": CF_BASE,
     }
 
+    circuit_check("submit_post")
     try:
-        r = sess.post(
-            f"https://codeforces.com/problemset/submit?csrf_token={csrf_token}",
-            data=data,
-            headers=headers,
-            timeout=30,
-        )
+        with upstream("submit_post"):
+            r = await sess.post(
+                f"{CF_BASE}/problemset/submit?csrf_token={csrf_token}",
+                data=data,
+                headers=headers,
+                timeout=30,
+            )
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Submission POST failed: {str(e)}")
 
-    # Step 3: Check for success (redirect to status page)
+    cloudflare_blocked(r, "submit_post")
+    return r
+
+
+def submission_accepted(r) -> bool:
+    """On success, CF redirects to the status page."""
     final_url = str(r.url)
+    return "my=on" in final_url or "status" in final_url
 
-    if "my=on" in final_url or "status" in final_url:
-        # Try to extract submission ID from the status page HTML
-        sid_match = re.search(r'data-submission-id="(\d+)"', r.text)
-        if sid_match:
-            return {"success": True, "submission_id": int(sid_match.group(1))}
 
-        # Fallback: get latest submission via public API
-        handle_match = re.search(r'handle\s*=\s*"([^"]+)"', r.text)
-        if handle_match:
-            handle = handle_match.group(1)
-            try:
-                api_r = sess.get(
-                    f"https://codeforces.com/api/user.status?handle={handle}&from=1&count=1",
-                    timeout=10,
-                )
-                if api_r.status_code == 200:
-                    api_data = api_r.json()
-                    if api_data.get("status") == "OK" and api_data.get("result"):
-                        return {
-                            "success": True,
-                            "submission_id": api_data["result"][0]["id"],
-                        }
-            except Exception:
-                pass
-
-        # Submission went through but couldn't extract ID
-        return {"success": True, "submission_id": None}
+def looks_like_token_rejection(r) -> bool:
+    """
+    Whether CF positively rejected the POST's CSRF token (its "Invalid CSRF
+    token" error). Any other response that isn't clearly accepted may still
+    have created the submission, so it must not be re-posted: that could
+    submit the code twice.
+    """
+    if submission_accepted(r):
+        return False
+    if "You have submitted" in r.text or "Same code" in r.text:
+        return False  # known errors; the re-rendered form also echoes the source back
+    return r.status_code in (200, 403) and csrf_rejected(r.text)
+
+
+async def fetch_submission_source(sess: cf_requests.AsyncSession, record: dict) -> Optional[str]:
+    """A submission's source from its page (visible to the account that made it)."""
+    circuit_check("submission_page")
+    with upstream("submission_page"):
+        r = await sess.get(
+            f"{CF_BASE}/contest/{record['problem']['contestId']}/submission/{record['id']}", timeout=15
+        )
+    if cloudflare_blocked(r, "submission_page") or r.status_code != 200:
+        return None
+    return extract_submission_source(r.text)
+
+
+async def attribute_submission(req: SubmissionRequest, handle: str, submitted_at: float) -> dict:
+    """Match an accepted submission to its user.status record (None if none turned up)."""
+    with tracer.span("attribute", handle=handle), account_session(req.cookies) as sess:
+        submission_id = await submission_matcher.attribute(
+            handle,
+            req.problem_code,
+            req.language_id,
+            req.source_code,
+            submitted_at,
+            read_source=lambda record: fetch_submission_source(sess, record),
+            # Pooled accounts are shared with other workers and people: a lone
+            # candidate may not be ours
+            verify=account_pool.by_key(cookie_key(req.cookies)) is not None,
+        )
+    return {"success": True, "submission_id": submission_id, "handle": handle}
+
+
+# Pending attributions of one handle share a user.status call per round
+submission_matcher = SubmissionMatcher(
+    fetch_recent=lambda handle, count: fetch_user_status(handle, 1, count, priority=PRIORITY_SUBMISSION),
+    interval=ATTRIBUTION_INTERVAL,
+    timeout=ATTRIBUTION_TIMEOUT,
+    store=shared_store,
+)
+
+
+async def perform_submission(req: SubmissionRequest):
+    """
+    Submit a solution to Codeforces (one upstream attempt, called by the queue).
+
+    Flow (PROVEN WORKING — Submission #363219620, Verdict: OK):
+    1. GET /problemset/submit → extract csrf_token (cached per session)
+    2. POST /problemset/submit?csrf_token=XXX with form data
+    3. On success, CF redirects to /problemset/status?my=on
+    4. Extract submission ID from page or via API
+
+    A cached token that CF rejects ("Invalid CSRF token") is refreshed from
+    the submit page and the POST is retried once; no other failure is
+    re-posted, since the first POST may have gone through.
+
+    The status page's newest row is only taken as ours when it is for the
+    submitted problem and no other worker shares the account. Otherwise the
+    ID is matched against user.status (SubmissionMatcher), and since the
+    submission is already on Codeforces by then, this returns an awaitable
+    of the result: the queue settles it without holding up the account.
+
+    Returns: { "success": true, "submission_id": 363219620, "handle": "..." }
+    """
+    key = cookie_key(req.cookies)
+
+    with account_session(req.cookies) as sess:
+        # Step 1: Get CSRF token (cache first, submit page on a miss)
+        csrf_token = csrf_cache.get(key)
+        from_cache = csrf_token is not None
+        tracer.annotate(csrfCached=from_cache)
+        if not from_cache:
+            csrf_token = await load_csrf_token(sess, req.cookies)
+
+        # Step 2: POST submission
+        submitted_at = time.time()
+        r = await post_submission(sess, csrf_token, req)
+
+        if from_cache and looks_like_token_rejection(r):
+            csrf_cache.invalidate(key)
+            csrf_cache.retries += 1
+            csrf_token = await load_csrf_token(sess, req.cookies)
+            r = await post_submission(sess, csrf_token, req)
+
+    # Step 3: Check for success (redirect to status page)
+    final_url = str(r.url)
+
+    if submission_accepted(r):
+        with upstream("status_parse"):
+            # Status page carries the session's token too — keep the cache warm
+            fresh_token = extract_csrf_token(r.text)
+            rows = extract_status_rows(r.text)
+            handle = extract_handle(r.text)
+
+        if fresh_token:
+            csrf_cache.put(key, fresh_token)
+        # With one worker, POSTs on an account are serialised by its queue lane,
+        # so the newest row is ours if it is for the same problem and nobody
+        # took it yet (two cookie strings of one account get separate lanes)
+        if (
+            rows
+            and shared_store is None
+            and rows[0][1] == parse_problem_code(req.problem_code)
+            and (not handle or submission_matcher.claim(handle, rows[0][0]))
+        ):
+            return {"success": True, "submission_id": rows[0][0], "handle": handle}
+        if not handle:
+            # Submission went through but there's nothing to match it against
+            return {"success": True, "submission_id": None, "handle": handle}
+        return attribute_submission(req, handle, submitted_at)
 
     # Check for rate limiting
     if "You have submitted" in r.text:
+        RATE_LIMITED.inc(step="submit_post")
         raise HTTPException(
             status_code=429,
             detail="Codeforces rate limit: submitted too often. Wait ~10 seconds.",
@@ -343,54 +1196,333 @@ def submit_solution(req: SubmissionRequest):
             detail="Duplicate submission: same code was already submitted for this problem",
         )
 
+    # Already counted (and fed to the circuit) by post_submission
+    if "Attention Required" in r.text:
+        raise HTTPException(status_code=502, detail="Cloudflare blocked submission")
+
     raise HTTPException(
         status_code=502,
         detail=f"Unexpected response from CF: HTTP {r.status_code}, URL: {final_url}",
     )
 
 
-# --- Get Verdict ---
+# --- Account Pool ---
 
+account_pool = AccountPool(cooldown=ACCOUNT_COOLDOWN)
+account_pool_version = None  # version of the shared account list this worker has loaded
+ACCOUNTS_TTL = 10 * 365 * 86400.0  # the shared list lives until replaced
 
-@app.get("/cf/verdict/{handle}/{submission_id}")
-def get_verdict(handle: str, submission_id: int):
+
+def sync_accounts() -> None:
+    """Load the account list another worker published, if it changed since we last looked."""
+    global account_pool_version
+    if shared_store is None:
+        return
+    shared = shared_store.get("accounts", "pool")
+    if shared and shared["version"] != account_pool_version:
+        account_pool.replace([tuple(entry) for entry in shared["accounts"]])
+        account_pool_version = shared["version"]
+
+
+def publish_accounts() -> None:
+    """After a change to the pool, hand the new list to the other workers."""
+    global account_pool_version
+    if shared_store is None:
+        return
+    account_pool_version = os.urandom(8).hex()
+    entries = [(a.handle, a.cookies) for a in account_pool.accounts.values()]
+    shared_store.put("accounts", "pool", {"version": account_pool_version, "accounts": entries}, ACCOUNTS_TTL)
+
+
+async def run_submission(req: SubmissionRequest):
     """
-    Get submission verdict from CF public API.
-    No cookies needed — this is a public endpoint.
-    Returns verdict, tests passed, time, memory.
+    Queue worker: one submit attempt, with the outcome recorded against its
+    account. Returns the result, or an awaitable of it while the accepted
+    submission's ID is still being matched.
     """
-    import urllib.request
-    import json as json_module
+    account = account_pool.by_key(cookie_key(req.cookies))
+    try:
+        with tracer.span("submit_attempt", problem=req.problem_code) as span:
+            result = await perform_submission(req)
+            if span is not None and not inspect.isawaitable(result):
+                span.attrs["submissionId"] = result.get("submission_id")
+    except HTTPException as e:
+        if account:
+            account_pool.record_failure(account, e.status_code, e.detail)
+        raise
+    if account:
+        account_pool.record_success(account)
+    if warmup["firstSubmitMs"] is None:
+        warmup["firstSubmitMs"] = round((time.monotonic() - PROCESS_STARTED) * 1000)
+    if inspect.isawaitable(result):
+        # Accepted, ID still to be matched: let the queue move on to the next job
+        return settle_submission(req, account, result)
+    return await settle_submission(req, account, result)
+
+
+async def settle_submission(req: SubmissionRequest, account, result) -> dict:
+    """Final result of an accepted submit: its ID resolved, callback registered."""
+    if inspect.isawaitable(result):
+        result = await result
+    if account:
+        result = {**result, "handle": account.handle}
+    register_callback(req, result)
+    return result
+
+
+def route_submission(req: SubmissionRequest) -> SubmissionRequest:
+    """Requests without cookies go to the least-loaded healthy pooled account."""
+    if req.cookies:
+        return req
+    sync_accounts()
+    account = account_pool.pick(load=submit_queue.load)
+    if account is None:
+        raise HTTPException(status_code=503, detail="No Codeforces accounts available")
+    return req.model_copy(update={"cookies": account.cookies})
+
+
+@app.get("/cf/accounts")
+async def list_accounts():
+    """Pooled accounts with their health (cookies are never returned)."""
+    sync_accounts()
+    return {"accounts": account_pool.describe(load=submit_queue.load)}
+
+
+@app.put("/cf/accounts")
+async def replace_accounts(req: AccountPoolRequest):
+    """Replace the whole pool (the backend syncs its linked accounts here)."""
+    sync_accounts()
+    account_pool.replace([(a.handle, a.cookies) for a in req.accounts])
+    publish_accounts()
+    return {"accounts": account_pool.describe(load=submit_queue.load)}
+
+
+@app.post("/cf/accounts")
+async def add_account(req: CfAccount):
+    sync_accounts()
+    account_pool.register(req.handle, req.cookies)
+    publish_accounts()
+    return {"accounts": account_pool.describe(load=submit_queue.load)}
+
+
+@app.delete("/cf/accounts/{handle}")
+async def remove_account(handle: str):
+    sync_accounts()
+    if account_pool.remove(handle) is None:
+        raise HTTPException(status_code=404, detail="Unknown account")
+    publish_accounts()
+    return {"accounts": account_pool.describe(load=submit_queue.load)}
+
+
+submit_queue = SubmitQueue(
+    submit=run_submission,
+    rate_per_minute=SUBMIT_RATE_PER_MIN,
+    burst=SUBMIT_BURST,
+    max_retries=SUBMIT_MAX_RETRIES,
+    retry_delay=SUBMIT_RETRY_DELAY,
+    job_ttl=SUBMIT_JOB_TTL,
+    make_bucket=(
+        (lambda account, rate, burst: shared_bucket(f"submit:{account}", rate, burst))
+        if shared_store
+        else None
+    ),
+    on_change=lambda job: publish_job(job),
+)
+
+
+def publish_job(job) -> None:
+    """Store a job's status so GET /cf/submit/jobs/{id} works on every worker."""
+    if shared_store is not None:
+        shared_store.put("submit-jobs", job.id, submit_queue.describe(job), SUBMIT_JOB_TTL)
 
-    url = f"https://codeforces.com/api/user.status" f"?handle={handle}&from=1&count=10"
 
+async def shared_job(job_id: str, wait: float) -> Optional[dict]:
+    """Status of a job queued on another worker, long-polling the store up to `wait` seconds."""
+    deadline = time.monotonic() + wait
+    while True:
+        snapshot = shared_store.get("submit-jobs", job_id)
+        if snapshot is None or snapshot["status"] in ("done", "failed") or time.monotonic() >= deadline:
+            return snapshot
+        await asyncio.sleep(SHARED_POLL_INTERVAL)
+
+REGISTRY.callback_gauge(
+    "cf_submit_queue_depth", "Submissions waiting in the queue",
+    lambda: submit_queue.stats()["queued"],
+)
+REGISTRY.callback_gauge(
+    "cf_api_queue_depth", "API calls waiting for the rate governor",
+    lambda: sum(api_governor.stats()["queued"].values()),
+)
+REGISTRY.callback_gauge(
+    "cf_problem_cache_entries", "Parsed problems in the cache",
+    lambda: problem_cache.stats()["size"],
+)
+REGISTRY.callback_gauge(
+    "cf_account_sessions", "Pooled per-account curl_cffi sessions",
+    lambda: account_sessions.stats()["size"],
+)
+
+
+# --- Startup Warm-up ---
+
+PROCESS_STARTED = time.monotonic()
+
+cookie_jar = (
+    CookieJarStore(
+        path=COOKIE_JAR_PATH,
+        key=COOKIE_JAR_KEY,
+        pools={"accounts": account_sessions, "anonymous": anonymous_sessions},
+        extra=lambda: {"accounts": [(a.handle, a.cookies) for a in account_pool.accounts.values()]},
+        interval=COOKIE_JAR_SAVE_INTERVAL,
+    )
+    if COOKIE_JAR_PATH and COOKIE_JAR_KEY
+    else None
+)
+warmup = {
+    "status": "warming",  # -> ready
+    "durationMs": None,
+    "timedOut": False,
+    "restoredCookies": 0,
+    "accounts": 0,
+    "csrfPrimed": 0,
+    "errors": [],
+    "firstSubmitMs": None,  # process start to the first successful submission
+}
+
+
+async def warm_up() -> None:
+    """Get ready for the first submission before /health/ready says so."""
+    started = time.monotonic()
     try:
-        req = urllib.request.Request(url)
-        req.add_header("User-Agent", "Mozilla/5.0")
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            data = json_module.loads(resp.read())
+        await asyncio.wait_for(prime_sessions(), WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        warmup["timedOut"] = True
+        log.warning("Warm-up did not finish within %ss, reporting ready anyway", WARMUP_TIMEOUT)
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"CF API error: {str(e)}")
+        warmup["errors"].append(str(e))
+        log.warning("Warm-up failed: %s", e)
+    warmup["durationMs"] = round((time.monotonic() - started) * 1000)
+    warmup["status"] = "ready"
+
+
+def restore_saved_state() -> None:
+    """Put the saved cookie jars back into the session pools, and the saved pool of accounts."""
+    if not cookie_jar:
+        return
+    saved = cookie_jar.load()
+    warmup["restoredCookies"] = cookie_jar.restored
+    sync_accounts()
+    if not account_pool.accounts and saved.get("accounts"):
+        account_pool.replace([tuple(entry) for entry in saved["accounts"]])
+        publish_accounts()
+
+
+async def prime_sessions() -> None:
+    """
+    Open the public connection and load every pooled account's submit page,
+    which opens its connection and caches its CSRF token.
+    """
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+    async def open_public() -> None:
+        try:
+            with upstream("homepage"):
+                await public_session().get(f"{CF_BASE}/", timeout=HEALTH_TIMEOUT)
+        except Exception as e:
+            warmup["errors"].append(f"homepage: {e}")
+
+    async def prime_account(account) -> None:
+        async with semaphore:
+            try:
+                with account_session(account.cookies) as sess:
+                    await load_csrf_token(sess, account.cookies)
+                warmup["csrfPrimed"] += 1
+            except HTTPException as e:
+                account_pool.record_failure(account, e.status_code, e.detail)
+                warmup["errors"].append(f"{account.handle}: {e.detail}")
+
+    accounts = [a for a in account_pool.accounts.values() if a.valid]
+    warmup["accounts"] = len(accounts)
+    await asyncio.gather(open_public(), *(prime_account(a) for a in accounts))
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness: 503 while the startup warm-up runs, then 200 with its report
+    (duration, cookies restored, CSRF tokens primed, time to first submission).
+    """
+    return JSONResponse(warmup, status_code=200 if warmup["status"] == "ready" else 503)
+
+
+@app.post("/cf/submit")
+async def submit_solution(req: SubmissionRequest):
+    """
+    Submit a solution and wait for the result.
+
+    Goes through the same paced queue as /cf/submit/jobs, so bursts are
+    spread out instead of failing. Without cookies the submission goes to
+    a pooled account, whose handle is returned alongside the ID:
+    { "success": true, "submission_id": 363219620, "handle": "..." }
+    """
+    req = route_submission(req)
+    job = submit_queue.enqueue(cookie_key(req.cookies), req)
+    await submit_queue.wait(job)
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status or 502, detail=job.error)
+    return job.result
+
+
+@app.post("/cf/submit/jobs", status_code=202)
+async def enqueue_submission(req: SubmissionRequest):
+    """
+    Queue a submission and return immediately with a job ID.
+    Poll GET /cf/submit/jobs/{job_id} for its position and result.
+    With `callback_url` (or CF_VERDICT_CALLBACK_URL set), the final verdict
+    is also POSTed there once Codeforces has judged it, with `callback_ref`
+    echoed back as "ref" and an Idempotency-Key header.
+    """
+    req = route_submission(req)
+    job = submit_queue.enqueue(cookie_key(req.cookies), req)
+    return submit_queue.describe(job)
 
-    if data.get("status") != "OK":
-        raise HTTPException(
-            status_code=502,
-            detail=f"CF API returned: {data.get('comment', 'Unknown error')}",
-        )
 
-    # Find the specific submission in recent results
-    for sub in data.get("result", []):
-        if sub["id"] == submission_id:
-            return {
-                "id": sub["id"],
-                "verdict": sub.get("verdict", "TESTING"),
-                "testsPassed": sub.get("passedTestCount", 0),
-                "timeMs": sub.get("timeConsumedMillis", 0),
-                "memoryBytes": sub.get("memoryConsumedBytes", 0),
-                "problem": f"{sub['problem']['contestId']}{sub['problem']['index']}",
-            }
-
-    # Submission not found in recent — might still be in queue
+@app.get("/cf/submit/jobs/{job_id}")
+async def get_submission_job(job_id: str, wait: float = 0):
+    """
+    Job status: queued (with 1-based position), submitting, done (result
+    holds submission_id) or failed (error holds the HTTP status and detail).
+    `wait` long-polls up to that many seconds (max 30) for the job to finish.
+    """
+    job = submit_queue.get(job_id)
+    if job is None and shared_store is not None:
+        snapshot = await shared_job(job_id, min(wait, SUBMIT_JOB_MAX_WAIT))
+        if snapshot is not None:
+            return snapshot
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if wait > 0 and not job.done.is_set():
+        await submit_queue.wait(job, min(wait, SUBMIT_JOB_MAX_WAIT))
+    return submit_queue.describe(job)
+
+
+# --- Get Verdict ---
+
+
+def format_verdict(sub: dict) -> dict:
+    """Shape a user.status record into the verdict payload the backend expects."""
+    return {
+        "id": sub["id"],
+        "verdict": sub.get("verdict", "TESTING"),
+        "testsPassed": sub.get("passedTestCount", 0),
+        "timeMs": sub.get("timeConsumedMillis", 0),
+        "memoryBytes": sub.get("memoryConsumedBytes", 0),
+        "problem": f"{sub['problem']['contestId']}{sub['problem']['index']}",
+    }
+
+
+def pending_verdict(submission_id: int) -> dict:
+    """Placeholder for a submission that is not visible in user.status yet."""
     return {
         "id": submission_id,
         "verdict": "TESTING",
@@ -399,3 +1531,183 @@ def get_verdict(handle: str, submission_id: int):
         "memoryBytes": 0,
         "problem": "unknown",
     }
+
+
+async def fetch_user_status(
+    handle: str, start: int, count: int, priority: int = PRIORITY_VERDICT
+) -> list:
+    """One user.status call (newest first) through the API governor. Raises 502 on any API failure."""
+    params = {"handle": handle, "from": start, "count": count}
+    # Spans the wait in the governor's queue as well as the call itself
+    with tracer.span("api_call", method="user.status", **params):
+        return await api_governor.call("user.status", params, priority) or []
+
+
+@app.get("/cf/verdict/{handle}/{submission_id}")
+async def get_verdict(handle: str, submission_id: int):
+    """
+    Get submission verdict from CF public API.
+    No cookies needed — this is a public endpoint.
+    Returns verdict, tests passed, time, memory.
+    """
+    # Served from the handle's verdict index, however far back the submission is
+    with tracer.span("verdict_resolve", handle=handle, ids=1), tracking_capacity():
+        verdicts = await verdict_tracker.resolve(handle, [submission_id])
+    return verdicts[submission_id] or pending_verdict(submission_id)
+
+
+@app.post("/cf/verdicts")
+async def get_verdicts(req: VerdictBatchRequest):
+    """
+    Resolve many submissions of one handle from the handle's verdict index.
+
+    The index only fetches records newer than its cursor, and pages back
+    (VERDICT_PAGE_SIZE records at a time) for IDs older than anything indexed.
+    IDs that are not visible in user.status yet are reported as TESTING.
+    Returns: { "handle": "...", "verdicts": [ {id, verdict, ...}, ... ] }
+    """
+    with tracer.span("verdict_resolve", handle=req.handle, ids=len(req.submission_ids)), tracking_capacity():
+        verdicts = await verdict_tracker.resolve(req.handle, req.submission_ids)
+    return {
+        "handle": req.handle,
+        "verdicts": [verdicts[sid] or pending_verdict(sid) for sid in req.submission_ids],
+    }
+
+
+# --- Verdict Callbacks ---
+
+callback_sessions = SessionPool(
+    max_size=1,
+    idle_ttl=SESSION_IDLE_TTL,
+    cookie_domain=CF_COOKIE_DOMAIN,
+    max_clients=SESSION_MAX_CLIENTS,
+)
+
+
+async def post_callback(url: str, payload: dict, headers: dict) -> int:
+    if CALLBACK_SECRET:
+        headers = {**headers, "X-Callback-Token": CALLBACK_SECRET}
+    r = await callback_sessions.get().post(url, json=payload, headers=headers, timeout=10)
+    return r.status_code
+
+
+webhook_sender = WebhookSender(post=post_callback, max_attempts=CALLBACK_MAX_ATTEMPTS)
+verdict_callbacks = {}  # (handle, submission id) -> (url, ref, registered at)
+
+
+def register_callback(req: SubmissionRequest, result: dict) -> None:
+    """Remember where to push this submission's final verdict, and make sure it is tracked."""
+    url = req.callback_url or VERDICT_CALLBACK_URL
+    handle, submission_id = result.get("handle"), result.get("submission_id")
+    if not (url and handle and submission_id):
+        return
+
+    now = time.monotonic()
+    # Forget registrations whose submission never reached a final verdict
+    for key, (_, _, registered_at) in list(verdict_callbacks.items()):
+        if now - registered_at > verdict_tracker.watch_ttl:
+            del verdict_callbacks[key]
+
+    try:
+        tracker = verdict_tracker.watch(handle, [submission_id])
+    except TooManyHandles as e:
+        log.warning("No verdict callback for %s/%s: %s", handle, submission_id, e)
+        return
+    verdict_callbacks[(handle, submission_id)] = (url, req.callback_ref, now)
+    # The tracker may have seen it finish while the submit was still wrapping up
+    known = tracker.get(submission_id)
+    if is_final(known):
+        on_final_verdict(handle, known)
+
+
+def on_final_verdict(handle: str, verdict: dict) -> None:
+    """Tracker hook: push a final verdict to whoever registered a callback for it."""
+    registration = verdict_callbacks.pop((handle, verdict["id"]), None)
+    if registration is None:
+        return
+    url, ref, _ = registration
+    webhook_sender.send(
+        url,
+        {**verdict, "handle": handle, "ref": ref},
+        key=f"{handle}:{verdict['id']}:{verdict['verdict']}",
+    )
+
+
+# --- Verdict Tracking & Streaming ---
+
+# One background user.status poller per handle, shared by every lookup above
+verdict_tracker = VerdictTracker(
+    fetch_page=fetch_user_status,
+    format_record=format_verdict,
+    interval=VERDICT_TRACK_INTERVAL,
+    window=VERDICT_PAGE_SIZE,
+    max_pages=VERDICT_MAX_PAGES,
+    max_depth=VERDICT_MAX_DEPTH,
+    on_final=on_final_verdict,
+    shared=shared_store,
+    rate_per_minute=API_RATE_PER_MIN * VERDICT_TRACK_SHARE,
+    max_handles=VERDICT_MAX_HANDLES,
+)
+
+
+@contextmanager
+def tracking_capacity():
+    """A new handle past CF_VERDICT_MAX_HANDLES: 503 until a tracked one goes idle."""
+    try:
+        yield
+    except TooManyHandles as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Verdict tracking is at capacity (CF_VERDICT_MAX_HANDLES={e.limit}), retry later",
+            headers={"Retry-After": str(math.ceil(verdict_tracker.idle_timeout))},
+        )
+
+
+@app.post("/cf/verdicts/track")
+async def track_verdicts(req: VerdictBatchRequest):
+    """Ask the tracker to follow these submissions until they get a final verdict."""
+    with tracking_capacity():
+        tracker = verdict_tracker.watch(req.handle, req.submission_ids)
+    return {"handle": req.handle, "watching": len(tracker.watched)}
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/cf/verdicts/stream")
+async def stream_verdicts(request: Request, handle: str, ids: Optional[str] = None):
+    """
+    Server-Sent Events stream of verdict changes for a handle.
+    Optional `ids=1,2,3` adds submissions to watch; their current state is sent first.
+    Events: `verdict` with the same payload as /cf/verdict.
+    """
+    parts = [i.strip() for i in ids.split(",") if i.strip()] if ids else []
+    if not all(i.isdecimal() for i in parts):
+        raise HTTPException(status_code=400, detail="ids must be comma-separated submission ids")
+    watch_ids = [int(i) for i in parts]
+    with tracking_capacity():
+        tracker = verdict_tracker.watch(handle, watch_ids)
+    queue = verdict_tracker.subscribe(handle)
+
+    async def events():
+        try:
+            yield sse_event("ready", {"handle": handle})
+            for sid in watch_ids:
+                if tracker.get(sid):
+                    yield sse_event("verdict", tracker.get(sid))
+            while not await request.is_disconnected():
+                try:
+                    verdict = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event("verdict", verdict)
+        finally:
+            verdict_tracker.unsubscribe(handle, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,106 @@
+"""
+circuit_breaker.py — Fail fast while Codeforces (or Cloudflare in front of it) is down.
+
+After `failure_threshold` consecutive failures (network errors, 5xx,
+Cloudflare blocks) the breaker opens and callers are rejected immediately
+instead of each waiting out a 10-30 s timeout. After `reset_timeout` it
+half-opens and lets `half_open_max` probe requests through: a success
+closes it again, a failure re-opens it for another full timeout.
+"""
+
+import time
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def retry_after(e: Exception, default: float) -> float:
+    """Seconds from an exception's Retry-After header (HTTPException), or `default`."""
+    headers = getattr(e, "headers", None) or {}
+    try:
+        return float(headers["Retry-After"])
+    except (KeyError, ValueError):
+        return default
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max: int = 1,
+        on_change: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.on_change = on_change
+        self.state = CLOSED
+        self.failures = 0  # consecutive
+        self.opened_at = 0.0  # when it opened, or when it last started half-open probing
+        self.probes = 0  # requests let through while half-open
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before(self) -> None:
+        """Raise CircuitOpenError unless a request may go upstream now."""
+        if self.state == OPEN:
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self._set(HALF_OPEN)
+            self.probes = 0
+            self.opened_at = time.monotonic()
+
+        if self.state == HALF_OPEN:
+            if time.monotonic() - self.opened_at > self.reset_timeout:
+                self.probes = 0  # probes that never reported back don't block forever
+                self.opened_at = time.monotonic()
+            if self.probes >= self.half_open_max:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self.probes += 1
+
+    def success(self) -> None:
+        self.failures = 0
+        if self.state == HALF_OPEN:
+            self._set(CLOSED)
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            self._set(OPEN)
+
+    def _set(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            if self.on_change:
+                self.on_change(self.name, state)
+
+    def stats(self) -> dict:
+        retry_after = 0.0
+        if self.state == OPEN:
+            retry_after = max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+        return {
+            "state": self.state,
+            "consecutiveFailures": self.failures,
+            "retryAfter": round(retry_after, 1),
+            "timesOpened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,160 @@
+"""
+cookie_jar.py — Encrypted on-disk copy of the session pools' cookie jars.
+
+The pooled curl_cffi sessions collect cookies as they go: Cloudflare
+clearance (cf_clearance, __cf_bm), refreshed login cookies, and so on.
+Losing them on every restart means the first requests after a deploy pay
+for a new challenge. CookieJarStore writes every pool's jars, plus any
+extra state handed to it (the account list), to one file encrypted with
+AES-256-GCM. It saves periodically when something changed and once more at
+shutdown, and it restores everything at startup.
+
+File layout: MAGIC | 12-byte nonce | AES-GCM(JSON payload).
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+log = logging.getLogger("cf_service.cookie_jar")
+
+MAGIC = b"CFJAR1"
+NONCE_BYTES = 12
+
+
+def jar_key(secret: str) -> Optional[bytes]:
+    """32-byte key from a 64-char hex secret (used as-is) or any passphrase (hashed)."""
+    if not secret:
+        return None
+    try:
+        key = bytes.fromhex(secret)
+        if len(key) == 32:
+            return key
+    except ValueError:
+        pass
+    return hashlib.sha256(secret.encode()).digest()
+
+
+class CookieJarStore:
+    """
+    `pools` maps a name to the SessionPool saved under it. `extra()` returns
+    more JSON-able state to save alongside; load() hands it back.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        key: bytes,
+        pools: dict,
+        extra: Optional[Callable[[], dict]] = None,
+        interval: float = 60.0,
+    ):
+        self.path = path
+        self.aead = AESGCM(key)
+        self.pools = pools
+        self.extra = extra
+        self.interval = interval
+        self.restored = 0  # cookies put back into sessions at startup
+        self.saves = 0
+        self.errors = 0
+        self.last_saved: Optional[float] = None
+        self._digest = None  # hash of the last saved payload, to skip unchanged saves
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # --- Public API ---
+
+    def load(self) -> dict:
+        """Restore the pools' cookies from disk; returns the saved payload ({} if none)."""
+        payload = self._read()
+        for name, pool in self.pools.items():
+            self.restored += pool.restore(payload.get("pools", {}).get(name, {}))
+        if payload:
+            log.info("Restored %d cookie(s) saved at %s", self.restored, payload.get("savedAt"))
+        return payload
+
+    def save(self) -> bool:
+        """Write the current jars if they changed since the last save."""
+        payload = {"pools": {name: pool.export() for name, pool in self.pools.items()}}
+        if self.extra:
+            payload.update(self.extra())
+        body = json.dumps(payload, sort_keys=True).encode()
+        digest = hashlib.sha256(body).digest()
+        if digest == self._digest:
+            return False
+        payload["savedAt"] = time.time()
+        self._write(json.dumps(payload).encode())
+        self._digest = digest
+        self.saves += 1
+        self.last_saved = payload["savedAt"]
+        return True
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._save_quietly()
+
+    def stats(self) -> dict:
+        return {
+            "restored": self.restored,
+            "saves": self.saves,
+            "errors": self.errors,
+            "lastSaved": self.last_saved,
+        }
+
+    # --- Internals ---
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self._save_quietly()
+
+    def _save_quietly(self) -> None:
+        try:
+            self.save()
+        except Exception as e:
+            self.errors += 1
+            log.warning("Saving cookie jar to %s failed: %s", self.path, e)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return {}
+        if not blob.startswith(MAGIC):
+            log.warning("%s is not a cookie jar file, ignoring it", self.path)
+            return {}
+        nonce = blob[len(MAGIC):len(MAGIC) + NONCE_BYTES]
+        try:
+            plain = self.aead.decrypt(nonce, blob[len(MAGIC) + NONCE_BYTES:], MAGIC)
+        except InvalidTag:
+            # Wrong key or a damaged file: start cold rather than fail to boot
+            self.errors += 1
+            log.warning("Could not decrypt %s (key changed?), starting with empty jars", self.path)
+            return {}
+        return json.loads(plain)
+
+    def _write(self, plain: bytes) -> None:
+        nonce = os.urandom(NONCE_BYTES)
+        blob = MAGIC + nonce + self.aead.encrypt(nonce, plain, MAGIC)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        # Several workers may save at once; serialise the replace
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            os.replace(tmp, self.path)
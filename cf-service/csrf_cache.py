@@ -0,0 +1,74 @@
+"""
+csrf_cache.py — Per-session CSRF token cache for the submit flow.
+
+A Codeforces CSRF token stays valid for the lifetime of the login session, so
+re-downloading the whole /problemset/submit page before every POST just to
+read it again is wasted work. Tokens are cached per account (same key as the
+session pool) with a TTL and dropped as soon as a POST looks like it was
+rejected because of the token. With a SharedStore the tokens are shared by
+all worker processes, so each account's submit page is read once, not once
+per worker.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from shared_state import SharedStore
+
+NAMESPACE = "csrf"
+
+
+class CsrfCache:
+    def __init__(self, ttl: float = 1800.0, shared: Optional[SharedStore] = None):
+        self.ttl = ttl
+        self.shared = shared
+        self._tokens = {}  # key -> (token, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0  # each hit is one submit-page GET saved
+        self.misses = 0
+        self.invalidations = 0
+        self.retries = 0  # POSTs repeated after a token refresh
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._tokens[key]
+        shared = self.shared.get(NAMESPACE, key) if self.shared else None
+        with self._lock:
+            if shared:
+                # Fetched by another worker; expires when theirs does
+                self._tokens[key] = (shared["token"], time.monotonic() + shared["expires"] - time.time())
+                self.hits += 1
+                return shared["token"]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, token: str) -> None:
+        with self._lock:
+            self._tokens[key] = (token, time.monotonic() + self.ttl)
+        if self.shared:
+            self.shared.put(NAMESPACE, key, {"token": token, "expires": time.time() + self.ttl}, self.ttl)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            if self._tokens.pop(key, None) is not None:
+                self.invalidations += 1
+        if self.shared:
+            self.shared.delete(NAMESPACE, key)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._tokens),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "retries": self.retries,
+            "hitRate": round(self.hits / total, 4) if total else 0.0,
+            "submitPageGetsSaved": self.hits,
+        }
@@ -0,0 +1,141 @@
+"""
+health_probe.py — Background Codeforces reachability checks and loop monitoring.
+
+HealthProber runs each probe (homepage, API, submit page) on its own schedule
+and keeps the latest result, so /health answers instantly from memory instead
+of generating upstream traffic for every orchestrator or uptime check.
+
+LoopMonitor measures event-loop lag (how late a periodic tick wakes up),
+the process's own saturation signal for the liveness endpoint.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger("cf_service.health")
+
+
+class ProbeResult:
+    def __init__(self, ok: bool, latency: float, detail: Optional[str] = None):
+        self.ok = ok
+        self.latency = latency
+        self.detail = detail
+        self.checked_at = time.time()
+        self.checked_mono = time.monotonic()
+
+
+class HealthProber:
+    """
+    `probes` maps a target name to an async callable returning (ok, detail).
+    A probe that raises or exceeds `timeout` counts as a failure.
+    """
+
+    def __init__(
+        self,
+        probes: dict,
+        interval: float = 30.0,
+        timeout: float = 10.0,
+        on_result: Optional[Callable[[str, bool], None]] = None,
+    ):
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        self.on_result = on_result
+        self.results = {}  # target -> ProbeResult
+        self.failures = {}  # target -> consecutive failures
+        self._tasks = []
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        for target, probe in self.probes.items():
+            self._tasks.append(loop.create_task(self._run(target, probe)))
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def check(self, target: str, probe: Callable[[], Awaitable[tuple]]) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            ok, detail = await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.TimeoutError:
+            ok, detail = False, f"timed out after {self.timeout:g}s"
+        except Exception as e:
+            ok, detail = False, str(e) or type(e).__name__
+        result = ProbeResult(ok, time.perf_counter() - start, detail)
+
+        self.results[target] = result
+        self.failures[target] = 0 if ok else self.failures.get(target, 0) + 1
+        if self.on_result:
+            self.on_result(target, ok)
+        return result
+
+    async def _run(self, target: str, probe) -> None:
+        while True:
+            result = await self.check(target, probe)
+            if not result.ok:
+                log.warning("Health probe %s failed: %s", target, result.detail)
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        targets = {}
+        for target in self.probes:
+            result = self.results.get(target)
+            if result is None:
+                targets[target] = {"ok": None, "detail": "not checked yet"}
+                continue
+            targets[target] = {
+                "ok": result.ok,
+                "latencyMs": round(result.latency * 1000, 1),
+                "ageSeconds": round(now - result.checked_mono, 1),
+                "checkedAt": result.checked_at,
+                "consecutiveFailures": self.failures.get(target, 0),
+                "detail": result.detail,
+            }
+
+        if len(self.results) < len(self.probes):
+            status = "starting"
+        elif all(r.ok for r in self.results.values()):
+            status = "ok"
+        else:
+            status = "degraded"
+        return {"status": status, "interval": self.interval, "targets": targets}
+
+
+class LoopMonitor:
+    """Wakes every `interval` seconds and records how late it woke up."""
+
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        self.interval = interval
+        self.window = window  # samples kept for the max
+        self.samples = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - before - self.interval))
+            del self.samples[: -self.window]
+
+    def stats(self) -> dict:
+        last = self.samples[-1] if self.samples else 0.0
+        worst = max(self.samples, default=0.0)
+        return {
+            "lagMs": round(last * 1000, 1),
+            "maxLagMs": round(worst * 1000, 1),
+            "windowSeconds": round(self.interval * self.window),
+        }
@@ -0,0 +1,93 @@
+"""
+judge_service.py — The sample judge as a service of its own.
+
+Runs sample_judge.SampleJudge behind HTTP so it can live in a container
+that holds none of cf-service's cookies, accounts, callback secret or
+state: the bubblewrap sandbox needs Docker's seccomp and AppArmor profiles
+relaxed, and contestants' code should not run next to those even when
+sandboxed. cf-service forwards POST /cf/judge/samples here when
+CF_JUDGE_URL is set (see sample_judge.RemoteJudge).
+
+Takes the same CF_JUDGE_* settings as cf-service's in-process judge.
+"""
+
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from sample_judge import JudgeUnavailable, SampleJudge, TooLarge, UnsupportedLanguage, load_languages
+
+# --- Config ---
+JUDGE_WORKERS = int(os.environ.get("CF_JUDGE_WORKERS", "2"))
+JUDGE_MAX_QUEUE = int(os.environ.get("CF_JUDGE_MAX_QUEUE", "64"))
+JUDGE_QUEUE_TIMEOUT = float(os.environ.get("CF_JUDGE_QUEUE_TIMEOUT", "15"))
+JUDGE_CACHE_SIZE = int(os.environ.get("CF_JUDGE_CACHE_SIZE", "256"))
+JUDGE_LANGUAGES = os.environ.get("CF_JUDGE_LANGUAGES", "")
+JUDGE_DIR = os.environ.get("CF_JUDGE_DIR", "")
+
+
+class SampleTest(BaseModel):
+    input: str
+    output: str
+
+
+class JudgeRequest(BaseModel):
+    source_code: str
+    language_id: str  # CF programTypeId
+    samples: list[SampleTest]
+    time_limit: Optional[float] = 2.0  # seconds
+    memory_limit: Optional[int] = 256  # MB
+    compile_only: bool = False
+
+
+sample_judge = SampleJudge(
+    root=JUDGE_DIR,
+    languages=load_languages(JUDGE_LANGUAGES),
+    workers=JUDGE_WORKERS,
+    max_queue=JUDGE_MAX_QUEUE,
+    queue_timeout=JUDGE_QUEUE_TIMEOUT,
+    cache_size=JUDGE_CACHE_SIZE,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sample_judge.start()
+    yield
+    await sample_judge.shutdown()
+
+
+app = FastAPI(title="Sample Judge", version="1.0.0", lifespan=lifespan)
+
+
+@app.post("/judge")
+async def judge(req: JudgeRequest):
+    """SampleJudge.judge; 413 too large, 422 unknown language, 503 off or busy."""
+    try:
+        return await sample_judge.judge(
+            req.language_id,
+            req.source_code,
+            [s.model_dump() for s in req.samples],
+            time_limit=req.time_limit or 2.0,
+            memory_mb=req.memory_limit or 256,
+            compile_only=req.compile_only,
+        )
+    except TooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedLanguage as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except JudgeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/languages")
+async def languages():
+    return {"enabled": sample_judge.enabled, "languages": sample_judge.describe_languages()}
+
+
+@app.get("/health")
+async def health():
+    return sample_judge.stats()
@@ -0,0 +1,176 @@
+"""
+metrics.py — Minimal Prometheus text-format metrics (no client library needed).
+
+Counters, gauges and histograms with labels, plus callback gauges that read
+a value at scrape time. cf_service registers its metrics on REGISTRY and
+serves REGISTRY.render() from /metrics.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Upstream calls range from a few ms (cached pages) to tens of seconds (submit POST)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class CallbackGauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.read = read
+
+    def render(self) -> list:
+        try:
+            return [f"{self.name} {_number(self.read())}"]
+        except Exception:
+            return []
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = []
+        for key, (counts, total, total_sum) in items:
+            for bound, count in zip(self.buckets, counts):
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {count}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, INF_BUCKET)} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total_sum)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def callback_gauge(self, name: str, help: str, read: Callable[[], float]) -> CallbackGauge:
+        return self._add(CallbackGauge(name, help, read))
+
+    def histogram(
+        self, name: str, help: str, labels: tuple = (), buckets: Optional[tuple] = None
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
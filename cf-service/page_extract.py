@@ -0,0 +1,95 @@
+"""
+page_extract.py — Small extractors for Codeforces site pages.
+
+The homepage (logged-in handle), submit page (CSRF token), status page
+(newest submission rows) and submission page (source) are scraped with a
+handful of regexes. They live
+here, precompiled, so bench/bench_extract.py can time them on saved pages
+without going through the HTTP handlers.
+"""
+
+import html as html_lib
+import re
+from typing import Optional
+
+HANDLE_RE = re.compile(r'handle\s*=\s*"([^"]+)"')
+LOGOUT_RE = re.compile(r"logout", re.IGNORECASE)
+PROFILE_LINK_RE = re.compile(r'<a[^>]+href="/profile/([^"]+)"[^>]*>\1</a>')
+SUBMISSION_ID_RE = re.compile(r'data-submission-id="(\d+)"')
+STATUS_PROBLEM_RE = re.compile(
+    r'href="/(?:contest|gym)/(\d+)/problem/(\w+)"|href="/problemset/problem/(\d+)/(\w+)"'
+)
+SOURCE_RE = re.compile(r'<pre[^>]*id="program-source-text"[^>]*>(.*?)</pre>', re.DOTALL)
+CSRF_REJECTED_RE = re.compile(r"invalid\s+csrf", re.IGNORECASE)
+
+CSRF_PATTERNS = [
+    re.compile(r'name=["\']csrf_token["\']\s+value=["\']([^"\']+)["\']'),
+    re.compile(r"csrf_token\s*[\"']?\s*[:=]\s*[\"']?([a-f0-9]{32})"),
+    re.compile(r"csrf_token\s*=\s*'([^']+)'"),
+    re.compile(r'name=["\']X-Csrf-Token["\']\s+content=["\']([^"\']+)["\']'),
+]
+
+
+def extract_handle(html: str) -> Optional[str]:
+    """Handle from the page JavaScript (`handle = "..."`), only set when logged in."""
+    match = HANDLE_RE.search(html)
+    return match.group(1) if match else None
+
+
+def extract_logged_in_handle(html: str) -> Optional[str]:
+    """
+    Handle of the logged-in user: the JS variable, or else the header's
+    profile link (<a href="/profile/x">x</a>) on pages that have a logout link.
+    """
+    handle = extract_handle(html)
+    if handle:
+        return handle
+    if LOGOUT_RE.search(html):
+        match = PROFILE_LINK_RE.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+def extract_csrf_token(html: str) -> Optional[str]:
+    """Extract CSRF token (try multiple patterns)."""
+    for pattern in CSRF_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+def csrf_rejected(html: str) -> bool:
+    """Whether a submit response is CF's "Invalid CSRF token" error."""
+    return CSRF_REJECTED_RE.search(html) is not None
+
+
+def extract_submission_id(html: str) -> Optional[int]:
+    """Newest submission ID on a status page (first data-submission-id row)."""
+    match = SUBMISSION_ID_RE.search(html)
+    return int(match.group(1)) if match else None
+
+
+def extract_status_rows(html: str) -> list:
+    """
+    (submission ID, (contest ID, problem index) or None) for each status
+    page row, newest first. The problem comes from the row's problem link.
+    """
+    rows = []
+    matches = list(SUBMISSION_ID_RE.finditer(html))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(html)
+        link = STATUS_PROBLEM_RE.search(html, match.end(), end)
+        problem = None
+        if link:
+            contest, index = (link.group(1), link.group(2)) if link.group(1) else (link.group(3), link.group(4))
+            problem = (int(contest), index)
+        rows.append((int(match.group(1)), problem))
+    return rows
+
+
+def extract_submission_source(html: str) -> Optional[str]:
+    """Source code shown on a submission page (only visible to its author)."""
+    match = SOURCE_RE.search(html)
+    return html_lib.unescape(match.group(1)) if match else None
@@ -0,0 +1,151 @@
+"""
+problem_cache.py — Bounded LRU of parsed problem payloads with request coalescing.
+
+When a contest opens, hundreds of requests for the same problem arrive at
+once. AsyncTTLCache makes them share a single upstream fetch (single-flight),
+serves entries for `ttl` seconds, and after that keeps serving the stale
+copy for up to `stale_ttl` more seconds while one background refresh runs
+(stale-while-revalidate).
+
+With a SharedStore the LRU becomes the first level of two: a local miss
+checks the store before fetching, and every fetched value is written back,
+so each problem is downloaded and parsed once for all worker processes.
+Coalescing stays per process; two workers that miss the same problem at the
+same moment both fetch it.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from shared_state import SharedStore
+
+log = logging.getLogger("cf_service.cache")
+
+
+class AsyncTTLCache:
+    def __init__(
+        self,
+        max_size: int = 512,
+        ttl: float = 3600.0,
+        stale_ttl: float = 86400.0,
+        shared: Optional[SharedStore] = None,
+        namespace: str = "problems",
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.shared = shared
+        self.namespace = namespace
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._inflight = {}  # key -> asyncio.Task running the loader
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_errors = 0
+        self.shared_hits = 0  # local misses answered by another worker's fetch
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is None and self.shared is not None:
+            entry = self._load_shared(key, self.ttl + self.stale_ttl)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                # Serve stale now, refresh once in the background
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start(key, loader).add_done_callback(self._log_refresh_error)
+                return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start(key, loader)
+        # shield: a disconnecting client must not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._store(key, value, time.monotonic())
+        if self.shared is not None:
+            self.shared.put(
+                self.namespace,
+                self._shared_key(key),
+                {"value": value, "fetchedAt": time.time()},
+                ttl=self.ttl + self.stale_ttl,
+            )
+
+    def peek(self, key: Hashable) -> Any:
+        """Cached value regardless of age, or None."""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def stats(self) -> dict:
+        total = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "staleHits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "refreshErrors": self.refresh_errors,
+            "sharedHits": self.shared_hits,
+            "hitRate": round((total - self.misses) / total, 4) if total else 0.0,
+        }
+
+    def _start(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        async def run():
+            try:
+                # A stale entry may already have been refreshed by another worker
+                entry = self._load_shared(key, self.ttl) if self.shared is not None else None
+                if entry is not None:
+                    return entry[0]
+                value = await loader()
+                self.put(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._inflight[key] = task
+        return task
+
+    def _store(self, key: Hashable, value: Any, fetched_at: float) -> None:
+        self._entries[key] = (value, fetched_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _shared_key(key: Hashable) -> str:
+        return json.dumps(key)
+
+    def _load_shared(self, key: Hashable, max_age: float) -> Optional[tuple]:
+        """Copy the store's entry into the LRU, keeping its age; None if none is younger than max_age."""
+        row = self.shared.get(self.namespace, self._shared_key(key))
+        age = max(0.0, time.time() - row["fetchedAt"]) if row else max_age
+        if age >= max_age:
+            return None
+        self.shared_hits += 1
+        entry = (row["value"], time.monotonic() - age)
+        self._store(key, *entry)
+        return entry
+
+    def _log_refresh_error(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+            log.warning("Background refresh failed: %s", task.exception())
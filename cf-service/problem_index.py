@@ -0,0 +1,381 @@
+"""
+problem_index.py — In-memory index of the Codeforces problemset for search.
+
+Problem names, ratings and tags come from one problemset.problems API call
+(about 10k problems, refreshed in the background and kept as a snapshot
+file). The index stores them column-wise, one row per problem in the order
+first seen (oldest first, so new problems are appended):
+
+    contest_ids  array('I')     indexes  list[str]     names  list[str]
+    ratings      array('H')     0 = unrated
+    tag_masks    array('Q')     bit t set = the problem has tag `tags[t]`
+    solved       array('I')     solvedCount
+
+Queries don't scan those columns. Each tag and each rating value also has
+a row bitmap (a Python int, bit r = row r), so a rating range plus a set of
+tags is a handful of big-int ORs and ANDs over ~10k bits. A name or code
+substring becomes a bitmap the same way, without a Python loop over rows:
+all lowercase names sit in one bytes blob (newest first, one per line), so
+marking every occurrence, reducing each line to 0 or 1 and reading the
+result in base 2 are all single C-level bytes operations. Results are read
+newest first, straight off the final bitmap.
+
+A refresh only touches what changed: new problems are appended and a
+problem whose rating, tags or name changed is patched in place.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional
+
+log = logging.getLogger("cf_service.problem_index")
+
+MAX_TAGS = 64  # bits in a tag_masks entry; Codeforces uses about 40 tags
+RETRY_AFTER_FAILURE = 300.0  # seconds before a failed refresh is retried
+NAME_CACHE_SIZE = 256  # name queries whose row bitmaps are kept (search-as-you-type repeats them)
+MARK = b"\x01"  # stands in for each occurrence of the query in the names blob
+KEEP_LINES = bytes(b for b in range(256) if b not in b"\n\x01")  # bytes dropped after marking
+DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+class ProblemIndex:
+    """
+    `fetch()` returns a problemset.problems result ({"problems": [...],
+    "problemStatistics": [...]}). The index is refreshed every `interval`
+    seconds (0 = only from the snapshot) and the last result is saved to
+    `snapshot_path` (empty = not saved), which is loaded at startup.
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[Callable[[], Awaitable[dict]]] = None,
+        snapshot_path: str = "",
+        interval: float = 3600.0,
+    ):
+        self.fetch = fetch
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.rows = {}  # (contest ID, index) -> row number
+        self.contest_ids = array("I")
+        self.indexes = []
+        self.names = []
+        self.ratings = array("H")
+        self.tag_masks = array("Q")
+        self.solved = array("I")
+        self.tags = []  # tag number -> name
+        self.tag_ids = {}  # name -> tag number
+        self.tag_rows = []  # tag number -> row bitmap
+        self.rating_rows = {}  # rating -> row bitmap
+        self.all_rows = 0
+        self._names_blob = b""  # "<code> <name>" per line, lowercased UTF-8, newest row first
+        self._name_cache = OrderedDict()  # query -> row bitmap
+        self._tag_lists = {}  # tag mask -> tag names
+        self.loaded_at: Optional[float] = None
+        self.refreshes = 0
+        self.added = 0
+        self.updated = 0
+        self.errors = 0
+        self.searches = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Public API ---
+
+    def load(self, result: dict) -> tuple:
+        """Apply a problemset.problems result; returns (rows added, rows changed)."""
+        solved = {
+            (s.get("contestId"), s.get("index")): s.get("solvedCount", 0)
+            for s in result.get("problemStatistics", ())
+        }
+        added = changed = 0
+        names_changed = False
+        # The API lists newest first; rows go oldest first
+        for problem in reversed(result.get("problems", ())):
+            key = (problem.get("contestId"), problem.get("index"))
+            if key[0] is None or key[1] is None:
+                continue
+            name = problem.get("name", "")
+            rating = problem.get("rating") or 0
+            mask = self._mask(problem.get("tags", ()))
+            row = self.rows.get(key)
+            if row is None:
+                self._append(key, name, rating, mask, solved.get(key, 0))
+                added += 1
+                names_changed = True
+                continue
+            self.solved[row] = solved.get(key, self.solved[row])
+            if rating != self.ratings[row] or mask != self.tag_masks[row] or name != self.names[row]:
+                names_changed |= name != self.names[row]
+                self._patch(row, name, rating, mask)
+                changed += 1
+        if names_changed:
+            self._rebuild_names()
+        self.added += added
+        self.updated += changed
+        self.loaded_at = time.time()
+        return added, changed
+
+    def get(self, contest_id: int, index: str) -> Optional[dict]:
+        row = self.rows.get((contest_id, index))
+        return None if row is None else self._describe(row)
+
+    def annotate(self, problem: dict) -> dict:
+        """A parsed problem with rating and tags taken from the index when it has them."""
+        row = self.rows.get((problem.get("contestId"), problem.get("problemIndex")))
+        if row is None:
+            return problem
+        return {
+            **problem,
+            "rating": self.ratings[row] or problem.get("rating"),
+            "tags": self._tag_names(self.tag_masks[row]),
+        }
+
+    def search(
+        self,
+        q: str = "",
+        min_rating: Optional[int] = None,
+        max_rating: Optional[int] = None,
+        tags: Iterable[str] = (),
+        match_all: bool = True,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> tuple:
+        """(total matches, [problem dict]) newest first; unrated problems drop out of rating filters."""
+        self.searches += 1
+        rows = self.all_rows
+        if min_rating is not None or max_rating is not None:
+            low = min_rating if min_rating is not None else 0
+            high = max_rating if max_rating is not None else 1 << 16
+            in_range = 0
+            for rating, bitmap in self.rating_rows.items():
+                if rating and low <= rating <= high:
+                    in_range |= bitmap
+            rows &= in_range
+        tags = [t.strip().lower() for t in tags if t.strip()]
+        if tags:
+            bitmaps = [self.tag_rows[self.tag_ids[t]] if t in self.tag_ids else 0 for t in tags]
+            if match_all:
+                for bitmap in bitmaps:
+                    rows &= bitmap
+            else:
+                any_tag = 0
+                for bitmap in bitmaps:
+                    any_tag |= bitmap
+                rows &= any_tag
+        q = q.strip().lower()
+        if q and rows:
+            rows &= self._name_rows(q)
+        return rows.bit_count(), [self._describe(r) for r in _newest_rows(rows, offset, limit)]
+
+    def tag_names(self) -> list:
+        return sorted(self.tags)
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "problems": len(self.rows),
+            "tags": len(self.tags),
+            "loadedAt": self.loaded_at,
+            "refreshes": self.refreshes,
+            "added": self.added,
+            "updated": self.updated,
+            "errors": self.errors,
+            "searches": self.searches,
+        }
+
+    # --- Internals ---
+
+    def _mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            tag = self.tag_ids.get(name)
+            if tag is None:
+                if len(self.tags) >= MAX_TAGS:
+                    log.warning("More than %d problem tags, ignoring %r", MAX_TAGS, name)
+                    continue
+                tag = self.tag_ids[name] = len(self.tags)
+                self.tags.append(name)
+                self.tag_rows.append(0)
+            mask |= 1 << tag
+        return mask
+
+    def _tag_names(self, mask: int) -> list:
+        names = self._tag_lists.get(mask)
+        if names is None:
+            names = self._tag_lists[mask] = [self.tags[t] for t in range(len(self.tags)) if mask >> t & 1]
+        return list(names)
+
+    def _append(self, key: tuple, name: str, rating: int, mask: int, solved: int) -> None:
+        row = len(self.names)
+        self.rows[key] = row
+        self.contest_ids.append(key[0])
+        self.indexes.append(key[1])
+        self.names.append(name)
+        self.ratings.append(rating)
+        self.tag_masks.append(mask)
+        self.solved.append(solved)
+        self._set_bits(row, rating, mask)
+        self.all_rows |= 1 << row
+
+    def _patch(self, row: int, name: str, rating: int, mask: int) -> None:
+        bit = 1 << row
+        self.rating_rows[self.ratings[row]] &= ~bit
+        for tag in range(len(self.tags)):
+            if self.tag_masks[row] >> tag & 1:
+                self.tag_rows[tag] &= ~bit
+        self.names[row] = name
+        self.ratings[row] = rating
+        self.tag_masks[row] = mask
+        self._set_bits(row, rating, mask)
+
+    def _set_bits(self, row: int, rating: int, mask: int) -> None:
+        bit = 1 << row
+        self.rating_rows[rating] = self.rating_rows.get(rating, 0) | bit
+        tag = 0
+        while mask:
+            if mask & 1:
+                self.tag_rows[tag] |= bit
+            mask >>= 1
+            tag += 1
+
+    def _rebuild_names(self) -> None:
+        entries = [
+            f"{contest}{index} {name}".lower().encode()
+            for contest, index, name in zip(self.contest_ids, self.indexes, self.names)
+        ]
+        self._names_blob = b"\n".join(reversed(entries))
+        self._name_cache.clear()
+
+    def _name_rows(self, q: str) -> int:
+        """Bitmap of the rows whose code or name contains `q` (already lowercase)."""
+        rows = self._name_cache.get(q)
+        if rows is not None:
+            self._name_cache.move_to_end(q)
+            return rows
+        needle = q.encode()
+        if b"\n" in needle or MARK in needle or not self._names_blob:
+            return 0
+        # One line per row, newest first: a line with a mark left becomes "1", any
+        # other "0", and the digits read in base 2 put row r at bit r
+        lines = self._names_blob.replace(needle, MARK).translate(None, KEEP_LINES).split(b"\n")
+        rows = int(bytes(map(bool, lines)).translate(DIGITS), 2)
+        self._name_cache[q] = rows
+        if len(self._name_cache) > NAME_CACHE_SIZE:
+            self._name_cache.popitem(last=False)
+        return rows
+
+    def _describe(self, row: int) -> dict:
+        return {
+            "contestId": self.contest_ids[row],
+            "index": self.indexes[row],
+            "name": self.names[row],
+            "rating": self.ratings[row] or None,
+            "tags": self._tag_names(self.tag_masks[row]),
+            "solvedCount": self.solved[row],
+        }
+
+    async def _run(self) -> None:
+        loaded_mtime = await self._load_snapshot()
+        delay = self._due_in(loaded_mtime)
+        while self.fetch and self.interval > 0:
+            await asyncio.sleep(delay)
+            # Another worker may have refreshed the shared snapshot meanwhile
+            mtime = self._snapshot_mtime()
+            if mtime and mtime != loaded_mtime and time.time() - mtime < self.interval:
+                loaded_mtime = await self._load_snapshot()
+                delay = self._due_in(loaded_mtime)
+                continue
+            try:
+                result = await self.fetch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                log.warning("Refreshing the problemset index failed: %s", e)
+                delay = min(self.interval, RETRY_AFTER_FAILURE)
+                continue
+            added, changed = self.load(result)
+            self.refreshes += 1
+            log.info("Problemset index refreshed: %d added, %d changed", added, changed)
+            if self.snapshot_path:
+                try:
+                    await asyncio.to_thread(self._write_snapshot, result)
+                    loaded_mtime = self._snapshot_mtime()
+                except OSError as e:
+                    log.warning("Saving problemset snapshot to %s failed: %s", self.snapshot_path, e)
+            delay = self.interval
+
+    def _due_in(self, snapshot_mtime: Optional[float]) -> float:
+        """Seconds until the next fetch: at once without a snapshot, else when it goes stale."""
+        if not snapshot_mtime:
+            return 0.0
+        return max(0.0, snapshot_mtime + self.interval - time.time())
+
+    def _snapshot_mtime(self) -> Optional[float]:
+        if not self.snapshot_path:
+            return None
+        try:
+            return os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return None
+
+    async def _load_snapshot(self) -> Optional[float]:
+        """Load the snapshot file if there is one; returns its mtime."""
+        mtime = self._snapshot_mtime()
+        if mtime is None:
+            return None
+        try:
+            result = await asyncio.to_thread(self._read_snapshot)
+        except (OSError, ValueError) as e:
+            log.warning("Could not read problemset snapshot %s: %s", self.snapshot_path, e)
+            return None
+        added, changed = self.load(result)
+        log.info("Problemset index loaded from snapshot: %d added, %d changed", added, changed)
+        return mtime
+
+    def _read_snapshot(self) -> dict:
+        with open(self.snapshot_path) as f:
+            return json.load(f)
+
+    def _write_snapshot(self, result: dict) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp, self.snapshot_path)
+
+
+def _newest_rows(rows: int, offset: int, limit: int) -> list:
+    """Row numbers of the highest set bits (newest problems) in `rows`, after skipping `offset`."""
+    bits = format(rows, "b")  # bits[i] is row len(bits) - 1 - i
+    pos = 0
+    # Skip whole chunks while they hold fewer set bits than are left to skip
+    while offset:
+        chunk = bits.count("1", pos, pos + 256)
+        if chunk > offset or pos >= len(bits):
+            break
+        offset -= chunk
+        pos += 256
+    found = []
+    top = len(bits) - 1
+    while len(found) < limit:
+        pos = bits.find("1", pos)
+        if pos < 0:
+            break
+        if offset:
+            offset -= 1
+        else:
+            found.append(top - pos)
+        pos += 1
+    return found
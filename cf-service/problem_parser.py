@@ -0,0 +1,258 @@
+"""
+problem_parser.py — Structured parser for Codeforces problem pages.
+
+Replaces the pile of DOTALL regexes that used to run over the full page once
+per field, mainly for correctness: those cut the statement at the first
+</div></div></div> (dropping the Note), glued multi-test sample lines
+together, left entities undecoded and misread "0.5 seconds". It is not a
+speed-up: bench/bench_parser.py puts it on par with the regexes on typical
+pages, ahead on huge statements and behind on pages with many samples.
+
+ProblemPageParser follows div nesting with a single compiled tokenizer and
+collects everything fetch_problem returns: name, time/memory limits, the
+problem-statement element, sample tests, rating and tags. Only the
+.problem-statement element is walked (the tag boxes outside it are picked out
+with one regex scan); pages without one are walked whole.
+
+Only the tags that carry structure (div, pre, br and span.tag-box) are
+tokenized; inline markup such as tex spans is left inside the text runs and
+stripped there, and <script>/<style> bodies, comments and sample <pre>
+bodies are jumped over rather than tokenized. The stdlib html.parser was
+tried first and was 15-30x slower than the regexes.
+
+Sample <pre> blocks come in two shapes: the classic one with <br /> line
+breaks, and the multi-test one where every line is wrapped in a
+<div class="test-example-line ..."> — both are turned into plain text with
+one line per row, the whole body at once.
+"""
+
+import html as html_lib
+import re
+from typing import Optional
+
+TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(/?)(div|pre|br|script|style)\b([^>]*)>"
+    r"|<(span)\b([^>]*\btag-box\b[^>]*)>",
+    re.DOTALL,
+)
+SPAN_END_RE = re.compile(r"</span\s*>")
+STATEMENT_RE = re.compile(r"""<div\b[^>]*\bclass\s*=\s*["'][^"']*\bproblem-statement\b""")
+TAG_BOX_RE = re.compile(r"<span\b([^>]*\btag-box\b[^>]*)>(.*?)</span\s*>", re.DOTALL)
+PRE_END_RE = re.compile(r"</pre\s*>")
+LINE_RE = re.compile(r"<div\b[^>]*\btest-example-line\b[^>]*>(.*?)</div\s*>", re.DOTALL)
+BR_RE = re.compile(r"<br\b[^>]*>")
+STRIP_TAGS_RE = re.compile(r"<[^>]+>")
+CLASS_RE = re.compile(r'\bclass\s*=\s*["\']([^"\']*)["\']')
+TITLE_RE = re.compile(r'\btitle\s*=\s*["\']([^"\']*)["\']')
+TIME_RE = re.compile(r"(\d+(?:\.\d+)?\s*second)")
+MEMORY_RE = re.compile(r"(\d+\s*megabyte)")
+
+
+def _attr(pattern: re.Pattern, attrs: str) -> str:
+    match = pattern.search(attrs)
+    return match.group(1) if match else ""
+
+
+def _text(raw: str) -> str:
+    """Plain text of a run between tokens: inline tags stripped, entities decoded."""
+    if "<" in raw:
+        raw = STRIP_TAGS_RE.sub("", raw)
+    return html_lib.unescape(raw) if "&" in raw else raw
+
+
+class ProblemPageParser:
+    def __init__(self, html: str):
+        self.html = html
+
+        self.div_stack = []  # class attribute of every open <div>
+        self.statement_depth = None  # div depth of .problem-statement while open
+        self.statement_start = None
+        self.statement_html = ""
+
+        self.name = None
+        self.fallback_name = None
+        self.time_limit = None
+        self.memory_limit = None
+        self.inputs = []
+        self.outputs = []
+        self.rating = None
+        self.tags = []
+
+        self._capture = None  # (kind, div depth) for title / limits text
+        self._text = []
+
+    # --- Tokenizer ---
+
+    def parse(self) -> dict:
+        """Walk the whole page."""
+        self._walk(0)
+        return self.result()
+
+    def parse_statement(self) -> Optional[dict]:
+        """
+        Walk only the .problem-statement element (everything but the tags is
+        inside it) and pick the tag boxes out of the rest with one regex scan.
+        None when the page has no statement, or no title inside it, in which
+        case the whole page has to be walked.
+        """
+        found = STATEMENT_RE.search(self.html)
+        if found is None:
+            return None
+        self._walk(found.start(), stop_after_statement=True)
+        if not self.statement_html or self.name is None:
+            return None
+        end = found.start() + len(self.statement_html)
+        for match in TAG_BOX_RE.finditer(self.html, 0, found.start()):
+            self.handle_tag_box(_attr(TITLE_RE, match.group(1)), match.group(2))
+        for match in TAG_BOX_RE.finditer(self.html, end):
+            self.handle_tag_box(_attr(TITLE_RE, match.group(1)), match.group(2))
+        return self.result()
+
+    def _walk(self, pos: int, stop_after_statement: bool = False) -> None:
+        html = self.html
+        search = TOKEN_RE.search
+        while True:
+            # search() from pos, not finditer(): skipped bodies (scripts, samples) cost nothing
+            match = search(html, pos)
+            if match is None:
+                break
+            start, end = match.span()
+            if start > pos and self._capture is not None:
+                self.handle_data(html[pos:start])
+            pos = end
+
+            slash, tag, attrs, span, span_attrs = match.groups()
+            if span:
+                # span.tag-box: its text runs up to the next </span>
+                close = SPAN_END_RE.search(html, pos)
+                stop = close.start() if close else len(html)
+                self.handle_tag_box(_attr(TITLE_RE, span_attrs), html[pos:stop])
+                pos = close.end() if close else stop
+            elif tag is None:
+                continue  # comment
+            elif slash:
+                self.handle_endtag(tag, pos)
+                if stop_after_statement and self.statement_html:
+                    break
+            elif tag == "script" or tag == "style":
+                close = html.find(f"</{tag}", pos)
+                pos = len(html) if close == -1 else close
+            elif tag == "pre":
+                kind = self._sample_kind()
+                if kind:
+                    pos = self.handle_sample(kind, pos)
+            else:
+                self.handle_starttag(tag, attrs, start)
+
+    # --- Helpers ---
+
+    def _inside(self, cls: str) -> bool:
+        return any(cls in c.split() for c in self.div_stack)
+
+    def _sample_kind(self) -> Optional[str]:
+        for c in reversed(self.div_stack):
+            words = c.split()
+            if "input" in words:
+                return "input"
+            if "output" in words:
+                return "output"
+        return None
+
+    # --- Events ---
+
+    def handle_starttag(self, tag: str, attrs: str, start: int):
+        if tag == "div":
+            if attrs.rstrip().endswith("/"):
+                return  # self-closing, never gets an end tag
+            cls = _attr(CLASS_RE, attrs)
+            self.div_stack.append(cls)
+            depth = len(self.div_stack)
+            words = cls.split()
+
+            if "problem-statement" in words and self.statement_depth is None and not self.statement_html:
+                self.statement_depth = depth
+                self.statement_start = start
+            elif self._capture is None:
+                if "title" in words:
+                    # The problem title lives in the statement header; keep the
+                    # first title anywhere as a fallback for unusual layouts
+                    if self.name is None and self._inside("header"):
+                        self._capture = ("name", depth)
+                    elif self.fallback_name is None:
+                        self._capture = ("fallback_name", depth)
+                    self._text = []
+                elif "time-limit" in words and self.time_limit is None:
+                    self._capture = ("time_limit", depth)
+                    self._text = []
+                elif "memory-limit" in words and self.memory_limit is None:
+                    self._capture = ("memory_limit", depth)
+                    self._text = []
+
+    def handle_endtag(self, tag: str, end: int):
+        if tag == "div":
+            if not self.div_stack:
+                return
+            depth = len(self.div_stack)
+            if self._capture is not None and self._capture[1] == depth:
+                self._finish_capture()
+
+            if self.statement_depth == depth:
+                self.statement_html = self.html[self.statement_start : end]
+                self.statement_depth = None
+            self.div_stack.pop()
+
+    def handle_tag_box(self, title: str, raw: str):
+        text = _text(raw).strip()
+        self.tags.append(text)
+        if title == "Difficulty" and text.startswith("*") and text[1:].isdigit():
+            self.rating = int(text[1:])
+
+    def handle_sample(self, kind: str, pos: int) -> int:
+        """Turn a sample <pre> body into text in one go; returns the position after </pre>."""
+        close = PRE_END_RE.search(self.html, pos)
+        stop = close.start() if close else len(self.html)
+        body = self.html[pos:stop]
+        if "test-example-line" in body:
+            text = "\n".join(_text(line) for line in LINE_RE.findall(body))
+        else:
+            text = _text(BR_RE.sub("\n", body) if "<" in body else body)
+        (self.inputs if kind == "input" else self.outputs).append(text.strip())
+        return close.end() if close else stop
+
+    def handle_data(self, data: str):
+        self._text.append(_text(data))
+
+    def _finish_capture(self):
+        kind, _ = self._capture
+        text = "".join(self._text)
+        if kind in ("name", "fallback_name"):
+            setattr(self, kind, text.strip())
+        elif kind == "time_limit":
+            match = TIME_RE.search(text)
+            self.time_limit = match.group(1) if match else None
+        elif kind == "memory_limit":
+            match = MEMORY_RE.search(text)
+            self.memory_limit = match.group(1) if match else None
+        self._capture = None
+        self._text = []
+
+    # --- Result ---
+
+    def result(self) -> dict:
+        return {
+            "name": self.name or self.fallback_name or "Unknown",
+            "timeLimit": self.time_limit or "Unknown",
+            "memoryLimit": self.memory_limit or "Unknown",
+            "statementHtml": self.statement_html,
+            "sampleTests": [
+                {"input": inp, "output": out} for inp, out in zip(self.inputs, self.outputs)
+            ],
+            "rating": self.rating,
+            "tags": self.tags,
+        }
+
+
+def parse_problem_page(html: str) -> dict:
+    """Extract name, limits, statement, samples, rating and tags."""
+    return ProblemPageParser(html).parse_statement() or ProblemPageParser(html).parse()
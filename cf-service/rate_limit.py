@@ -0,0 +1,93 @@
+"""
+rate_limit.py — Pacing primitives for upstream Codeforces traffic.
+
+HostPacer spaces out request starts per host so that a burst of work (e.g.
+prefetching a whole contest) reaches Codeforces as a steady trickle instead
+of a spike that trips Cloudflare.
+
+TokenBucket allows short bursts on top of a steady rate; the submit queue
+keeps one per account and the API governor one for the whole process.
+SharedTokenBucket is the same bucket kept in the SharedStore, so that
+several worker processes draw from one budget.
+"""
+
+import asyncio
+import time
+
+from shared_state import SharedStore
+
+
+class HostPacer:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = {}  # host -> monotonic time the next request may start
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host: str) -> None:
+        """Reserve the next start slot for `host` and sleep until it arrives."""
+        if self.interval <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate  # tokens per second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def try_take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        wait = self.wait_time()
+        if wait == 0:
+            self.take()
+        return wait
+
+    def drain(self) -> None:
+        """Empty the bucket after CF pushed back, so the next slot is a full interval away."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0.0)
+
+
+class SharedTokenBucket:
+    """
+    TokenBucket whose state lives in a SharedStore under `name`. Checking
+    and taking must be one step (try_take): between a separate wait_time()
+    and take(), another worker could have spent the token.
+    """
+
+    def __init__(self, store: SharedStore, name: str, rate: float, burst: int):
+        self.store = store
+        self.name = name
+        self.rate = rate
+        self.capacity = max(1, burst)
+
+    def wait_time(self) -> float:
+        return self.store.bucket_wait(self.name, self.rate, self.capacity)
+
+    def try_take(self) -> float:
+        return self.store.take_token(self.name, self.rate, self.capacity)
+
+    def drain(self) -> None:
+        self.store.drain_bucket(self.name, self.rate, self.capacity)
@@ -0,0 +1,800 @@
+"""
+sample_judge.py — Run a solution on a problem's sample tests before it is submitted.
+
+A Codeforces submission costs a round-trip and a slot in the account's rate
+limit even when the code doesn't compile or fails the first sample, which
+is a large share of contest traffic. SampleJudge catches those locally: it
+compiles each distinct source once (builds are cached by source hash),
+runs the build on every sample and compares the output token by token
+(numbers within 1e-6 when the expected token has a decimal point, YES/NO
+in any case).
+
+Languages are keyed by CF programTypeId. Each has a source file name, an
+optional compile command (run in the build directory) and a run command.
+In commands, {dir} is the build directory as the sandbox sees it (/box),
+{class} the public Java class name and {memory} the memory limit in MB.
+"paths" lists host paths the language needs besides SYSTEM_PATHS (a
+toolchain under /opt, say); they are bound read-only. A language whose
+tools aren't installed is left out.
+
+Every compile and run happens in a bubblewrap (`bwrap`) sandbox that:
+  - is started as nobody (the service must run as root to switch to it)
+    with all capabilities dropped
+  - has its own user, mount, PID, IPC, UTS and network namespaces: no
+    network, and it sees only its own processes in a fresh /proc
+  - sees a read-only /usr and the few SYSTEM_PATHS entries under /etc,
+    the build at /box (writable only while compiling) and a private
+    /tmp tmpfs, and nothing else of the host: not the service's files,
+    its state or other builds
+  - has rlimits on CPU seconds, address space and stack, file size (which
+    also caps stdout), open files and processes, set by `prlimit`
+  - is killed at a wall-clock deadline (bwrap takes the whole PID
+    namespace with it)
+  - reads the sample from stdin and writes stdout and stderr to files the
+    service opened, outside the sandbox
+If bwrap or prlimit is missing, the service doesn't run as root or a probe
+run fails (Docker's default seccomp and AppArmor profiles refuse the
+namespaces and mounts, see DEPLOY.md), the judge stays off.
+
+Because the sandbox needs those profiles relaxed, the judge normally runs
+in a container of its own that holds nothing worth stealing
+(judge_service.py, the `judge` service in docker-compose.yml) and
+cf-service reaches it through RemoteJudge, which answers like a
+SampleJudge. sandbox_check.py tests a deployment's sandbox.
+
+At most `workers` judgings run at once. Up to `max_queue` more wait, and
+any beyond that are refused, as is one that has waited `queue_timeout`
+seconds for a slot (its caller has likely given up by then). Requests are
+held to MAX_TIME_LIMIT, MAX_MEMORY_MB and MAX_SAMPLES whatever the problem
+says, and sources and samples to MAX_SOURCE_BYTES and MAX_SAMPLE_BYTES.
+"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import signal
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger("cf_service.judge")
+
+NOBODY = 65534
+BWRAP = "bwrap"
+PRLIMIT = "prlimit"
+BOX = "/box"  # where a build is mounted in the sandbox
+# Host paths every sandbox sees, read-only (symlinks such as /bin -> usr/bin are recreated)
+SYSTEM_PATHS = (
+    "/usr", "/bin", "/sbin", "/lib", "/lib32", "/lib64", "/libx32",
+    "/etc/alternatives", "/etc/ld.so.cache", "/etc/ld.so.conf", "/etc/ld.so.conf.d",
+    "/etc/passwd", "/etc/group", "/etc/java-*",
+)
+JAVA_CLASS_RE = re.compile(r"\bpublic\s+(?:final\s+|abstract\s+)*class\s+([A-Za-z_$][\w$]*)")
+
+COMPILE_CPU = 30  # seconds
+COMPILE_MEMORY_MB = 2048
+COMPILE_FILE_MB = 256  # the build itself must fit
+SCRATCH_MB = 64  # the sandbox's /tmp
+OUTPUT_LIMIT_MB = 16  # stdout (and stderr) of a test run
+WALL_FACTOR = 2.0  # wall-clock deadline = CPU limit x this + 1 s (covers sleeping and I/O)
+MEMORY_SLACK_MB = 64  # on top of the problem's limit: the runtime's own mappings
+MAX_PROCESSES = 256  # per uid, so it also bounds runs that are judged side by side
+PREVIEW_CHARS = 2000  # of output, expected output and stderr in a result
+COMPILE_PREVIEW_CHARS = 8000
+FLOAT_TOLERANCE = 1e-6
+MAX_TIME_LIMIT = 10.0  # seconds; a run holds a slot for up to 2x this + 1 s per sample
+MAX_MEMORY_MB = 1024
+MAX_SAMPLES = 20
+MAX_SOURCE_BYTES = 64 << 10  # Codeforces' own limit
+MAX_SAMPLE_BYTES = 1 << 20  # input or expected output of one sample
+
+
+def _cpp(name: str, std: str) -> dict:
+    return {
+        "name": name,
+        "source": "main.cpp",
+        "compile": ["g++", f"-std={std}", "-O2", "-pipe", "-o", "main", "main.cpp"],
+        "run": ["{dir}/main"],
+    }
+
+
+def _java(name: str) -> dict:
+    return {
+        "name": name,
+        "source": "{class}.java",
+        "compile": ["javac", "-encoding", "UTF-8", "{class}.java"],
+        "run": ["java", "-Xmx{memory}m", "-Xss64m", "-cp", "{dir}", "{class}"],
+        "limit_memory": False,  # the JVM reserves far more address space than it uses
+    }
+
+
+# programTypeId -> language; CF_JUDGE_LANGUAGES can add to or replace these
+DEFAULT_LANGUAGES = {
+    "43": {
+        "name": "C11",
+        "source": "main.c",
+        "compile": ["gcc", "-std=gnu11", "-O2", "-pipe", "-o", "main", "main.c", "-lm"],
+        "run": ["{dir}/main"],
+    },
+    "50": _cpp("C++14", "gnu++14"),
+    "54": _cpp("C++17", "gnu++17"),
+    "61": _cpp("C++17 64-bit", "gnu++17"),
+    "73": _cpp("C++20 (GCC 11) 64-bit", "gnu++20"),
+    "89": _cpp("C++20 (GCC 13) 64-bit", "gnu++20"),
+    "91": _cpp("C++23 64-bit", "gnu++2b"),
+    "31": {
+        "name": "Python 3",
+        "source": "main.py",
+        "compile": ["python3", "-m", "py_compile", "main.py"],
+        "run": ["python3", "{dir}/main.py"],
+    },
+    "70": {
+        "name": "PyPy 3",
+        "source": "main.py",
+        "compile": ["pypy3", "-m", "py_compile", "main.py"],
+        "run": ["pypy3", "{dir}/main.py"],
+        "limit_memory": False,
+    },
+    "36": _java("Java 8"),
+    "60": _java("Java 17"),
+    "87": _java("Java 21"),
+    "75": {
+        "name": "Rust 2021",
+        "source": "main.rs",
+        "compile": ["rustc", "--edition=2021", "-O", "-o", "main", "main.rs"],
+        "run": ["{dir}/main"],
+    },
+    "32": {
+        "name": "Go",
+        "source": "main.go",
+        "compile": ["go", "build", "-o", "main", "main.go"],
+        "run": ["{dir}/main"],
+        "limit_memory": False,
+    },
+    "55": {
+        "name": "Node.js",
+        "source": "main.js",
+        "compile": ["node", "--check", "main.js"],
+        "run": ["node", "--max-old-space-size={memory}", "{dir}/main.js"],
+        "limit_memory": False,
+    },
+}
+
+
+class JudgeUnavailable(Exception):
+    """The judge is off or its queue is full; the caller should go ahead without it."""
+
+
+class UnsupportedLanguage(Exception):
+    pass
+
+
+class TooLarge(Exception):
+    """The source or a sample is over MAX_SOURCE_BYTES / MAX_SAMPLE_BYTES."""
+
+
+class Language:
+    def __init__(self, key: str, config: dict):
+        self.key = key
+        self.name = config.get("name", key)
+        self.source = config["source"]
+        self.compile = config.get("compile")
+        self.run = config["run"]
+        self.limit_memory = config.get("limit_memory", True)
+        self.paths = config.get("paths", [])
+        self.available = False
+
+    def tools(self) -> list:
+        """Programs that must be on PATH (not those built into {dir})."""
+        return [argv[0] for argv in (self.compile, self.run) if argv and "{" not in argv[0]]
+
+
+class Build:
+    def __init__(self, key: str, directory: str):
+        self.key = key
+        self.directory = directory
+        self.java_class = "Main"  # fills {class}
+        self.ok = False
+        self.output = ""
+        self.seconds = 0.0
+        self.users = 0  # runs using the build right now
+        self.evicted = False
+
+
+def load_languages(path: str = "") -> dict:
+    """DEFAULT_LANGUAGES, updated from the JSON file at `path` (same shape; null removes one)."""
+    configs = dict(DEFAULT_LANGUAGES)
+    if path:
+        with open(path) as f:
+            for key, config in json.load(f).items():
+                if config is None:
+                    configs.pop(str(key), None)
+                else:
+                    configs[str(key)] = config
+    return {key: Language(key, config) for key, config in configs.items()}
+
+
+def parse_limits(problem: dict) -> tuple:
+    """(seconds, megabytes) from a parsed problem's "2 seconds" / "256 megabytes"."""
+    seconds = re.search(r"([\d.]+)\s*second", str(problem.get("timeLimit", "")))
+    megabytes = re.search(r"(\d+)\s*megabyte", str(problem.get("memoryLimit", "")))
+    return (
+        float(seconds.group(1)) if seconds else 2.0,
+        int(megabytes.group(1)) if megabytes else 256,
+    )
+
+
+def outputs_match(actual: str, expected: str) -> bool:
+    got, want = actual.split(), expected.split()
+    if len(got) != len(want):
+        return False
+    for g, w in zip(got, want):
+        if g == w:
+            continue
+        if w.upper() in ("YES", "NO") and g.upper() == w.upper():
+            continue
+        if "." not in w:
+            return False
+        try:
+            gf, wf = float(g), float(w)
+        except ValueError:
+            return False
+        if not abs(gf - wf) <= FLOAT_TOLERANCE * max(1.0, abs(wf)):
+            return False
+    return True
+
+
+def _preview(text: str, limit: int = PREVIEW_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit] + "\n..."
+
+
+def _mounts(patterns) -> list:
+    """bwrap arguments showing each existing host path (globs allowed) read-only at the same place."""
+    args = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if os.path.islink(path):
+                args += ["--symlink", os.readlink(path), path]
+            else:
+                args += ["--ro-bind", path, path]
+    return args
+
+
+def _read(path: str, limit: int) -> str:
+    try:
+        with open(path, "rb") as f:
+            return f.read(limit).decode("utf-8", "replace")
+    except OSError:
+        return ""
+
+
+class SampleJudge:
+    def __init__(
+        self,
+        root: str = "",
+        languages: Optional[dict] = None,
+        workers: int = 2,
+        max_queue: int = 64,
+        queue_timeout: float = 15.0,
+        cache_size: int = 256,
+    ):
+        self.base = root  # parent of this process's scratch root; empty = system temp
+        self.root = ""
+        self.languages = languages if languages is not None else load_languages()
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.cache_size = cache_size
+        self.enabled = False
+        self._mounts = []  # bwrap arguments for SYSTEM_PATHS
+        self.builds = OrderedDict()  # key -> Build, least recently used first
+        self._building = {}  # key -> Task[Build] of a compile in progress
+        self._slots = asyncio.Semaphore(workers)
+        self._ready: Optional[asyncio.Task] = None
+        self.running = 0
+        self.waiting = 0
+        self.refused = 0
+        self.expired = 0  # gave up waiting for a slot
+        self.judged = 0
+        self.compiles = 0
+        self.cache_hits = 0
+        self.verdicts = {}
+
+    # --- Public API ---
+
+    def start(self) -> None:
+        self._ready = asyncio.get_running_loop().create_task(self._prepare())
+
+    async def judge(
+        self,
+        language_id: str,
+        source: str,
+        samples: list,
+        time_limit: float = 2.0,
+        memory_mb: int = 256,
+        compile_only: bool = False,
+    ) -> dict:
+        """
+        Compile `source` and run it on `samples` ([{"input", "output"}]).
+        Returns {"verdict", "language", "compile", "tests", "passed", "total"};
+        the verdict is OK or the first failing test's (COMPILATION_ERROR,
+        WRONG_ANSWER, RUNTIME_ERROR, TIME_LIMIT_EXCEEDED,
+        OUTPUT_LIMIT_EXCEEDED). Limits are capped at MAX_TIME_LIMIT and
+        MAX_MEMORY_MB and only the first MAX_SAMPLES samples are run.
+        """
+        if self._ready:
+            await self._ready
+        if not self.enabled:
+            raise JudgeUnavailable("Local judge is not available on this host")
+        if len(source.encode()) > MAX_SOURCE_BYTES:
+            raise TooLarge(f"Source is over {MAX_SOURCE_BYTES >> 10} KB")
+        samples = samples[:MAX_SAMPLES]
+        if any(len(str(s.get(k, ""))) > MAX_SAMPLE_BYTES for s in samples for k in ("input", "output")):
+            raise TooLarge(f"A sample is over {MAX_SAMPLE_BYTES >> 20} MB")
+        time_limit = min(max(time_limit, 0.1), MAX_TIME_LIMIT)
+        memory_mb = min(max(memory_mb, 16), MAX_MEMORY_MB)
+        language = self.languages.get(str(language_id))
+        if language is None or not language.available:
+            raise UnsupportedLanguage(f"No local judge for language {language_id}")
+
+        self.judged += 1
+        build, cached = await self._build(language, source, memory_mb)
+        result = {
+            "verdict": "OK",
+            "language": language.name,
+            "compile": {
+                "cached": cached,
+                "timeMs": round(build.seconds * 1000, 1),
+                "output": _preview(build.output, COMPILE_PREVIEW_CHARS),
+            },
+            "tests": [],
+            "passed": 0,
+            "total": 0 if compile_only else len(samples),
+        }
+        if not build.ok:
+            result["verdict"] = "COMPILATION_ERROR"
+        elif not compile_only:
+            build.users += 1
+            try:
+                async with self._slot():
+                    for number, sample in enumerate(samples, 1):
+                        test = await self._run_test(language, build, sample, time_limit, memory_mb)
+                        result["tests"].append({"index": number, **test})
+            finally:
+                build.users -= 1
+                if build.evicted and not build.users:
+                    shutil.rmtree(build.directory, ignore_errors=True)
+            result["passed"] = sum(t["verdict"] == "OK" for t in result["tests"])
+            failed = next((t for t in result["tests"] if t["verdict"] != "OK"), None)
+            if failed:
+                result["verdict"] = failed["verdict"]
+        self.verdicts[result["verdict"]] = self.verdicts.get(result["verdict"], 0) + 1
+        return result
+
+    def describe_languages(self) -> list:
+        return [
+            {"id": lang.key, "name": lang.name, "available": lang.available}
+            for lang in self.languages.values()
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "languages": sum(lang.available for lang in self.languages.values()),
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "refused": self.refused,
+            "expired": self.expired,
+            "judged": self.judged,
+            "compiles": self.compiles,
+            "cacheHits": self.cache_hits,
+            "cachedBuilds": len(self.builds),
+            "verdicts": dict(self.verdicts),
+        }
+
+    async def shutdown(self) -> None:
+        if self._ready:
+            self._ready.cancel()
+            await asyncio.gather(self._ready, return_exceptions=True)
+        if self.root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    # --- Internals ---
+
+    async def _prepare(self) -> None:
+        if self.base:
+            os.makedirs(self.base, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix="cf-judge-", dir=self.base or None)
+        # nobody (bwrap) must reach builds/<key> to mount it, but not list it;
+        # runs/ only holds the files the service opens for a run's stdio
+        for sub, mode in (("", 0o711), ("builds", 0o711), ("runs", 0o700)):
+            path = os.path.join(self.root, sub)
+            os.makedirs(path, exist_ok=True)
+            os.chmod(path, mode)
+
+        for language in self.languages.values():
+            language.available = all(shutil.which(tool) for tool in language.tools())
+        self._mounts = _mounts(SYSTEM_PATHS)
+
+        problem = None
+        if os.geteuid() != 0:
+            problem = "the service doesn't run as root, so it can't run solutions as nobody"
+        elif not (shutil.which(BWRAP) and shutil.which(PRLIMIT)):
+            problem = f"{BWRAP} or {PRLIMIT} is not installed"
+        else:
+            probe = os.path.join(self.root, "runs", "probe.log")
+            try:
+                # Mounts builds/ as a run would mount a build, so a CF_JUDGE_DIR nobody can't reach shows up here
+                code, _, _ = await self._exec(
+                    ["true"], os.path.join(self.root, "builds"), os.devnull, probe, 1, None, 1, 5.0
+                )
+                if code != 0:
+                    problem = f"a sandboxed probe run failed: {_read(probe, PREVIEW_CHARS).strip()}"
+            except OSError as e:
+                problem = f"a sandboxed probe run failed: {e}"
+            finally:
+                try:
+                    os.unlink(probe)
+                except OSError:
+                    pass
+        self.enabled = problem is None
+        if problem:
+            log.warning("Local judge is disabled: %s", problem)
+        available = [lang.name for lang in self.languages.values() if lang.available]
+        log.info("Local judge %s: %s", "ready" if self.enabled else "off", ", ".join(available) or "no languages")
+
+    @asynccontextmanager
+    async def _slot(self):
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.refused += 1
+            raise JudgeUnavailable("Local judge is busy")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise JudgeUnavailable("Local judge is busy") from None
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    async def _build(self, language: Language, source: str, memory_mb: int) -> tuple:
+        """(Build, served from cache?) — concurrent requests for one source share a compile."""
+        digest = hashlib.sha256()
+        for part in (language.key, json.dumps([language.source, language.compile]), source):
+            digest.update(part.encode() + b"\0")
+        key = digest.hexdigest()
+
+        build = self.builds.get(key)
+        if build is not None:
+            self.builds.move_to_end(key)
+            self.cache_hits += 1
+            return build, True
+        task = self._building.get(key)
+        if task is not None:
+            self.cache_hits += 1
+            return await asyncio.shield(task), True
+        # A task of its own, so a caller that goes away doesn't cancel the compile for the others
+        task = self._building[key] = asyncio.get_running_loop().create_task(
+            self._build_new(key, language, source, memory_mb)
+        )
+        return await asyncio.shield(task), False
+
+    async def _build_new(self, key: str, language: Language, source: str, memory_mb: int) -> Build:
+        try:
+            async with self._slot():
+                build = await self._compile(key, language, source, memory_mb)
+        finally:
+            del self._building[key]
+        self.builds[key] = build
+        while len(self.builds) > self.cache_size:
+            _, old = self.builds.popitem(last=False)
+            old.evicted = True
+            if not old.users:
+                shutil.rmtree(old.directory, ignore_errors=True)
+        return build
+
+    async def _compile(self, key: str, language: Language, source: str, memory_mb: int) -> Build:
+        self.compiles += 1
+        build = Build(key, os.path.join(self.root, "builds", key[:32]))
+        shutil.rmtree(build.directory, ignore_errors=True)
+        os.makedirs(build.directory)
+        match = JAVA_CLASS_RE.search(source)
+        if match:
+            build.java_class = match.group(1)
+        fill = {"dir": BOX, "class": build.java_class, "memory": str(memory_mb)}
+        with open(os.path.join(build.directory, language.source.format(**fill)), "w") as f:
+            f.write(source)
+        if not language.compile:
+            build.ok = True
+            return build
+
+        os.chown(build.directory, NOBODY, NOBODY)
+        log_path = os.path.join(self.root, "runs", f"compile-{key[:16]}.log")
+        started = time.perf_counter()
+        try:
+            code, _, timed_out = await self._exec(
+                [arg.format(**fill) for arg in language.compile],
+                build.directory,
+                os.devnull,
+                log_path,
+                COMPILE_CPU,
+                COMPILE_MEMORY_MB,
+                COMPILE_FILE_MB,
+                COMPILE_CPU * WALL_FACTOR,
+                writable=True,
+                paths=language.paths,
+            )
+            build.seconds = time.perf_counter() - started
+            build.output = _read(log_path, COMPILE_PREVIEW_CHARS * 4)
+            build.ok = code == 0
+            if timed_out:
+                build.output += "\nCompilation timed out"
+        finally:
+            try:
+                os.unlink(log_path)
+            except OSError:
+                pass
+        self._seal(build.directory)
+        return build
+
+    def _seal(self, directory: str) -> None:
+        """Make a build read-only to the runs that use it, under the read-only mount as well."""
+        for path, dirs, files in os.walk(directory):
+            for name in [path] + [os.path.join(path, f) for f in files]:
+                if os.path.islink(name):
+                    continue
+                os.chown(name, 0, 0)
+                mode = os.stat(name).st_mode & ~0o222
+                os.chmod(name, mode | (0o555 if name == path else 0o444))
+
+    async def _run_test(self, language: Language, build: Build, sample: dict, time_limit: float, memory_mb: int) -> dict:
+        # The run's stdio; the sandbox only gets the open files
+        scratch = tempfile.mkdtemp(dir=os.path.join(self.root, "runs"))
+        try:
+            input_path = os.path.join(scratch, "stdin")
+            output_path = os.path.join(scratch, "stdout")
+            error_path = os.path.join(scratch, "stderr")
+            data = sample.get("input", "")
+            with open(input_path, "w") as f:
+                f.write(data if data.endswith("\n") else data + "\n")
+            fill = {"dir": BOX, "class": build.java_class, "memory": str(memory_mb)}
+            cpu = max(1, math.ceil(time_limit))
+            started = time.perf_counter()
+            code, signaled, timed_out = await self._exec(
+                [arg.format(**fill) for arg in language.run],
+                build.directory,
+                input_path,
+                output_path,
+                cpu,
+                memory_mb + MEMORY_SLACK_MB if language.limit_memory else None,
+                OUTPUT_LIMIT_MB,
+                cpu * WALL_FACTOR + 1,
+                paths=language.paths,
+                stderr_path=error_path,
+            )
+            elapsed = time.perf_counter() - started
+            # Runtimes that ignore SIGXFSZ (Python does) fail the write instead of dying
+            output_full = os.path.getsize(output_path) >= OUTPUT_LIMIT_MB << 20
+            output = await asyncio.to_thread(_read, output_path, OUTPUT_LIMIT_MB << 20)
+            stderr = _read(error_path, PREVIEW_CHARS)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        expected = sample.get("output", "")
+        if timed_out or signaled in (signal.SIGXCPU, signal.SIGKILL):
+            verdict = "TIME_LIMIT_EXCEEDED"
+        elif signaled == signal.SIGXFSZ or (code != 0 and output_full):
+            verdict = "OUTPUT_LIMIT_EXCEEDED"
+        elif code != 0:
+            verdict = "RUNTIME_ERROR"
+        elif await asyncio.to_thread(outputs_match, output, expected):
+            verdict = "OK"
+        else:
+            verdict = "WRONG_ANSWER"
+        return {
+            "verdict": verdict,
+            "timeMs": round(elapsed * 1000, 1),
+            "exitCode": code,
+            "output": _preview(output),
+            "expected": _preview(expected),
+            "stderr": _preview(stderr),
+        }
+
+    def _sandbox(self, build_dir: Optional[str], writable: bool, paths) -> list:
+        """The bwrap command line up to the program: `build_dir` at BOX, cwd there when compiling, else /tmp."""
+        argv = [
+            BWRAP,
+            "--unshare-all",  # user, mount, PID, IPC, UTS, network (and cgroup where possible)
+            "--die-with-parent",
+            "--new-session",
+            *self._mounts,
+            *_mounts(paths),
+            "--proc", "/proc",
+            "--dev", "/dev",
+            "--size", str(SCRATCH_MB << 20),
+            "--tmpfs", "/tmp",
+        ]
+        if build_dir:
+            argv += ["--bind" if writable else "--ro-bind", build_dir, BOX]
+        return argv + ["--chdir", BOX if build_dir and writable else "/tmp"]
+
+    async def _exec(
+        self,
+        argv: list,
+        build_dir: Optional[str],
+        stdin_path: str,
+        stdout_path: str,
+        cpu_seconds: int,
+        memory_mb: Optional[int],
+        file_mb: int,
+        wall_seconds: float,
+        writable: bool = False,
+        paths=(),
+        stderr_path: Optional[str] = None,
+    ) -> tuple:
+        """Run one sandboxed process: (exit code, terminating signal or None, hit the wall deadline?)."""
+        limits = [
+            PRLIMIT,
+            f"--cpu={cpu_seconds}:{cpu_seconds + 1}",
+            f"--fsize={file_mb << 20}:{file_mb << 20}",
+            "--nofile=64:64",
+            "--core=0:0",
+            f"--nproc={MAX_PROCESSES}:{MAX_PROCESSES}",
+        ]
+        if memory_mb:
+            limits += [f"--as={memory_mb << 20}:{memory_mb << 20}", f"--stack={memory_mb << 20}:{memory_mb << 20}"]
+        env = {
+            "PATH": os.environ.get("PATH", "/usr/local/bin:/usr/bin:/bin"),
+            "HOME": BOX if writable else "/tmp",
+            "TMPDIR": "/tmp",
+            "LANG": "C.UTF-8",
+        }
+        with open(stdin_path, "rb") as stdin, open(stdout_path, "wb") as stdout:
+            stderr = open(stderr_path, "wb") if stderr_path else asyncio.subprocess.STDOUT
+            try:
+                # user/group/process_group are applied by the spawn itself, no Python runs in the child
+                proc = await asyncio.create_subprocess_exec(
+                    *self._sandbox(build_dir, writable, paths), *limits, "--", *argv,
+                    cwd="/",
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    env=env,
+                    user=NOBODY,
+                    group=NOBODY,
+                    extra_groups=[],
+                    process_group=0,
+                )
+            finally:
+                if stderr_path:
+                    stderr.close()
+        timed_out = False
+        try:
+            await asyncio.wait_for(proc.wait(), wall_seconds)
+        except asyncio.TimeoutError:
+            timed_out = True
+        finally:
+            # Also on cancellation; bwrap going takes the sandbox's PID namespace with it
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        if timed_out:
+            await proc.wait()
+        code = proc.returncode
+        if code < 0:
+            return code, -code, timed_out
+        # bwrap exits with 128 + N when the program was killed by signal N
+        return code, (code - 128 if code > 128 else None), timed_out
+
+
+class RemoteJudge:
+    """
+    A SampleJudge in another process (judge_service.py) with the same
+    interface. `post(url, payload)` and `get(url)` perform one HTTP request
+    and return (status code, JSON body), raising on network errors.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        post: Callable[[str, dict], Awaitable[tuple]],
+        get: Callable[[str], Awaitable[tuple]],
+        refresh_interval: float = 60.0,
+    ):
+        self.url = url.rstrip("/")
+        self.post = post
+        self.get = get
+        self.refresh_interval = refresh_interval  # of enabled / languages
+        self.enabled = False
+        self.reachable = False
+        self.languages = []  # describe_languages() of the remote judge
+        self._task: Optional[asyncio.Task] = None
+        self.judged = 0
+        self.failed = 0  # unreachable or unexpected answers
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def judge(
+        self,
+        language_id: str,
+        source: str,
+        samples: list,
+        time_limit: float = 2.0,
+        memory_mb: int = 256,
+        compile_only: bool = False,
+    ) -> dict:
+        """SampleJudge.judge, run remotely; the remote's 413/422/503 raise the same exceptions."""
+        payload = {
+            "source_code": source,
+            "language_id": str(language_id),
+            "samples": samples,
+            "time_limit": time_limit,
+            "memory_limit": memory_mb,
+            "compile_only": compile_only,
+        }
+        try:
+            status, body = await self.post(f"{self.url}/judge", payload)
+        except Exception as e:
+            self.failed += 1
+            self.reachable = False
+            raise JudgeUnavailable(f"Local judge is unreachable: {e}") from None
+        detail = body.get("detail", "") if isinstance(body, dict) else ""
+        if status == 200:
+            self.judged += 1
+            return body
+        if status == 413:
+            raise TooLarge(detail)
+        if status == 422:
+            raise UnsupportedLanguage(detail)
+        if status != 503:
+            self.failed += 1
+        raise JudgeUnavailable(detail or f"Local judge answered {status}")
+
+    def describe_languages(self) -> list:
+        return self.languages
+
+    def stats(self) -> dict:
+        return {
+            "remote": self.url,
+            "enabled": self.enabled,
+            "reachable": self.reachable,
+            "languages": sum(lang.get("available", False) for lang in self.languages),
+            "judged": self.judged,
+            "failed": self.failed,
+        }
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                status, body = await self.get(f"{self.url}/languages")
+                self.reachable = status == 200
+                if self.reachable:
+                    self.enabled = bool(body.get("enabled"))
+                    self.languages = body.get("languages", [])
+            except Exception as e:
+                if self.reachable:
+                    log.warning("Remote judge %s is unreachable: %s", self.url, e)
+                self.reachable = False
+            await asyncio.sleep(self.refresh_interval)
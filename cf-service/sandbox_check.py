@@ -0,0 +1,168 @@
+"""
+sandbox_check.py — Check that the sample judge's sandbox holds on this host.
+
+Runs a few hostile Python programs through sample_judge.SampleJudge and
+checks that they:
+  - run as nobody
+  - reach no network (neither the internet nor this host's services)
+  - see none of the paths given with --hidden (e.g. cf-service's /app/data)
+    nor the judge's own scratch directory, and no process outside the
+    sandbox in /proc (so not /proc/1/environ of the service either)
+  - are stopped by the CPU, memory and output limits
+  - can't fork without bound, and leave no process behind
+
+Run it where the judge will run, before turning the judge on; it exits 1
+if any check fails or the judge is off. In Docker:
+    docker compose --profile judge run --rm judge python -m sandbox_check
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from sample_judge import MAX_PROCESSES, NOBODY, SampleJudge, load_languages
+
+PYTHON = "31"
+MARKER = "SANDBOX_CHECK_MARKER"  # put in this process's environment; no run may read it
+
+WHOAMI = "import os\nprint(os.getuid(), os.getgid())\n"
+
+NETWORK = """
+import socket
+reached = []
+for host, port in [("1.1.1.1", 53), ("8.8.8.8", 53), ("127.0.0.1", 8000), ("172.17.0.1", 8000)]:
+    try:
+        socket.create_connection((host, port), timeout=2).close()
+        reached.append(f"{host}:{port}")
+    except OSError:
+        pass
+print(",".join(reached) or "none")
+"""
+
+FILES = """
+import json, os
+paths = json.loads(input())
+print(",".join(p for p in paths if os.path.exists(p)) or "none")
+"""
+
+PROCESSES = """
+import os
+pids = [p for p in os.listdir("/proc") if p.isdigit()]
+leaked = []
+for pid in pids:
+    try:
+        with open(f"/proc/{pid}/environ", "rb") as f:
+            if b"%s" in f.read():
+                leaked.append(pid)
+    except OSError:
+        pass
+print(len(pids), ",".join(leaked) or "none")
+""" % MARKER
+
+CPU = "while True:\n    pass\n"
+
+MEMORY = "data = bytearray(4 << 30)\nprint(len(data))\n"
+
+OUTPUT = "import sys\nwhile True:\n    sys.stdout.write('x' * 65536)\n"
+
+FORK_BOMB = """
+import os, time
+children = 0
+try:
+    for _ in range(100000):
+        if os.fork() == 0:
+            time.sleep(30)
+            os._exit(0)
+        children += 1
+except OSError:
+    pass
+print(children)
+"""
+
+
+def processes_of(uid: int) -> int:
+    count = 0
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            if os.stat(f"/proc/{pid}").st_uid == uid:
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+async def check(hidden: list) -> list:
+    """[(check, passed?, what was seen)]"""
+    judge = SampleJudge(languages=load_languages(), workers=1, queue_timeout=600)
+    judge.start()
+    try:
+        await judge._ready
+        if not judge.enabled or not judge.languages[PYTHON].available:
+            return [("judge is on (as root, with bwrap, prlimit and python3)", False, json.dumps(judge.stats()))]
+
+        async def run(source, stdin="", time_limit=2.0, memory_mb=256):
+            result = await judge.judge(PYTHON, source, [{"input": stdin, "output": ""}], time_limit, memory_mb)
+            return result["tests"][0]
+
+        results = []
+        test = await run(WHOAMI)
+        results.append(("runs as nobody", test["output"].split() == [str(NOBODY)] * 2, test["output"]))
+
+        test = await run(NETWORK)
+        results.append(("no network", test["output"].strip() == "none", test["output"] + test["stderr"]))
+
+        paths = hidden + [judge.root, "/root", "/etc/shadow"]
+        test = await run(FILES, json.dumps(paths))
+        results.append(("host paths hidden", test["output"].strip() == "none", test["output"] + test["stderr"]))
+
+        test = await run(PROCESSES)
+        seen = test["output"].split()
+        results.append((
+            "only its own processes, no service environment",
+            len(seen) == 2 and int(seen[0]) <= 3 and seen[1] == "none",
+            test["output"] + test["stderr"],
+        ))
+
+        test = await run(CPU, time_limit=1.0)
+        results.append(("CPU limit", test["verdict"] == "TIME_LIMIT_EXCEEDED", f"{test['verdict']} in {test['timeMs']} ms"))
+
+        test = await run(MEMORY)
+        results.append(("memory limit", test["verdict"] == "RUNTIME_ERROR", test["verdict"] + " " + test["stderr"][-200:]))
+
+        test = await run(OUTPUT)
+        results.append(("output limit", test["verdict"] == "OUTPUT_LIMIT_EXCEEDED", test["verdict"]))
+
+        test = await run(FORK_BOMB, time_limit=5.0)
+        await asyncio.sleep(1)  # for the kernel to reap what the sandbox's end took down
+        left = processes_of(NOBODY)
+        forked = test["output"].strip()
+        results.append((
+            "fork bomb contained",
+            left == 0 and (not forked.isdigit() or int(forked) <= MAX_PROCESSES),
+            f"{test['verdict']}, forked {forked or '?'}, {left} processes left as nobody",
+        ))
+        return results
+    finally:
+        await judge.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--hidden",
+        action="append",
+        default=[],
+        help="a path no solution may see (repeatable); default: /app and /app/data",
+    )
+    args = parser.parse_args()
+    os.environ[MARKER] = "1"
+    results = asyncio.run(check(args.hidden or ["/app", "/app/data"]))
+    for name, passed, seen in results:
+        print(f"{'PASS' if passed else 'FAIL'}  {name}: {seen.strip()[:300]}")
+    sys.exit(0 if all(passed for _, passed, _ in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+session_pool.py — Reusable curl_cffi sessions keyed by account.
+
+Building a fresh impersonating session per request costs a TCP+TLS handshake
+and throws away any Cloudflare clearance cookies Codeforces handed out.
+SessionPool keeps sessions alive between requests, keyed by a hash of the
+cookie string (never the raw cookies), with LRU eviction and an idle TTL.
+Sessions taken with checkout() are counted while in use: one evicted or
+discarded meanwhile leaves the pool at once but is closed only when its
+last user is done.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from http.cookiejar import Cookie
+from typing import Iterator, Optional
+
+from curl_cffi import requests as cf_requests
+
+ANONYMOUS_KEY = "anonymous"
+
+
+def parse_cookies(cookie_str: str) -> dict:
+    """Parse 'key=value; key2=value2' into dict."""
+    cookies = {}
+    for part in cookie_str.split(";"):
+        part = part.strip()
+        if "=" in part:
+            k, v = part.split("=", 1)
+            cookies[k.strip()] = v.strip()
+    return cookies
+
+
+def cookie_key(cookie_str: Optional[str]) -> str:
+    """Stable pool key for a cookie string (anonymous when empty)."""
+    if not cookie_str:
+        return ANONYMOUS_KEY
+    return hashlib.sha256(cookie_str.encode()).hexdigest()[:32]
+
+
+def new_session(
+    cookie_str: Optional[str] = None,
+    cookie_domain: str = ".codeforces.com",
+    max_clients: int = 10,
+) -> cf_requests.AsyncSession:
+    """Create an async curl_cffi session impersonating Chrome with the given cookies."""
+    sess = cf_requests.AsyncSession(impersonate="chrome", max_clients=max_clients)
+    if cookie_str:
+        for k, v in parse_cookies(cookie_str).items():
+            sess.cookies.set(k, v, domain=cookie_domain)
+    return sess
+
+
+def export_cookies(sess: cf_requests.AsyncSession) -> list:
+    """The session's current cookie jar as JSON-able dicts."""
+    return [
+        {
+            "name": c.name,
+            "value": c.value,
+            "domain": c.domain,
+            "path": c.path,
+            "secure": c.secure,
+            "expires": c.expires,
+        }
+        for c in sess.cookies.jar
+    ]
+
+
+def import_cookies(sess: cf_requests.AsyncSession, cookies: list) -> int:
+    """Put exported cookies back into a session's jar, skipping expired ones."""
+    now = time.time()
+    restored = 0
+    for c in cookies:
+        if c.get("expires") is not None and c["expires"] <= now:
+            continue
+        domain = c.get("domain") or ""
+        sess.cookies.jar.set_cookie(Cookie(
+            version=0, name=c["name"], value=c["value"],
+            port=None, port_specified=False,
+            domain=domain, domain_specified=bool(domain), domain_initial_dot=domain.startswith("."),
+            path=c.get("path") or "/", path_specified=True,
+            secure=bool(c.get("secure")), expires=c.get("expires"), discard=c.get("expires") is None,
+            comment=None, comment_url=None, rest={},
+        ))
+        restored += 1
+    return restored
+
+
+class _Entry:
+    __slots__ = ("session", "last_used", "users", "retired")
+
+    def __init__(self, session: cf_requests.AsyncSession, now: float):
+        self.session = session
+        self.last_used = now
+        self.users = 0  # checkouts not yet returned
+        self.retired = False  # out of the pool; close once users drops to 0
+
+
+class SessionPool:
+    """
+    LRU of async curl_cffi sessions.
+
+    Each AsyncSession multiplexes up to `max_clients` concurrent transfers,
+    so one pooled session serves every in-flight request for its account.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 32,
+        idle_ttl: float = 1800.0,
+        cookie_domain: str = ".codeforces.com",
+        max_clients: int = 10,
+    ):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.cookie_domain = cookie_domain
+        self.max_clients = max_clients
+        self._sessions = OrderedDict()  # key -> _Entry
+        self._draining = set()  # retired entries still checked out
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, cookie_str: Optional[str] = None) -> cf_requests.AsyncSession:
+        """
+        Return the pooled session for these cookies, creating it on a miss.
+        Not counted as in use: only for pools whose sessions are never
+        evicted while a request runs (one key, idle TTL); see checkout().
+        """
+        return self._acquire(cookie_str, 0).session
+
+    @contextlib.contextmanager
+    def checkout(self, cookie_str: Optional[str] = None) -> Iterator[cf_requests.AsyncSession]:
+        """Like get(), but the session is not closed while the block runs, even if evicted."""
+        entry = self._acquire(cookie_str, 1)
+        try:
+            yield entry.session
+        finally:
+            with self._lock:
+                entry.users -= 1
+                done = entry.retired and entry.users == 0
+                if done:
+                    self._draining.discard(entry)
+            if done:
+                _close_quietly(entry.session)
+
+    def export(self) -> dict:
+        """{pool key: cookies} for every live session (see CookieJarStore)."""
+        with self._lock:
+            sessions = [(key, entry.session) for key, entry in self._sessions.items()]
+        return {key: export_cookies(sess) for key, sess in sessions}
+
+    def restore(self, jars: dict) -> int:
+        """
+        Recreate sessions from export() output, under the same keys, so the
+        next get() for those cookies picks up everything the old session had
+        collected. Returns the number of cookies restored.
+        """
+        restored = 0
+        now = time.monotonic()
+        with self._lock:
+            for key, cookies in jars.items():
+                if key in self._sessions or len(self._sessions) >= self.max_size:
+                    continue
+                sess = new_session(None, self.cookie_domain, self.max_clients)
+                restored += import_cookies(sess, cookies)
+                self._sessions[key] = _Entry(sess, now)
+        return restored
+
+    def discard(self, cookie_str: Optional[str] = None) -> None:
+        """Drop the session for these cookies (e.g. after a 401 or block)."""
+        with self._lock:
+            entry = self._sessions.pop(cookie_key(cookie_str), None)
+            stale = self._retire(entry) if entry is not None else []
+        for sess in stale:
+            _close_quietly(sess)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._sessions),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "draining": len(self._draining),
+            "hitRate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _acquire(self, cookie_str: Optional[str], users: int) -> _Entry:
+        key = cookie_key(cookie_str)
+        now = time.monotonic()
+        stale = []
+
+        with self._lock:
+            stale.extend(self._expire(now))
+            entry = self._sessions.get(key)
+            if entry is not None:
+                entry.last_used = now
+                self._sessions.move_to_end(key)
+                self.hits += 1
+                entry.users += users
+            else:
+                self.misses += 1
+                entry = self._sessions[key] = _Entry(
+                    new_session(cookie_str, self.cookie_domain, self.max_clients), now
+                )
+                entry.users += users
+                while len(self._sessions) > self.max_size:
+                    _, old = self._sessions.popitem(last=False)
+                    self.evictions += 1
+                    stale.extend(self._retire(old))
+
+        for sess in stale:
+            _close_quietly(sess)
+        return entry
+
+    def _retire(self, entry: _Entry) -> list:
+        """Take an entry out of service: [its session] if it can close now. Caller holds the lock."""
+        entry.retired = True
+        if entry.users:
+            self._draining.add(entry)
+            return []
+        return [entry.session]
+
+    def _expire(self, now: float) -> list:
+        """Pop sessions idle for longer than idle_ttl. Caller holds the lock."""
+        expired = []
+        while self._sessions:
+            key, entry = next(iter(self._sessions.items()))
+            if now - entry.last_used < self.idle_ttl:
+                break
+            del self._sessions[key]
+            self.evictions += 1
+            expired.extend(self._retire(entry))
+        return expired
+
+
+def _close_quietly(sess: cf_requests.AsyncSession) -> None:
+    """Close an evicted session in the background on the running loop."""
+
+    async def _close():
+        try:
+            await sess.close()
+        except Exception:
+            pass
+
+    try:
+        asyncio.get_running_loop().create_task(_close())
+    except RuntimeError:
+        pass  # no loop (shutdown) — let the GC reclaim it
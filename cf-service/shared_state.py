@@ -0,0 +1,268 @@
+"""
+shared_state.py — State shared between cf_service worker processes.
+
+With several uvicorn workers, per-process state breaks in two ways: each
+worker fetches the same problems and CSRF tokens again, and each keeps its
+own rate-limit buckets, so N workers submit N times faster than Codeforces
+allows. SharedStore is one SQLite file in WAL mode (readers never block,
+one writer at a time, no server to run) that every worker opens:
+
+  - entries with an expiry, grouped by namespace (parsed problems, CSRF
+    tokens, submit job snapshots, verdict records, the account list)
+  - token buckets, refilled and taken in one write transaction
+  - leases, so only one worker at a time runs a periodic job (polling a
+    handle's verdicts)
+
+Every operation is a single short transaction on a local file, cheap
+enough to run on the event loop.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_updated ON entries (ns, updated);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+PURGE_EVERY = 500  # writes between sweeps of expired entries
+
+
+class SharedStore:
+    """
+    Opened by every worker on the same `path`. Values are JSON; times are
+    wall-clock seconds, since monotonic clocks are not comparable between
+    processes on every platform.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.owner = f"{os.getpid()}-{os.urandom(4).hex()}"  # this worker, for leases
+        self._local = threading.local()  # sqlite3 connections are per thread
+        self._writes = 0
+        self.reads = 0
+        self.writes = 0
+        self.busy = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Holds account cookies and CSRF tokens, and so do the WAL and shared
+        # memory files: create all three 0600 before SQLite opens them (it
+        # would create the sidecars 0644 under the default umask)
+        for suffix in ("", "-wal", "-shm"):
+            fd = os.open(path + suffix, os.O_WRONLY | os.O_CREAT, 0o600)
+            try:
+                os.fchmod(fd, 0o600)
+            finally:
+                os.close(fd)
+        self._conn().executescript(SCHEMA)
+
+    # --- Entries ---
+
+    def get(self, ns: str, key: str) -> Any:
+        """The value, or None when missing or expired."""
+        row = self._read(
+            "SELECT value FROM entries WHERE ns = ? AND key = ? AND expires > ?",
+            (ns, key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, ns: str, keys: Iterable[str]) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        marks = ",".join("?" * len(keys))
+        rows = self._read(
+            f"SELECT key, value FROM entries WHERE ns = ? AND expires > ? AND key IN ({marks})",
+            (ns, time.time(), *keys),
+        )
+        return {key: json.loads(value) for key, value in rows}
+
+    def changed_since(self, ns: str, since: float) -> tuple:
+        """([(key, value)] written after `since`, oldest first; the cursor for the next call)."""
+        rows = self._read(
+            "SELECT key, value, updated FROM entries WHERE ns = ? AND updated > ? AND expires > ? "
+            "ORDER BY updated",
+            (ns, since, time.time()),
+        ).fetchall()
+        cursor = rows[-1][2] if rows else since
+        return [(key, json.loads(value)) for key, value, _ in rows], cursor
+
+    def put(self, ns: str, key: str, value: Any, ttl: float) -> None:
+        self.put_many(ns, {key: value}, ttl)
+
+    def put_many(self, ns: str, values: dict, ttl: float) -> None:
+        if not values:
+            return
+        encoded = {key: json.dumps(value) for key, value in values.items()}
+        with self._transaction() as conn:
+            # Stamped under the write lock, so `updated` follows commit order (changed_since)
+            now = time.time()
+            rows = [(ns, key, value, now + ttl, now) for key, value in encoded.items()]
+            conn.executemany(
+                "INSERT INTO entries (ns, key, value, expires, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET "
+                "value = excluded.value, expires = excluded.expires, updated = excluded.updated",
+                rows,
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+
+    def add(self, ns: str, key: str, value: Any, ttl: float) -> bool:
+        """Store `value` unless an unexpired entry holds a different one; True if `key` now holds it."""
+        encoded = json.dumps(value)
+        with self._transaction() as conn:
+            now = time.time()
+            cursor = conn.execute(
+                "INSERT INTO entries (ns, key, value, expires, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET "
+                "value = excluded.value, expires = excluded.expires, updated = excluded.updated "
+                "WHERE entries.expires <= ? OR entries.value = excluded.value",
+                (ns, key, encoded, now + ttl, now, now),
+            )
+            self._writes += 1
+            return cursor.rowcount == 1
+
+    def delete(self, ns: str, key: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+
+    # --- Token buckets ---
+
+    def take_token(self, name: str, rate: float, capacity: int) -> float:
+        """
+        Take one token if available and return 0, otherwise return the seconds
+        until one will be. Atomic across workers.
+        """
+        with self._transaction() as conn:
+            now = time.time()
+            tokens = self._refill(conn, name, rate, capacity, now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if wait == 0.0:
+                tokens -= 1
+            self._save_bucket(conn, name, tokens, now)
+        return wait
+
+    def bucket_wait(self, name: str, rate: float, capacity: int) -> float:
+        """Seconds until a token is available, without taking it."""
+        row = self._read("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return 0.0
+        tokens = min(capacity, row[0] + (time.time() - row[1]) * rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / rate
+
+    def drain_bucket(self, name: str, rate: float, capacity: int) -> None:
+        with self._transaction() as conn:
+            now = time.time()
+            tokens = self._refill(conn, name, rate, capacity, now)
+            self._save_bucket(conn, name, min(tokens, 0.0), now)
+
+    # --- Leases ---
+
+    def acquire_lease(self, name: str, ttl: float) -> bool:
+        """Take or renew `name` for this worker unless another one holds it unexpired."""
+        with self._transaction() as conn:
+            now = time.time()
+            row = conn.execute("SELECT owner, expires FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != self.owner and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires",
+                (name, self.owner, now + ttl),
+            )
+        return True
+
+    def lease_holder(self, name: str) -> Optional[str]:
+        """Owner of an unexpired lease, or None."""
+        row = self._read(
+            "SELECT owner FROM leases WHERE name = ? AND expires > ?", (name, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def release_lease(self, name: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "owner": self.owner,
+            "reads": self.reads,
+            "writes": self.writes,
+            "busy": self.busy,
+        }
+
+    # --- Internals ---
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable enough for caches, no fsync per write
+            self._local.conn = conn
+        return conn
+
+    def _read(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        self.reads += 1
+        return self._conn().execute(sql, params)
+
+    def _transaction(self):
+        return _Transaction(self)
+
+    @staticmethod
+    def _refill(conn: sqlite3.Connection, name: str, rate: float, capacity: int, now: float) -> float:
+        row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return float(capacity)
+        return min(capacity, row[0] + (now - row[1]) * rate)
+
+    @staticmethod
+    def _save_bucket(conn: sqlite3.Connection, name: str, tokens: float, now: float) -> None:
+        conn.execute(
+            "INSERT INTO buckets (name, tokens, updated) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+            (name, tokens, now),
+        )
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT: takes the write lock up front, so read-modify-write is atomic."""
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+        self.conn = store._conn()
+
+    def __enter__(self) -> sqlite3.Connection:
+        started = time.monotonic()
+        self.conn.execute("BEGIN IMMEDIATE")
+        if time.monotonic() - started > 0.05:
+            self.store.busy += 1  # waited on another worker's write
+        self.store.writes += 1
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
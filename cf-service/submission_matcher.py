@@ -0,0 +1,300 @@
+"""
+submission_matcher.py — Find the ID of a submission the status page didn't identify.
+
+When the page Codeforces redirects to after a submit can't be trusted to
+show our submission first (another worker or person submitted on the same
+account at the same time), the ID has to come from user.status. Taking the
+account's newest record is wrong under concurrency, so SubmissionMatcher
+matches records instead:
+
+  - candidates are the account's records for the same problem, created
+    within the submit's time window and not already attributed
+  - the language must match too, once its user.status name is known (CF
+    reports names, we submit IDs; the mapping is learned from unambiguous
+    matches)
+  - when more candidates than pending submits remain (or several pending
+    submits share candidates), each candidate's source is fetched and
+    compared by fingerprint; submits on a pooled account (`verify`) are
+    always compared, since anyone else using the account can create a
+    lone candidate that isn't ours
+  - with a SharedStore, claims go through it, so two workers never
+    attribute the same record
+
+All submits pending on one handle share a single user.status call per
+round, so attribution costs one API call however many are in flight.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from shared_state import SharedStore
+
+log = logging.getLogger("cf_service.matcher")
+
+PROBLEM_CODE_RE = re.compile(r"^(\d+)/?([A-Za-z]\w*)$")
+CLOCK_SLACK = 5.0  # seconds of skew allowed between our clock and CF's creationTimeSeconds
+MAX_CLAIMED = 1000  # attributed IDs (and read fingerprints) remembered per handle
+CLAIM_NS = "submission-claims"  # SharedStore namespace: "<handle>:<id>" -> owning worker
+CLAIM_TTL = 3600.0  # far longer than any submit's attribution window
+
+
+def parse_problem_code(code: str) -> Optional[tuple]:
+    """"1234B" or "1234/B" -> (1234, "B"); None if it isn't one."""
+    match = PROBLEM_CODE_RE.match(code.strip())
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+def source_fingerprint(source: str) -> str:
+    """Hash of the source as CF displays it: line endings and trailing blanks don't count."""
+    lines = source.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    normalized = "\n".join(line.rstrip() for line in lines).strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class PendingSubmit:
+    def __init__(
+        self,
+        problem: tuple,
+        language: str,
+        source: str,
+        submitted_at: float,
+        read_source: Callable[[dict], Awaitable[Optional[str]]],
+        timeout: float,
+        verify: bool,
+    ):
+        self.problem = problem
+        self.language = language
+        self.fingerprint = source_fingerprint(source)
+        self.submitted_at = submitted_at  # wall clock just before the POST
+        self.read_source = read_source
+        self.verify = verify  # never take a lone candidate without comparing sources
+        self.deadline = time.monotonic() + timeout
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class HandleMatches:
+    def __init__(self):
+        self.pending = []  # PendingSubmit, oldest first
+        self.claimed = OrderedDict()  # submission IDs already attributed (insertion-ordered set)
+        self.fingerprints = OrderedDict()  # submission ID -> source fingerprint, once read
+        self.task: Optional[asyncio.Task] = None
+
+
+class SubmissionMatcher:
+    """
+    `fetch_recent(handle, count)` returns the handle's newest user.status
+    records. `store` (optional) shares claimed IDs between worker processes.
+    """
+
+    def __init__(
+        self,
+        fetch_recent: Callable[[str, int], Awaitable[list]],
+        interval: float = 1.0,
+        timeout: float = 60.0,
+        store: Optional[SharedStore] = None,
+    ):
+        self.fetch_recent = fetch_recent
+        self.interval = interval
+        self.timeout = timeout
+        self.store = store
+        self.handles = {}  # handle -> HandleMatches
+        self.languages = {}  # language ID we submit -> name user.status reports
+        self.rounds = 0
+        self.matched = 0
+        self.by_fingerprint = 0
+        self.source_reads = 0
+        self.unmatched = 0
+        self.conflicts = 0
+
+    # --- Public API ---
+
+    def claim(self, handle: str, submission_id: int) -> bool:
+        """
+        Record an ID as attributed (e.g. from the status page) so it is never
+        matched again. False if it was already claimed, here or by another
+        worker.
+        """
+        state = self._state(handle)
+        if submission_id in state.claimed:
+            return False
+        self._remember(state, submission_id)
+        if self.store is None:
+            return True
+        return self.store.add(CLAIM_NS, f"{handle}:{submission_id}", self.store.owner, CLAIM_TTL)
+
+    async def attribute(
+        self,
+        handle: str,
+        problem_code: str,
+        language: str,
+        source: str,
+        submitted_at: float,
+        read_source: Callable[[dict], Awaitable[Optional[str]]],
+        verify: bool = False,
+    ) -> Optional[int]:
+        """
+        The submission's ID, or None if no record matched before the timeout.
+        `read_source(record)` returns a submission's source as the account
+        sees it (None when it can't be read); called to break ties, and for
+        every candidate when `verify` is set.
+        """
+        problem = parse_problem_code(problem_code)
+        if problem is None:
+            return None
+        state = self._state(handle)
+        pending = PendingSubmit(problem, str(language), source, submitted_at, read_source, self.timeout, verify)
+        state.pending.append(pending)
+        if state.task is None or state.task.done():
+            # Shared by every pending submit: not part of any one request's trace
+            state.task = asyncio.get_running_loop().create_task(
+                self._run(handle, state), context=contextvars.Context()
+            )
+        try:
+            return await asyncio.shield(pending.future)
+        finally:
+            if pending in state.pending:
+                state.pending.remove(pending)
+
+    def stats(self) -> dict:
+        return {
+            "pending": sum(len(state.pending) for state in self.handles.values()),
+            "rounds": self.rounds,
+            "matched": self.matched,
+            "byFingerprint": self.by_fingerprint,
+            "sourceReads": self.source_reads,
+            "unmatched": self.unmatched,
+            "claimConflicts": self.conflicts,
+            "languages": len(self.languages),
+        }
+
+    async def shutdown(self) -> None:
+        tasks = [state.task for state in self.handles.values() if state.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- Internals ---
+
+    def _state(self, handle: str) -> HandleMatches:
+        state = self.handles.get(handle)
+        if state is None:
+            state = self.handles[handle] = HandleMatches()
+        return state
+
+    @staticmethod
+    def _remember(state: HandleMatches, submission_id: int) -> None:
+        state.claimed[submission_id] = None
+        while len(state.claimed) > MAX_CLAIMED:
+            state.claimed.popitem(last=False)
+
+    def _load_claims(self, handle: str, state: HandleMatches, records: list) -> None:
+        """Mark records other workers have attributed as claimed here too."""
+        keys = {f"{handle}:{record['id']}": record["id"] for record in records if record["id"] not in state.claimed}
+        for key in self.store.get_many(CLAIM_NS, keys):
+            self._remember(state, keys[key])
+
+    async def _run(self, handle: str, state: HandleMatches) -> None:
+        while state.pending:
+            # Let submits that land together share this round's API call
+            await asyncio.sleep(self.interval)
+            self.rounds += 1
+            try:
+                records = await self.fetch_recent(handle, min(100, 10 + 2 * len(state.pending)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("user.status for %s failed during attribution: %s", handle, e)
+                records = None
+            # Taken after the fetch, so a submit whose record is in `records`
+            # but registered while the call was out still competes for it
+            waiting = [p for p in state.pending if not p.future.done()]
+            if records is not None:
+                await self._match(handle, state, waiting, records)
+            for pending in waiting:
+                if not pending.future.done() and time.monotonic() > pending.deadline:
+                    self.unmatched += 1
+                    pending.future.set_result(None)
+            state.pending = [p for p in state.pending if not p.future.done()]
+
+    def _candidates(self, state: HandleMatches, pending: PendingSubmit, records: list) -> list:
+        name = self.languages.get(pending.language)
+        found = []
+        for record in records:
+            problem = record.get("problem", {})
+            created = record.get("creationTimeSeconds", 0)
+            if (
+                record["id"] not in state.claimed
+                and (problem.get("contestId"), problem.get("index")) == pending.problem
+                and pending.submitted_at - CLOCK_SLACK <= created <= time.time() + CLOCK_SLACK
+                and (name is None or record.get("programmingLanguage") == name)
+            ):
+                found.append(record)
+        return found
+
+    async def _match(self, handle: str, state: HandleMatches, waiting: list, records: list) -> None:
+        if self.store is not None:
+            self._load_claims(handle, state, records)
+        # Group pending submits that compete for the same records
+        groups = {}
+        for pending in waiting:
+            groups.setdefault((pending.problem, self.languages.get(pending.language)), []).append(pending)
+
+        for group in groups.values():
+            candidates = {}
+            for pending in group:
+                for record in self._candidates(state, pending, records):
+                    candidates[record["id"]] = record
+            if not candidates:
+                continue  # not visible in user.status yet
+            if len(group) == 1 and len(candidates) == 1 and not group[0].verify:
+                self._resolve(handle, state, group[0], next(iter(candidates.values())))
+                continue
+            await self._match_sources(handle, state, group, list(candidates.values()))
+
+    async def _match_sources(self, handle: str, state: HandleMatches, group: list, candidates: list) -> None:
+        """Several submits, foreign records in the window, or a pooled account: compare source fingerprints."""
+        by_fingerprint = {pending.fingerprint: pending for pending in group}
+        read_source = group[0].read_source  # any session of the account can read its submissions
+        for record in sorted(candidates, key=lambda r: r["id"]):
+            if not by_fingerprint:
+                return
+            fingerprint = state.fingerprints.get(record["id"])
+            if fingerprint is None:
+                try:
+                    source = await read_source(record)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("Reading source of %s failed: %s", record["id"], e)
+                    source = None
+                if source is None:
+                    continue
+                self.source_reads += 1
+                # Kept even when nobody matches it yet: its submit may not have registered
+                fingerprint = state.fingerprints[record["id"]] = source_fingerprint(source)
+                while len(state.fingerprints) > MAX_CLAIMED:
+                    state.fingerprints.popitem(last=False)
+            pending = by_fingerprint.pop(fingerprint, None)
+            if pending is not None and not pending.future.done():
+                if self._resolve(handle, state, pending, record):
+                    self.by_fingerprint += 1
+                else:
+                    by_fingerprint[fingerprint] = pending  # a later record may be the same source
+
+    def _resolve(self, handle: str, state: HandleMatches, pending: PendingSubmit, record: dict) -> bool:
+        if not self.claim(handle, record["id"]):
+            # Another worker attributed it between our read and now; retried next round
+            self.conflicts += 1
+            return False
+        name = record.get("programmingLanguage")
+        if name and pending.language not in self.languages:
+            self.languages[pending.language] = name
+        self.matched += 1
+        pending.future.set_result(record["id"])
+        return True
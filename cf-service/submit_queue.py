@@ -0,0 +1,284 @@
+"""
+submit_queue.py — Paced submission queue with job IDs.
+
+Codeforces answers bursts from one account with "You have submitted too
+often". Instead of turning that into a user-facing 429, submissions are
+queued per account and drained through a token bucket tuned to CF's pacing
+(about one submission every 10 seconds). One worker per account submits
+jobs strictly in order; a job that still gets rate-limited goes back to the
+front of its queue and is retried after a backoff. So is a job that hit an
+open circuit breaker (503), after the Retry-After the breaker asked for.
+
+With several worker processes the buckets come from `make_bucket` (shared
+ones, keyed by account), so the per-account pace holds across workers.
+
+An attempt can hand back an awaitable instead of its result once Codeforces
+has accepted the submission and only bookkeeping (finding its ID) is left.
+The job settles in the background and the account's next job goes ahead,
+so submits to one account are pipelined.
+"""
+
+import asyncio
+import contextvars
+import inspect
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from circuit_breaker import retry_after
+from rate_limit import TokenBucket
+
+log = logging.getLogger("cf_service.submit_queue")
+
+
+class SubmitJob:
+    def __init__(self, account: str, payload: Any):
+        self.id = uuid.uuid4().hex
+        self.account = account
+        self.payload = payload  # dropped once the job finishes (holds cookies and source)
+        self.status = "queued"  # queued -> submitting -> done | failed
+        self.attempts = 0
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.retry_at = 0.0  # monotonic time before which a rate-limited job is held back
+        self.done = asyncio.Event()
+        self.context = contextvars.copy_context()  # the enqueuing request's (trace), for submit()
+
+
+class AccountLane:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.pending = deque()  # SubmitJob, oldest first
+        self.current: Optional[SubmitJob] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class SubmitQueue:
+    """
+    `submit(payload)` performs one upstream submission and returns its result
+    dict, or an awaitable of it (see the module docstring); it raises an exception carrying `status_code` (HTTPException) on
+    failure. A 429 or 503 is retried up to `max_retries` times, anything else
+    fails the job. `make_bucket(account, rate, burst)` builds an account's
+    bucket (a local TokenBucket by default); `on_change(job)` is called
+    whenever a job changes state.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[Any], Awaitable[dict]],
+        rate_per_minute: float = 6.0,
+        burst: int = 1,
+        max_retries: int = 5,
+        retry_delay: float = 10.0,
+        job_ttl: float = 3600.0,
+        make_bucket: Optional[Callable[[str, float, int], Any]] = None,
+        on_change: Optional[Callable[[SubmitJob], None]] = None,
+    ):
+        self.submit = submit
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.job_ttl = job_ttl
+        self.make_bucket = make_bucket or (lambda account, rate, burst: TokenBucket(rate, burst))
+        self.on_change = on_change
+        self.lanes = {}  # account key -> AccountLane
+        self.jobs = {}  # job id -> SubmitJob
+        self.settling = set()  # tasks finishing jobs that were accepted upstream
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.retried_unavailable = 0
+
+    # --- Public API ---
+
+    def enqueue(self, account: str, payload: Any) -> SubmitJob:
+        self._expire()
+        job = SubmitJob(account, payload)
+        self.jobs[job.id] = job
+
+        lane = self.lanes.get(account)
+        if lane is None:
+            lane = self.lanes[account] = AccountLane(
+                self.make_bucket(account, self.rate, self.burst)
+            )
+        lane.pending.append(job)
+        self._changed(job)
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.get_running_loop().create_task(self._drain(lane))
+        return job
+
+    def get(self, job_id: str) -> Optional[SubmitJob]:
+        self._expire()
+        return self.jobs.get(job_id)
+
+    def position(self, job: SubmitJob) -> int:
+        """1-based place in its account's queue; 0 once it is being submitted or finished."""
+        if job.status != "queued":
+            return 0
+        lane = self.lanes.get(job.account)
+        try:
+            return lane.pending.index(job) + 1
+        except (AttributeError, ValueError):
+            return 0
+
+    def load(self, account: str) -> int:
+        """Submissions queued or in flight for this account."""
+        lane = self.lanes.get(account)
+        if lane is None:
+            return 0
+        return len(lane.pending) + (1 if lane.current else 0)
+
+    async def wait(self, job: SubmitJob, timeout: Optional[float] = None) -> bool:
+        """Wait until the job finishes; False if `timeout` ran out first."""
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def describe(self, job: SubmitJob) -> dict:
+        return {
+            "jobId": job.id,
+            "status": job.status,
+            "position": self.position(job),
+            "attempts": job.attempts,
+            "result": job.result,
+            "error": (
+                {"status": job.error_status, "detail": job.error}
+                if job.status == "failed"
+                else None
+            ),
+            "createdAt": job.created_at,
+            "finishedAt": job.finished_at,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "accounts": len(self.lanes),
+            "queued": sum(len(lane.pending) for lane in self.lanes.values()),
+            "submitting": sum(1 for lane in self.lanes.values() if lane.current),
+            "settling": len(self.settling),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried429": self.retried,
+            "retried503": self.retried_unavailable,
+            "ratePerMinute": round(self.rate * 60, 2),
+        }
+
+    async def shutdown(self) -> None:
+        tasks = [lane.task for lane in self.lanes.values() if lane.task] + list(self.settling)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- Internals ---
+
+    async def _drain(self, lane: AccountLane) -> None:
+        while lane.pending:
+            job = lane.pending[0]
+            delay = job.retry_at - time.monotonic()
+            if delay <= 0:
+                delay = lane.bucket.try_take()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            lane.pending.popleft()
+            lane.current = job
+            job.status = "submitting"
+            job.attempts += 1
+            self._changed(job)
+            try:
+                result = await asyncio.get_running_loop().create_task(
+                    self.submit(job.payload), context=job.context
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status = getattr(e, "status_code", 502)
+                if status == 429 and job.attempts <= self.max_retries:
+                    # CF pushed back: hold this account off and retry the same job first
+                    self.retried += 1
+                    lane.bucket.drain()
+                    job.status = "queued"
+                    job.retry_at = time.monotonic() + self.retry_delay * job.attempts
+                    lane.pending.appendleft(job)
+                    self._changed(job)
+                    log.info("Job %s rate-limited (attempt %d), retrying", job.id, job.attempts)
+                elif status == 503 and job.attempts <= self.max_retries:
+                    # Codeforces is down: wait until the breaker half-opens, don't burn the bucket
+                    self.retried_unavailable += 1
+                    job.status = "queued"
+                    job.retry_at = time.monotonic() + retry_after(e, self.retry_delay)
+                    lane.pending.appendleft(job)
+                    self._changed(job)
+                    log.info("Job %s hit an open circuit (attempt %d), retrying", job.id, job.attempts)
+                else:
+                    self._finish(
+                        job, "failed", error=getattr(e, "detail", str(e)), error_status=status
+                    )
+            else:
+                if inspect.isawaitable(result):
+                    self._settle(job, result)
+                else:
+                    self._finish(job, "done", result=result)
+            finally:
+                lane.current = None
+
+    def _settle(self, job: SubmitJob, pending: Awaitable[dict]) -> None:
+        async def settle() -> None:
+            try:
+                result = await pending
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Already on Codeforces: never retried, or it would be submitted twice
+                self._finish(
+                    job, "failed", error=getattr(e, "detail", str(e)),
+                    error_status=getattr(e, "status_code", 502),
+                )
+            else:
+                self._finish(job, "done", result=result)
+
+        task = asyncio.get_running_loop().create_task(settle(), context=job.context)
+        self.settling.add(task)
+        task.add_done_callback(self.settling.discard)
+
+    def _finish(
+        self,
+        job: SubmitJob,
+        status: str,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        error_status: Optional[int] = None,
+    ) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.error_status = error_status
+        job.finished_at = time.time()
+        job.payload = None
+        if status == "done":
+            self.completed += 1
+        else:
+            self.failed += 1
+        job.done.set()
+        self._changed(job)
+
+    def _changed(self, job: SubmitJob) -> None:
+        if self.on_change:
+            try:
+                self.on_change(job)
+            except Exception as e:
+                log.warning("Job %s change hook failed: %s", job.id, e)
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j.id for j in self.jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self.jobs[job_id]
@@ -0,0 +1,148 @@
+"""
+tracing.py — Request traces as JSON span logs, propagated with W3C traceparent.
+
+A request arriving with `traceparent: 00-<trace id>-<parent span id>-<flags>`
+(the backend sends one) joins that trace; one without a header starts a
+new trace. Either way the sampling decision is made once per trace: the
+caller's flag if it sent one, otherwise `sample_rate`. Unsampled requests
+record nothing.
+
+Each span is one JSON line when it ends:
+
+    {"type": "span", "service": "cf-service", "traceId": ..., "spanId": ...,
+     "parentId": ..., "name": "csrf_page", "startMs": <epoch ms>,
+     "durationMs": 412.3, "status": "ok", "attrs": {...}}
+
+Lines from the backend and cf-service share this shape, so a collector
+(bench/waterfall.py) can merge them into one waterfall per trace ID.
+
+The current span lives in a ContextVar, so it follows the request across
+awaits and into tasks created while handling it. Work queued for later
+(API calls, submit jobs) carries the context it was queued from.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "_started", "attrs", "status")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attrs: dict):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.attrs = attrs
+        self.status = "ok"
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def record(self) -> dict:
+        return {
+            "type": "span",
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "startMs": round(self.start * 1000, 3),
+            "durationMs": round((time.perf_counter() - self._started) * 1000, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+def json_line_logger(name: str, path: str) -> Callable[[dict], None]:
+    """An emit function writing one JSON object per line to `path` ("-" = stdout)."""
+    logger = logging.getLogger(name)
+    logger.propagate = False  # span lines must not pick up another handler's format
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout) if path == "-" else logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    return lambda record: logger.info(json.dumps(record, separators=(",", ":")))
+
+
+class Tracer:
+    """`emit(record)` receives every finished span of a sampled trace."""
+
+    def __init__(self, service: str, sample_rate: float, emit: Callable[[dict], None]):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.emit = emit
+        self.traces = 0
+        self.sampled = 0
+        self.spans = 0
+
+    # --- Public API ---
+
+    def start_request(self, traceparent: Optional[str], name: str, **attrs) -> Optional[Span]:
+        """
+        Root span for an incoming request (None when the trace isn't sampled).
+        The caller sets it as current and finishes it when the response is done.
+        """
+        self.traces += 1
+        match = TRACEPARENT_RE.match(traceparent or "")
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            sampled = int(flags, 16) & 1
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return None
+        self.sampled += 1
+        return Span(trace_id, parent_id, name, attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a child of the current span; does nothing outside a sampled trace."""
+        parent = current_span.get()
+        if parent is None:
+            yield None
+            return
+        child = Span(parent.trace_id, parent.span_id, name, attrs)
+        token = current_span.set(child)
+        try:
+            yield child
+        except BaseException as e:
+            child.status = "error"
+            child.attrs["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            current_span.reset(token)
+            self.finish(child)
+
+    def annotate(self, **attrs) -> None:
+        """Add attributes to the current span, if any."""
+        span = current_span.get()
+        if span is not None:
+            span.attrs.update(attrs)
+
+    def finish(self, span: Span) -> None:
+        self.spans += 1
+        self.emit({**span.record(), "service": self.service})
+
+    def stats(self) -> dict:
+        return {
+            "sampleRate": self.sample_rate,
+            "traces": self.traces,
+            "sampled": self.sampled,
+            "spans": self.spans,
+        }
@@ -0,0 +1,432 @@
+"""
+verdict_tracker.py — One background user.status poller per handle.
+
+Instead of every verdict request hitting the API on its own, a HandleTracker
+polls the newest submissions of its handle once per interval, keeps the
+latest record per submission ID, and pushes every change to subscribers
+(the SSE stream in cf_service). Upstream calls scale with handles, not with
+pending submissions.
+
+The table is an index of the handle's newest submissions with no gaps: each
+poll only re-reads records down to the oldest unfinished one (or the newest
+already indexed), sized from the recent arrival rate, and pages further back
+when someone asks about an ID older than the index. Lookups are dict reads,
+and rows fetched per poll follow how fast submissions arrive.
+
+With a SharedStore, only the worker holding a handle's lease polls it. It
+writes changed records to the store and reads the IDs other workers are
+waiting on from there. The other workers follow the store instead of the
+API, so there is still one poller per handle, not one per process.
+
+Polls share the API's rate limit: with `rate_per_minute` set, each handle is
+polled no more often than that budget split across the tracked handles, and
+`max_handles` refuses new handles (TooManyHandles) once that many are tracked.
+"""
+
+import asyncio
+import contextvars
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Optional
+
+from circuit_breaker import retry_after
+from shared_state import SharedStore
+
+log = logging.getLogger("cf_service.verdicts")
+
+
+class TooManyHandles(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Already tracking {limit} handles")
+        self.limit = limit
+
+
+def is_final(verdict: Optional[dict]) -> bool:
+    """True once a submission has left the queue/testing state."""
+    return bool(verdict) and verdict.get("verdict") not in (None, "TESTING")
+
+
+class HandleTracker:
+    def __init__(self, handle: str):
+        self.handle = handle
+        self.table = {}  # submission id -> formatted verdict, newest records with no gaps
+        self.followed = {}  # submission id -> verdict read from the shared store (not polled here)
+        self.followed_at = 0.0  # shared store cursor
+        self.complete = False  # table reaches back to the handle's first submission
+        self.arrivals = 0.0  # smoothed new records per poll, sizes the next request
+        self.lock = asyncio.Lock()  # one upstream refresh at a time
+        self.watched = {}  # id someone is waiting on -> give-up deadline
+        self.subscribers = set()  # asyncio.Queue per stream
+        self.task: Optional[asyncio.Task] = None
+        self.last_poll = 0.0  # monotonic time of last successful poll
+        self.last_activity = time.monotonic()
+
+    def get(self, submission_id: int) -> Optional[dict]:
+        """Latest known verdict, whether polled here or read from the shared store."""
+        return self.table.get(submission_id) or self.followed.get(submission_id)
+
+    def oldest_id(self) -> int:
+        return min(self.table, default=0)
+
+    def newest_id(self) -> int:
+        return max(self.table, default=0)
+
+    def covers(self, submission_id: int) -> bool:
+        """Whether the table can answer for this ID (a miss then means "not visible yet")."""
+        if submission_id in self.table:
+            return True
+        if not self.table:
+            return False
+        if submission_id > self.newest_id():
+            return True
+        return self.complete and submission_id < self.oldest_id()
+
+
+class VerdictTracker:
+    """
+    Owns the HandleTrackers. `fetch_page(handle, start, count)` returns raw
+    user.status records (newest first); `format_record` turns one into the
+    verdict payload that is stored and published. `window` is the largest
+    page requested and `max_pages` bounds the calls spent catching up on new
+    records; paging back for old IDs stops once `max_depth` are indexed.
+    `on_final(handle, verdict)` is called whenever a final verdict is stored.
+    `shared` coordinates polling with other worker processes. `interval` is
+    the shortest time between polls of a handle; `rate_per_minute` (API calls
+    the polls may use, 0 for no limit) stretches it as handles are added, and
+    `max_handles` (0 for no limit) caps how many are tracked at once.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[str, int, int], Awaitable[list]],
+        format_record: Callable[[dict], dict],
+        interval: float = 2.0,
+        window: int = 100,
+        max_pages: int = 5,
+        max_depth: int = 5000,
+        idle_timeout: float = 60.0,
+        watch_ttl: float = 600.0,
+        on_final: Optional[Callable[[str, dict], None]] = None,
+        shared: Optional[SharedStore] = None,
+        rate_per_minute: float = 0.0,
+        max_handles: int = 0,
+    ):
+        self.fetch_page = fetch_page
+        self.format_record = format_record
+        self.interval = interval
+        self.window = window
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.idle_timeout = idle_timeout
+        self.watch_ttl = watch_ttl
+        self.on_final = on_final
+        self.shared = shared
+        self.rate_per_minute = rate_per_minute
+        self.max_handles = max_handles
+        self.handles = {}  # handle -> HandleTracker
+        self.polls = 0
+        self.calls = 0
+        self.rows = 0
+        self.resets = 0
+        self.followed = 0  # records taken from another worker's polls
+        self.refused = 0  # handles turned away at max_handles
+
+    # --- Public API ---
+
+    def poll_interval(self) -> float:
+        """Seconds between polls of one handle: `interval`, or longer so all handles fit the rate."""
+        if not self.rate_per_minute:
+            return self.interval
+        return max(self.interval, 60.0 * len(self.handles) / self.rate_per_minute)
+
+    def watch(self, handle: str, submission_ids) -> HandleTracker:
+        """
+        Start (or keep) tracking `handle` until these IDs reach a final verdict.
+        Raises TooManyHandles for a new handle when max_handles are tracked
+        (as do subscribe() and resolve()).
+        """
+        tracker = self._ensure(handle)
+        deadline = time.monotonic() + self.watch_ttl
+        added = []
+        for sid in submission_ids:
+            if not is_final(tracker.get(sid)):
+                if sid not in tracker.watched:
+                    added.append(sid)
+                tracker.watched[sid] = deadline
+        if self.shared and added:
+            # Whichever worker polls this handle backfills these too
+            self.shared.put_many(f"verdict-watch:{handle}", {str(sid): 1 for sid in added}, self.watch_ttl)
+        return tracker
+
+    def subscribe(self, handle: str) -> asyncio.Queue:
+        tracker = self._ensure(handle)
+        queue = asyncio.Queue()
+        tracker.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, handle: str, queue: asyncio.Queue) -> None:
+        tracker = self.handles.get(handle)
+        if tracker:
+            tracker.subscribers.discard(queue)
+            tracker.last_activity = time.monotonic()
+
+    async def resolve(self, handle: str, submission_ids) -> dict:
+        """
+        {id: verdict-or-None} for these submissions, None meaning not visible
+        in user.status yet. Answers from the table when it is fresh and covers
+        every ID; otherwise polls first (paging back for old IDs). Concurrent
+        callers share that poll.
+        """
+        tracker = self.watch(handle, submission_ids)
+        if not self._answerable(tracker, submission_ids):
+            if self._polled_elsewhere(tracker):
+                # Another worker holds the handle's poll; its records are in the store
+                await self._await_followed(tracker, submission_ids)
+            else:
+                seen = tracker.last_poll
+                async with tracker.lock:
+                    if tracker.last_poll == seen:  # nobody polled while we waited
+                        await self._poll(tracker)
+        return {sid: tracker.get(sid) for sid in submission_ids}
+
+    def stats(self) -> dict:
+        return {
+            "handles": len(self.handles),
+            "maxHandles": self.max_handles,
+            "refused": self.refused,
+            "pollInterval": round(self.poll_interval(), 2),
+            "watched": sum(len(t.watched) for t in self.handles.values()),
+            "subscribers": sum(len(t.subscribers) for t in self.handles.values()),
+            "indexed": sum(len(t.table) for t in self.handles.values()),
+            "polls": self.polls,
+            "apiCalls": self.calls,
+            "rowsFetched": self.rows,
+            "resets": self.resets,
+            "followed": self.followed,
+        }
+
+    # --- Internals ---
+
+    def _ensure(self, handle: str) -> HandleTracker:
+        tracker = self.handles.get(handle)
+        if tracker is None:
+            if self.max_handles and len(self.handles) >= self.max_handles:
+                self.refused += 1
+                raise TooManyHandles(self.max_handles)
+            tracker = self.handles[handle] = HandleTracker(handle)
+        tracker.last_activity = time.monotonic()
+        if tracker.task is None or tracker.task.done():
+            # A fresh context: the loop outlives the request that started it and
+            # must not attribute its polls to that request's trace
+            tracker.task = asyncio.get_running_loop().create_task(
+                self._run(tracker), context=contextvars.Context()
+            )
+        return tracker
+
+    def _idle(self, tracker: HandleTracker) -> bool:
+        now = time.monotonic()
+        for sid, deadline in list(tracker.watched.items()):
+            if deadline < now:
+                del tracker.watched[sid]  # never showed up — stop waiting
+        return (
+            not tracker.subscribers
+            and not tracker.watched
+            and now - tracker.last_activity > self.idle_timeout
+        )
+
+    async def _run(self, tracker: HandleTracker) -> None:
+        while not self._idle(tracker):
+            interval = self.poll_interval()
+            if self.shared and not self.shared.acquire_lease(self._lease(tracker), 3 * interval):
+                # Another worker polls this handle: take its results from the store
+                self._follow(tracker)
+                await asyncio.sleep(self.interval)
+                continue
+            try:
+                await self.poll_once(tracker)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("user.status poll for %s failed: %s", tracker.handle, e)
+                # An open circuit says when to come back; don't spin on it
+                await asyncio.sleep(max(interval, retry_after(e, interval)))
+                continue
+            await asyncio.sleep(interval)
+        self.handles.pop(tracker.handle, None)
+        if self.shared:
+            self.shared.release_lease(self._lease(tracker))
+
+    # --- Shared store (multi-worker) ---
+
+    @staticmethod
+    def _lease(tracker: HandleTracker) -> str:
+        return f"verdict-poll:{tracker.handle}"
+
+    def _polled_elsewhere(self, tracker: HandleTracker) -> bool:
+        if not self.shared:
+            return False
+        holder = self.shared.lease_holder(self._lease(tracker))
+        return holder is not None and holder != self.shared.owner
+
+    def _follow(self, tracker: HandleTracker) -> None:
+        """Apply the records the polling worker stored since the last call."""
+        changes, tracker.followed_at = self.shared.changed_since(
+            f"verdicts:{tracker.handle}", tracker.followed_at
+        )
+        for _, verdict in changes:
+            if tracker.get(verdict["id"]) != verdict:
+                self.followed += 1
+                tracker.followed[verdict["id"]] = verdict
+                self._deliver(tracker, verdict)
+            if is_final(verdict):
+                tracker.watched.pop(verdict["id"], None)
+        excess = len(tracker.followed) - 4 * self.window
+        for sid in sorted(tracker.followed)[:max(0, excess)]:
+            del tracker.followed[sid]
+
+    async def _await_followed(self, tracker: HandleTracker, submission_ids) -> None:
+        """
+        Wait (up to the lease's lifetime) until every ID is in the store or the
+        polling worker has finished a poll that started after this request:
+        an ID still missing then is simply not visible in user.status yet.
+        """
+        asked_at = time.time()
+        deadline = time.monotonic() + 3 * self.poll_interval()
+        while True:
+            self._follow(tracker)
+            if all(tracker.get(sid) for sid in submission_ids) or time.monotonic() >= deadline:
+                return
+            polled_at = self.shared.get("verdict-polls", tracker.handle)
+            if polled_at is not None and polled_at > asked_at:
+                self._follow(tracker)  # pick up what that poll wrote
+                return
+            await asyncio.sleep(min(0.25, self.interval))
+
+    def _answerable(self, tracker: HandleTracker, submission_ids) -> bool:
+        fresh = time.monotonic() - tracker.last_poll <= 2 * self.poll_interval()
+        return fresh and all(tracker.covers(sid) for sid in submission_ids)
+
+    async def poll_once(self, tracker: HandleTracker) -> None:
+        async with tracker.lock:
+            await self._poll(tracker)
+
+    async def _poll(self, tracker: HandleTracker) -> None:
+        started = time.time()
+        if self.shared:
+            # IDs other workers are waiting on
+            watches, _ = self.shared.changed_since(f"verdict-watch:{tracker.handle}", 0.0)
+            deadline = time.monotonic() + self.watch_ttl
+            for key, _ in watches:
+                sid = int(key)
+                if sid not in tracker.watched and not is_final(tracker.get(sid)):
+                    tracker.watched[sid] = deadline
+        self._trim(tracker)
+        await self._refresh(tracker)
+        self.polls += 1
+        tracker.last_poll = time.monotonic()
+        await self._backfill(tracker, [sid for sid in tracker.watched if not tracker.covers(sid)])
+        if self.shared:
+            # A follower that asked before `started` can take this poll as its answer
+            self.shared.put("verdict-polls", tracker.handle, started, 3 * self.poll_interval())
+
+    async def _fetch(self, tracker: HandleTracker, start: int, count: int) -> list:
+        records = await self.fetch_page(tracker.handle, start, count)
+        self.calls += 1
+        self.rows += len(records)
+        return records
+
+    async def _refresh(self, tracker: HandleTracker) -> None:
+        """Re-read the top of the history down to the index's cursor."""
+        newest = tracker.newest_id()
+        # Final verdicts don't change: only unfinished records and new arrivals
+        # need re-reading. The newest known record doubles as the overlap that
+        # proves nothing was skipped.
+        cursor = min((sid for sid, v in tracker.table.items() if not is_final(v)), default=newest)
+        count = self.window
+        if tracker.table:
+            behind = sum(1 for sid in tracker.table if sid >= cursor)
+            count = min(self.window, behind + math.ceil(2 * tracker.arrivals) + 1)
+
+        fetched = []
+        start = 1
+        for _ in range(self.max_pages):
+            page = await self._fetch(tracker, start, count)
+            fetched.extend(page)
+            if len(page) < count or not newest or page[-1]["id"] <= cursor:
+                break
+            start += len(page)
+            count = self.window
+        else:
+            if fetched and fetched[-1]["id"] > newest:
+                # More arrived than one poll can read: start a fresh index from
+                # here rather than keep one with a hole (watched IDs get backfilled)
+                log.warning("Verdict index for %s fell behind, rebuilding", tracker.handle)
+                self.resets += 1
+                tracker.table.clear()
+                tracker.complete = False
+
+        if newest:
+            arrived = sum(1 for r in fetched if r["id"] > newest)
+            tracker.arrivals = 0.5 * tracker.arrivals + 0.5 * arrived
+        if not newest and len(fetched) < count:
+            tracker.complete = True
+        self._merge(tracker, fetched)
+
+    async def _backfill(self, tracker: HandleTracker, wanted: list) -> None:
+        """Page back past the oldest indexed record until the oldest wanted ID is reached."""
+        if not wanted or tracker.complete:
+            return
+        target = min(wanted)
+        while len(tracker.table) < self.max_depth:
+            # The table is the newest len(table) records, so the next page starts right after
+            page = await self._fetch(tracker, len(tracker.table) + 1, self.window)
+            self._merge(tracker, page)
+            if len(page) < self.window:
+                tracker.complete = True
+                break
+            if page[-1]["id"] <= target:
+                break
+
+    def _merge(self, tracker: HandleTracker, records: list) -> None:
+        changed = {}
+        for record in records:
+            verdict = self.format_record(record)
+            if tracker.table.get(verdict["id"]) != verdict:
+                tracker.table[verdict["id"]] = verdict
+                changed[str(verdict["id"])] = verdict
+                if tracker.followed.pop(verdict["id"], None) != verdict:
+                    self._deliver(tracker, verdict)
+            if is_final(verdict):
+                tracker.watched.pop(verdict["id"], None)
+        if self.shared and changed:
+            self.shared.put_many(f"verdicts:{tracker.handle}", changed, self.watch_ttl)
+
+    def _deliver(self, tracker: HandleTracker, verdict: dict) -> None:
+        self._publish(tracker, verdict)
+        if self.on_final and is_final(verdict):
+            self.on_final(tracker.handle, verdict)
+
+    def _trim(self, tracker: HandleTracker) -> None:
+        """Keep the table to a few windows of history, dropping the oldest records
+        first but never one someone is still waiting on."""
+        excess = len(tracker.table) - 4 * self.window
+        if excess <= 0:
+            return
+        keep_from = min(tracker.watched, default=None)
+        for sid in sorted(tracker.table)[:excess]:
+            if keep_from is not None and sid >= keep_from:
+                break
+            del tracker.table[sid]
+            tracker.complete = False
+
+    def _publish(self, tracker: HandleTracker, verdict: dict) -> None:
+        for queue in tracker.subscribers:
+            queue.put_nowait(verdict)
+
+    async def shutdown(self) -> None:
+        tasks = [t.task for t in self.handles.values() if t.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.handles.clear()
@@ -0,0 +1,95 @@
+"""
+webhooks.py — Retried, idempotent verdict callbacks.
+
+Instead of the backend polling for every pending submission, cf-service
+POSTs each final verdict to a callback URL as soon as the verdict tracker
+sees it. Deliveries are retried with exponential backoff; every delivery
+carries an idempotency key, and a key that was already delivered (or is
+still being delivered) is not sent again.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+log = logging.getLogger("cf_service.webhooks")
+
+# 4xx answers that mean "not yet", not "never"
+RETRYABLE_CLIENT_ERRORS = {408, 409, 425, 429}
+
+
+class WebhookSender:
+    """
+    `post(url, payload, headers)` performs one HTTP POST and returns the
+    response status code (raising on network errors).
+    """
+
+    def __init__(
+        self,
+        post: Callable[[str, dict, dict], Awaitable[int]],
+        max_attempts: int = 8,
+        retry_delay: float = 1.0,
+        max_delay: float = 60.0,
+        remember: int = 10000,
+    ):
+        self.post = post
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self.remember = remember  # delivered keys kept for deduplication
+        self.delivered_keys = OrderedDict()
+        self.in_flight = {}  # idempotency key -> asyncio.Task
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+
+    def send(self, url: str, payload: dict, key: str) -> None:
+        """Deliver in the background; duplicates of a known key are dropped."""
+        if key in self.delivered_keys or key in self.in_flight:
+            return
+        task = asyncio.get_running_loop().create_task(self._deliver(url, payload, key))
+        self.in_flight[key] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.in_flight),
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+    async def shutdown(self) -> None:
+        tasks = list(self.in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _deliver(self, url: str, payload: dict, key: str) -> None:
+        headers = {"Idempotency-Key": key}
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                status = await self.post(url, payload, headers)
+                detail = f"HTTP {status}"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status, detail = None, str(e) or type(e).__name__
+
+            if status is not None and 200 <= status < 300:
+                self.delivered += 1
+                self.delivered_keys[key] = time.time()
+                while len(self.delivered_keys) > self.remember:
+                    self.delivered_keys.popitem(last=False)
+                return
+            if status is not None and 400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS:
+                break  # the receiver rejected it; retrying won't help
+
+            if attempt < self.max_attempts:
+                self.retries += 1
+                await asyncio.sleep(min(self.max_delay, self.retry_delay * 2 ** (attempt - 1)))
+
+        self.failed += 1
+        log.warning("Callback %s to %s failed after %d attempt(s): %s", key, url, attempt, detail)
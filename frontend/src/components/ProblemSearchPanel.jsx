@@ -0,0 +1,143 @@
+import { useState, useEffect } from 'react';
+import api from '../services/api';
+import { Search, Plus, Check } from 'lucide-react';
+
+const PAGE_SIZE = 20;
+
+// Search the Codeforces problemset by name/code, rating range and tags; "Add" hands "1234/B" to onAdd
+export default function ProblemSearchPanel({ selected, onAdd }) {
+  const [q, setQ] = useState('');
+  const [minRating, setMinRating] = useState('');
+  const [maxRating, setMaxRating] = useState('');
+  const [tags, setTags] = useState([]);
+  const [matchAny, setMatchAny] = useState(false);
+  const [allTags, setAllTags] = useState([]);
+  const [results, setResults] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [error, setError] = useState('');
+
+  useEffect(() => {
+    // Debounced: the index answers fast, but not on every keystroke
+    const timer = setTimeout(async () => {
+      try {
+        const res = await api.get('/admin/problems/search', {
+          params: {
+            q: q.trim() || undefined,
+            minRating: minRating || undefined,
+            maxRating: maxRating || undefined,
+            tags: tags.length > 0 ? tags.join(',') : undefined,
+            match: matchAny ? 'any' : 'all',
+            limit: PAGE_SIZE,
+          },
+        });
+        setResults(res.data.problems);
+        setTotal(res.data.total);
+        setAllTags(res.data.tags);
+        setError('');
+      } catch (err) {
+        setError(err.response?.data?.error || 'Search unavailable');
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [q, minRating, maxRating, tags, matchAny]);
+
+  const toggleTag = (tag) => {
+    setTags((prev) => (prev.includes(tag) ? prev.filter((t) => t !== tag) : [...prev, tag]));
+  };
+
+  const inputClass =
+    'px-3 py-2 bg-dark border border-border rounded-lg text-text text-sm focus:outline-none focus:ring-2 focus:ring-primary/50 focus:border-primary placeholder:text-text-muted/50';
+
+  return (
+    <div className="border border-border rounded-lg p-4 mb-4 space-y-3">
+      <div className="flex flex-wrap items-center gap-2">
+        <div className="relative flex-1 min-w-48">
+          <Search size={14} className="absolute left-3 top-1/2 -translate-y-1/2 text-text-muted" />
+          <input
+            type="text"
+            value={q}
+            onChange={(e) => setQ(e.target.value)}
+            placeholder="Search by name or code"
+            className={`${inputClass} w-full pl-8`}
+          />
+        </div>
+        <input
+          type="number"
+          value={minRating}
+          onChange={(e) => setMinRating(e.target.value)}
+          placeholder="Min rating"
+          step={100}
+          className={`${inputClass} w-28`}
+        />
+        <input
+          type="number"
+          value={maxRating}
+          onChange={(e) => setMaxRating(e.target.value)}
+          placeholder="Max rating"
+          step={100}
+          className={`${inputClass} w-28`}
+        />
+        <label className="flex items-center gap-1 text-xs text-text-muted">
+          <input type="checkbox" checked={matchAny} onChange={(e) => setMatchAny(e.target.checked)} />
+          Any tag
+        </label>
+      </div>
+
+      {allTags.length > 0 && (
+        <div className="flex flex-wrap gap-1">
+          {allTags.map((tag) => (
+            <button
+              key={tag}
+              type="button"
+              onClick={() => toggleTag(tag)}
+              className={`px-2 py-0.5 rounded text-xs border transition ${
+                tags.includes(tag)
+                  ? 'bg-primary/20 border-primary text-primary-light'
+                  : 'border-border text-text-muted hover:text-text'
+              }`}
+            >
+              {tag}
+            </button>
+          ))}
+        </div>
+      )}
+
+      {error ? (
+        <p className="text-xs text-danger">{error}</p>
+      ) : (
+        <>
+          <p className="text-xs text-text-muted">
+            {total} problem{total === 1 ? '' : 's'}
+            {total > results.length ? `, showing the newest ${results.length}` : ''}
+          </p>
+          <div className="max-h-72 overflow-y-auto divide-y divide-border">
+            {results.map((p) => {
+              const code = `${p.contestId}/${p.index}`;
+              const added = selected.includes(code);
+              return (
+                <div key={code} className="flex items-center gap-3 py-1.5 text-sm">
+                  <span className="font-mono text-xs text-text-muted w-16 shrink-0">
+                    {p.contestId}
+                    {p.index}
+                  </span>
+                  <span className="flex-1 text-text truncate">{p.name}</span>
+                  <span className="text-xs text-text-muted hidden md:inline truncate max-w-48">{p.tags.join(', ')}</span>
+                  <span className="text-xs font-mono text-text-muted w-10 text-right">{p.rating || '—'}</span>
+                  <button
+                    type="button"
+                    onClick={() => onAdd(code)}
+                    disabled={added}
+                    className="p-1 text-primary hover:text-primary-light transition disabled:opacity-40 disabled:cursor-not-allowed"
+                    title={added ? 'Already added' : 'Add to contest'}
+                  >
+                    {added ? <Check size={14} /> : <Plus size={14} />}
+                  </button>
+                </div>
+              );
+            })}
+          </div>
+        </>
+      )}
+    </div>
+  );
+}
@@ -1,9 +1,10 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
 import api from '../services/api';
+import ProblemSearchPanel from '../components/ProblemSearchPanel';
 import { useAuth } from '../context/AuthContext';
 import toast from 'react-hot-toast';
-import { ChevronRight, Plus, Trash2, Save, Loader2, GripVertical } from 'lucide-react';
+import { ChevronRight, Plus, Trash2, Save, Loader2, GripVertical, Search } from 'lucide-react';
 
 const LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ';
 
@@ -33,6 +34,7 @@ export default function AdminContestFormPage() {
   const [visibility, setVisibility] = useState('public');
   const [password, setPassword] = useState('');
   const [problemCodes, setProblemCodes] = useState(['']);
+  const [showSearch, setShowSearch] = useState(false);
 
   useEffect(() => {
     if (!isAdmin) {
@@ -88,6 +90,14 @@ export default function AdminContestFormPage() {
     setProblemCodes((prev) => prev.map((p, idx) => (idx === i ? value : p)));
   };
 
+  // From the search panel: fill the first empty row, or append one
+  const addFoundProblem = (code) => {
+    setProblemCodes((prev) => {
+      const empty = prev.findIndex((p) => !p.trim());
+      return empty >= 0 ? prev.map((p, idx) => (idx === empty ? code : p)) : [...prev, code];
+    });
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
 
@@ -305,15 +315,34 @@ export default function AdminContestFormPage() {
         <div className="bg-card border border-border rounded-xl p-6">
           <div className="flex items-center justify-between mb-4">
             <h2 className="text-sm font-semibold text-text">Problems *</h2>
-            <button
-              type="button"
-              onClick={addProblem}
-              className="flex items-center gap-1 text-xs text-primary hover:text-primary-light transition"
-            >
-              <Plus size={14} />
-              Add Problem
-            </button>
+            <div className="flex items-center gap-4">
+              <button
+                type="button"
+                onClick={() => setShowSearch((v) => !v)}
+                className="flex items-center gap-1 text-xs text-primary hover:text-primary-light transition"
+              >
+                <Search size={14} />
+                {showSearch ? 'Hide Search' : 'Search Problemset'}
+              </button>
+              <button
+                type="button"
+                onClick={addProblem}
+                className="flex items-center gap-1 text-xs text-primary hover:text-primary-light transition"
+              >
+                <Plus size={14} />
+                Add Problem
+              </button>
+            </div>
           </div>
+          {showSearch && (
+            <ProblemSearchPanel
+              selected={problemCodes.map((c) => {
+                const parsed = parseProblemCode(c);
+                return parsed ? `${parsed.contestId}/${parsed.problemIndex}` : c;
+              })}
+              onAdd={addFoundProblem}
+            />
+          )}
           <p className="text-xs text-text-muted mb-4">
             Enter Codeforces problem codes like <code className="text-primary-light">4A</code>,{' '}
             <code className="text-primary-light">1234/B</code>, or <code className="text-primary-light">71A</code>. Problems are
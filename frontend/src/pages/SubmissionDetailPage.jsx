@@ -15,6 +15,7 @@ const VERDICT_CONFIG = {
   COMPILATION_ERROR: { label: 'Compilation Error', color: 'text-warning', bg: 'bg-warning/15', icon: AlertTriangle },
   PENDING: { label: 'Pending', color: 'text-pending', bg: 'bg-pending/15', icon: Loader },
   TESTING: { label: 'Testing...', color: 'text-pending', bg: 'bg-pending/15', icon: Loader },
+  SUBMIT_FAILED: { label: 'Not Submitted', color: 'text-warning', bg: 'bg-warning/15', icon: AlertTriangle },
 };
 
 export default function SubmissionDetailPage() {
@@ -95,6 +96,11 @@ export default function SubmissionDetailPage() {
           {submission.testsPassed > 0 && submission.verdict !== 'ACCEPTED' && submission.verdict !== 'OK' && (
             <p className="text-text-muted text-sm mt-1">Failed on test {submission.testsPassed + 1}</p>
           )}
+          {submission.verdict === 'SUBMIT_FAILED' && (
+            <p className="text-text-muted text-sm mt-1">
+              {submission.submitError || 'Codeforces did not accept the submission'} — it does not count as an attempt
+            </p>
+          )}
         </div>
       </div>
 
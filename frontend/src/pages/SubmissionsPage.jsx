@@ -16,6 +16,7 @@ const VERDICT_STYLES = {
   COMPILATION_ERROR: 'bg-warning/15 text-warning',
   PENDING: 'bg-pending/15 text-pending',
   TESTING: 'bg-pending/15 text-pending',
+  SUBMIT_FAILED: 'bg-warning/15 text-warning',
 };
 
 const VERDICT_SHORT = {
@@ -28,6 +29,7 @@ const VERDICT_SHORT = {
   COMPILATION_ERROR: 'CE',
   PENDING: 'Pending',
   TESTING: 'Testing...',
+  SUBMIT_FAILED: 'Not submitted',
 };
 
 function VerdictBadge({ verdict, testsPassed }) {
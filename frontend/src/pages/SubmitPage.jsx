@@ -3,7 +3,7 @@ import { useParams, Link, useNavigate } from 'react-router-dom';
 import api from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import toast from 'react-hot-toast';
-import { ChevronRight, Send, Loader2, Code, Upload } from 'lucide-react';
+import { ChevronRight, Send, Loader2, Code, Upload, Play, CheckCircle2, XCircle } from 'lucide-react';
 
 // Common Codeforces languages with their programTypeId
 const CF_LANGUAGES = [
@@ -36,6 +36,62 @@ const CF_LANGUAGES = [
   { id: '12', name: 'Haskell GHC 8.10' },
 ];
 
+const VERDICT_LABELS = {
+  OK: 'Passed',
+  WRONG_ANSWER: 'Wrong answer',
+  RUNTIME_ERROR: 'Runtime error',
+  TIME_LIMIT_EXCEEDED: 'Time limit exceeded',
+  OUTPUT_LIMIT_EXCEEDED: 'Output limit exceeded',
+  COMPILATION_ERROR: 'Compilation error',
+};
+
+// Result of a local sample run: compile output, then each sample with its output when it failed
+function SampleResults({ result }) {
+  const passed = result.verdict === 'OK';
+  return (
+    <div className="bg-card border border-border rounded-xl p-6 mb-6 space-y-3">
+      <div className="flex items-center gap-2 text-sm font-semibold">
+        {passed ? <CheckCircle2 size={16} className="text-success" /> : <XCircle size={16} className="text-danger" />}
+        <span className={passed ? 'text-success' : 'text-danger'}>{VERDICT_LABELS[result.verdict] || result.verdict}</span>
+        {result.total > 0 && (
+          <span className="text-text-muted font-normal">
+            — {result.passed}/{result.total} samples passed ({result.language})
+          </span>
+        )}
+      </div>
+      {result.verdict === 'COMPILATION_ERROR' && (
+        <pre className="p-3 bg-dark rounded-lg text-xs text-text-muted overflow-x-auto whitespace-pre-wrap">{result.compile.output}</pre>
+      )}
+      {result.tests.map((t) => (
+        <div key={t.index} className="text-xs">
+          <div className="flex items-center gap-2">
+            <span className="text-text-muted">Sample {t.index}</span>
+            <span className={t.verdict === 'OK' ? 'text-success' : 'text-danger'}>{VERDICT_LABELS[t.verdict] || t.verdict}</span>
+            <span className="text-text-muted">{t.timeMs} ms</span>
+          </div>
+          {t.verdict !== 'OK' && (
+            <div className="grid md:grid-cols-2 gap-2 mt-1">
+              <div>
+                <div className="text-text-muted mb-0.5">Your output</div>
+                <pre className="p-2 bg-dark rounded text-text overflow-x-auto max-h-40">{t.output || t.stderr || '(empty)'}</pre>
+              </div>
+              <div>
+                <div className="text-text-muted mb-0.5">Expected</div>
+                <pre className="p-2 bg-dark rounded text-text overflow-x-auto max-h-40">{t.expected}</pre>
+              </div>
+            </div>
+          )}
+        </div>
+      ))}
+      {!passed && result.verdict !== 'COMPILATION_ERROR' && (
+        <p className="text-xs text-text-muted">
+          Samples are compared token by token; if the problem accepts several answers, yours may still be right.
+        </p>
+      )}
+    </div>
+  );
+}
+
 export default function SubmitPage() {
   const { id: contestId, order } = useParams();
   const { user } = useAuth();
@@ -48,6 +104,9 @@ export default function SubmitPage() {
   const [languageId, setLanguageId] = useState('89');
   const [submitting, setSubmitting] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [runningSamples, setRunningSamples] = useState(false);
+  const [sampleResult, setSampleResult] = useState(null);
+  const [blocked, setBlocked] = useState(false); // last submit was held back by failed samples
 
   // Load contest to get problem mapping
   useEffect(() => {
@@ -84,7 +143,25 @@ export default function SubmitPage() {
     reader.readAsText(file);
   };
 
-  const handleSubmit = async (e) => {
+  const handleRunSamples = async () => {
+    if (!code.trim() || !problemEntry) return;
+    setRunningSamples(true);
+    try {
+      const res = await api.post('/submissions/run-samples', {
+        contestId,
+        problemId: problemEntry.problemId,
+        code: code.trim(),
+        languageId,
+      });
+      setSampleResult(res.data);
+    } catch (err) {
+      toast.error(err.response?.data?.error || 'Could not run samples');
+    } finally {
+      setRunningSamples(false);
+    }
+  };
+
+  const handleSubmit = async (e, force = false) => {
     e.preventDefault();
 
     if (!code.trim()) {
@@ -107,6 +184,7 @@ export default function SubmitPage() {
         code: code.trim(),
         language: selectedLang?.name || languageId,
         languageId,
+        force,
       });
 
       toast.success('Solution submitted!');
@@ -115,6 +193,10 @@ export default function SubmitPage() {
     } catch (err) {
       const msg = err.response?.data?.error || 'Submission failed';
       toast.error(msg);
+      if (err.response?.data?.preflight) {
+        setSampleResult(err.response.data.preflight);
+        setBlocked(true);
+      }
     } finally {
       setSubmitting(false);
     }
@@ -175,7 +257,10 @@ export default function SubmitPage() {
           <label className="block text-sm font-semibold text-text mb-2">Language</label>
           <select
             value={languageId}
-            onChange={(e) => setLanguageId(e.target.value)}
+            onChange={(e) => {
+              setLanguageId(e.target.value);
+              setBlocked(false);
+            }}
             className="w-full md:w-80 px-3 py-2 bg-dark border border-border rounded-lg text-text text-sm focus:outline-none focus:ring-2 focus:ring-primary/50 focus:border-primary"
           >
             {CF_LANGUAGES.map((lang) => (
@@ -214,13 +299,18 @@ export default function SubmitPage() {
           </div>
           <textarea
             value={code}
-            onChange={(e) => setCode(e.target.value)}
+            onChange={(e) => {
+              setCode(e.target.value);
+              setBlocked(false);
+            }}
             placeholder="Paste your solution here..."
             spellCheck={false}
             className="w-full h-96 px-4 py-3 bg-dark text-text font-mono text-sm leading-relaxed resize-y focus:outline-none placeholder:text-text-muted/50"
           />
         </div>
 
+        {sampleResult && <SampleResults result={sampleResult} />}
+
         {/* Submit button */}
         <div className="flex items-center justify-between">
           <Link
@@ -229,23 +319,44 @@ export default function SubmitPage() {
           >
             &larr; Back to problem
           </Link>
-          <button
-            type="submit"
-            disabled={submitting || !code.trim()}
-            className="inline-flex items-center gap-2 px-6 py-2.5 bg-primary hover:bg-primary-dark text-white font-semibold rounded-lg transition disabled:opacity-50 disabled:cursor-not-allowed"
-          >
-            {submitting ? (
-              <>
-                <Loader2 size={16} className="animate-spin" />
-                Submitting...
-              </>
-            ) : (
-              <>
-                <Send size={16} />
-                Submit
-              </>
+          <div className="flex items-center gap-3">
+            <button
+              type="button"
+              onClick={handleRunSamples}
+              disabled={runningSamples || !code.trim()}
+              className="inline-flex items-center gap-2 px-4 py-2.5 bg-dark border border-border hover:border-primary/30 text-text text-sm font-semibold rounded-lg transition disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              {runningSamples ? <Loader2 size={16} className="animate-spin" /> : <Play size={16} />}
+              Run Samples
+            </button>
+            {blocked && (
+              <button
+                type="button"
+                onClick={(e) => handleSubmit(e, true)}
+                disabled={submitting}
+                className="px-4 py-2.5 text-sm text-text-muted hover:text-danger transition disabled:opacity-50"
+              >
+                Submit anyway
+              </button>
             )}
-          </button>
+            <button
+              type="submit"
+              disabled={submitting || !code.trim()}
+              className="inline-flex items-center gap-2 px-6 py-2.5 bg-primary hover:bg-primary-dark text-white font-semibold rounded-lg transition disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              {submitting ? (
+                <>
+                  <Loader2 size={16} className="animate-spin" />
+                  Submitting...
+                </>
+              ) : (
+                <>
+                  <Send size={16} />
+                  Submit
+                </>
+              )}
+            </button>
+          </div>
         </div>
       </form>
     </div>
@@ -9,6 +9,10 @@ export default defineConfig({
     port: 3000,
     proxy: {
       '/api': 'http://localhost:5000',
+      '/cf-assets': {
+        target: 'http://localhost:8000',
+        rewrite: (path) => path.replace(/^\/cf-assets/, '/cf/assets'),
+      },
       '/socket.io': {
         target: 'http://localhost:5000',
         ws: true,